@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Единая точка входа для скриптов каталога
+
+    python3 aquacat.py --help
+    python3 aquacat.py validate
+    python3 aquacat.py crawl --sitemap --fulltext
+    python3 aquacat.py dedup + impute + compact + validate + export --format arrow
+
+Команды цепочки (разделитель «+») выполняются в одном процессе и работают
+с одним загруженным каталогом: он читается один раз и записывается один
+раз в конце (или перед командой, которой нужен файл на диске).
+Тяжелые зависимости (bs4, requests, numpy, pyarrow) импортируются внутри
+команд, поэтому --help и легкие команды запускаются мгновенно.
+Глобальные параметры (--catalog, --dry-run, --profile) указываются перед
+первой командой. С --profile каждая команда цепочки профилируется
+(profiling.py: cProfile, tracemalloc, свернутые стеки), в конце выводится
+сводная таблица.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from catalog_store import atomic_write_json, load_catalog
+
+BASE_DIR = Path(__file__).parent.parent
+CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
+CHAIN_SEPARATOR = '+'
+
+
+class Context:
+    """Общее состояние цепочки команд: каталог загружается при первом обращении"""
+
+    def __init__(self, catalog_path: Path, dry_run: bool = False):
+        self.catalog_path = catalog_path
+        self.dry_run = dry_run
+        self._records: Optional[List[Dict]] = None
+        self.dirty = False
+
+    @property
+    def records(self) -> List[Dict]:
+        if self._records is None:
+            self._records = load_catalog(self.catalog_path)
+            print(f"📖 Каталог: {self.catalog_path.name}, записей: {len(self._records)}")
+        return self._records
+
+    def replace(self, records: List[Dict]):
+        """Команда изменила каталог: записать в конце цепочки"""
+        self._records = records
+        self.dirty = True
+
+    def reload(self):
+        """Каталог изменен на диске (обход, сбор изображений): перечитать при обращении"""
+        self._records = None
+        self.dirty = False
+
+    def save(self):
+        if not self.dirty:
+            return
+        if self.dry_run:
+            print(f"🔍 --dry-run: {self.catalog_path.name} не записан")
+        else:
+            atomic_write_json(self.catalog_path, self._records)
+            print(f"💾 Сохранено: {self.catalog_path}")
+        self.dirty = False
+
+
+# Команды ------------------------------------------------------------------
+
+def cmd_crawl(ctx: Context, args):
+    from fanfishka_parser import FanFishkaParser
+    ctx.save()
+    parser = FanFishkaParser(discovery='sitemap' if args.sitemap else 'pagination',
+                             fulltext_db=args.fulltext, low_memory=args.low_memory,
+                             output_file=str(ctx.catalog_path), priority=args.priority, budget=args.budget,
+                             force=args.force)
+    if not parser.run():
+        sys.exit(1)  # каталог намного меньше прошлого: остальные команды цепочки не запускаются
+    if args.low_memory:
+        ctx.reload()  # каталог собран из журнала прямо на диске
+    else:
+        ctx.replace(parser.fish_data)
+
+
+def cmd_images(ctx: Context, args):
+    if args.harvest:
+        from extract_images_from_catalog import run_harvest
+        ctx.save()
+        run_harvest(ctx.records, workers=args.workers, output_path=ctx.catalog_path)
+        ctx.reload()
+    else:
+        from fix_images import main as analyze_images
+        analyze_images([r.get('image_url', '') for r in ctx.records])
+
+
+def cmd_match(ctx: Context, args):
+    from update_fish_data import main as update_fish_database
+    update_fish_database(ctx.records)
+
+
+def cmd_export(ctx: Context, args):
+    from export_columnar import ARROW_PATH, PARQUET_PATH, records_to_table, write_arrow, write_parquet
+    ctx.save()  # свежесть экспорта сверяется с временем изменения JSON
+    table = records_to_table(ctx.records)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if args.format in ('arrow', 'both'):
+        write_arrow(table, output_dir / ARROW_PATH.name)
+        print(f"✅ {ARROW_PATH.name}: {table.num_rows} записей")
+    if args.format in ('parquet', 'both'):
+        write_parquet(table, output_dir / PARQUET_PATH.name)
+        print(f"✅ {PARQUET_PATH.name}: {table.num_rows} записей")
+
+
+def cmd_validate(ctx: Context, args):
+    from validate_catalog import print_summary, validate
+    report = validate(ctx.records)
+    print_summary(report)
+    if args.report:
+        atomic_write_json(args.report, report)
+        print(f"📄 Отчет сохранен: {args.report}")
+
+
+def cmd_impute(ctx: Context, args):
+    from impute_traits import impute
+    stats = impute(ctx.records)
+    print(f"✅ Дополнено записей: {stats['records_imputed']} из {stats['records']} "
+          f"({stats['elapsed_ms']} мс)")
+    ctx.replace(ctx.records)
+
+
+def cmd_dedup(ctx: Context, args):
+    from dedup_catalog import dedup
+    records, _, stats = dedup(ctx.records, args.threshold)
+    print(f"✅ Дубликаты: {stats['records']} → {len(records)} записей, "
+          f"кластеров {stats['clusters']} ({stats['elapsed_ms']} мс)")
+    ctx.replace(records)
+
+
+def cmd_compact(ctx: Context, args):
+    from compact_descriptions import compact_catalog
+    stats = compact_catalog(ctx.records, args.max_chars)
+    saved = stats['catalog_before'] - stats['catalog_after']
+    print(f"✅ Описания сжаты: −{saved / 1024:.0f} КБ ({stats['elapsed_ms']} мс)")
+    ctx.replace(ctx.records)
+
+
+def cmd_bench(ctx: Context, args):
+    from community_solver import benchmark, load_species, parse_incompatibility_matrix
+    from search_index import SearchIndex
+    from water_index import WaterIndex
+
+    records = load_species() if args.species else ctx.records
+    print("Совместимость:")
+    benchmark(records, parse_incompatibility_matrix(), volumes=args.volume)
+
+    started = time.perf_counter()
+    index = SearchIndex.build(records)
+    build_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    for query in args.query:
+        index.search(query)
+    query_ms = (time.perf_counter() - started) * 1000 / max(1, len(args.query))
+    print(f"Поиск: индекс {build_ms:.0f} мс, запрос {query_ms:.2f} мс")
+
+    started = time.perf_counter()
+    water = WaterIndex(records)
+    build_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    water.query('overlap', ph=(6.5, 7.5), temp=(24, 26))
+    query_ms = (time.perf_counter() - started) * 1000
+    print(f"Параметры воды: индекс {build_ms:.1f} мс, запрос {query_ms:.2f} мс")
+
+
+# Разбор аргументов ---------------------------------------------------------
+
+def build_parser(with_globals: bool = True) -> argparse.ArgumentParser:
+    """Парсер команды; глобальные параметры принимаются только в первом звене цепочки"""
+    arg_parser = argparse.ArgumentParser(
+        prog='aquacat', description="Каталог аквариумных рыб: обход, обработка, экспорт",
+        epilog=f"Команды объединяются в цепочку через «{CHAIN_SEPARATOR}»: "
+               f"aquacat dedup {CHAIN_SEPARATOR} impute {CHAIN_SEPARATOR} export")
+    if with_globals:
+        arg_parser.add_argument('--catalog', default=str(CATALOG_PATH), help="путь к каталогу")
+        arg_parser.add_argument('--dry-run', action='store_true', help="не записывать измененный каталог")
+        arg_parser.add_argument('--profile', nargs='?', const='', metavar='DIR',
+                                help="профилировать команды (по умолчанию в .pipeline/profile)")
+    commands = arg_parser.add_subparsers(dest='command', required=True, metavar='команда')
+
+    crawl = commands.add_parser('crawl', help="обход fanfishka.ru (fanfishka_parser.py)")
+    crawl.add_argument('--sitemap', action='store_true', help="статьи из sitemap.xml, без неизменившихся")
+    crawl.add_argument('--fulltext', nargs='?', const='fish_fulltext.db', metavar='DB',
+                       help="сохранять полный текст статей в индекс FTS5")
+    crawl.add_argument('--low-memory', action='store_true', help="записи сразу в журнал, а не в память")
+    crawl.add_argument('--priority', action='store_true', help="статьи по ценности пробелов (crawl_frontier.py)")
+    crawl.add_argument('--budget', type=int, metavar='N', help="загрузить не больше N статей")
+    crawl.add_argument('--force', action='store_true', help="записать каталог, даже если он намного меньше прошлого")
+    crawl.set_defaults(handler=cmd_crawl)
+
+    images = commands.add_parser('images', help="изображения: анализ или сбор со страниц каталога")
+    images.add_argument('--harvest', action='store_true', help="собрать карточки со страниц каталога")
+    images.add_argument('--workers', type=int, default=4, help="параллельных загрузок")
+    images.set_defaults(handler=cmd_images)
+
+    match = commands.add_parser('match', help="обновить fishDatabase.ts из каталога (update_fish_data.py)")
+    match.set_defaults(handler=cmd_match)
+
+    export = commands.add_parser('export', help="экспорт в Arrow/Parquet (export_columnar.py)")
+    export.add_argument('--format', choices=['arrow', 'parquet', 'both'], default='both')
+    export.add_argument('--output-dir', default=str(BASE_DIR), help="папка для файлов")
+    export.set_defaults(handler=cmd_export)
+
+    validate = commands.add_parser('validate', help="проверка числовых полей (validate_catalog.py)")
+    validate.add_argument('--report', help="куда сохранить отчет JSON")
+    validate.set_defaults(handler=cmd_validate)
+
+    impute = commands.add_parser('impute', help="заполнение пропусков (impute_traits.py)")
+    impute.set_defaults(handler=cmd_impute)
+
+    dedup = commands.add_parser('dedup', help="слияние дубликатов статей (dedup_catalog.py)")
+    dedup.add_argument('--threshold', type=float, default=0.8, help="порог сходства Жаккара")
+    dedup.set_defaults(handler=cmd_dedup)
+
+    compact = commands.add_parser('compact', help="сжатие описаний (compact_descriptions.py)")
+    compact.add_argument('--max-chars', type=int, default=600, help="максимальная длина описания")
+    compact.set_defaults(handler=cmd_compact)
+
+    bench = commands.add_parser('bench', help="замер скорости совместимости, поиска и индекса воды")
+    bench.add_argument('--species', action='store_true', help="виды src/data вместо каталога")
+    bench.add_argument('--volume', type=int, nargs='+', default=[100, 240, 300], help="объемы, л")
+    bench.add_argument('--query', nargs='+', default=['неон', 'барбус суматранский', 'скаляри'],
+                       help="поисковые запросы")
+    bench.set_defaults(handler=cmd_bench)
+    return arg_parser
+
+
+def split_chain(argv: List[str]) -> List[List[str]]:
+    segments: List[List[str]] = [[]]
+    for arg in argv:
+        if arg == CHAIN_SEPARATOR:
+            segments.append([])
+        else:
+            segments[-1].append(arg)
+    return segments
+
+
+def main(argv: Optional[List[str]] = None):
+    segments = split_chain(sys.argv[1:] if argv is None else argv)
+    first = build_parser().parse_args(segments[0])
+    chain = [first]
+    if len(segments) > 1:
+        link_parser = build_parser(with_globals=False)
+        chain.extend(link_parser.parse_args(segment) for segment in segments[1:])
+
+    ctx = Context(Path(first.catalog), dry_run=first.dry_run)
+    profiles = []
+    for position, args in enumerate(chain, 1):
+        started = time.perf_counter()
+        if len(chain) > 1:
+            print(f"\n▶ {args.command}")
+        if first.profile is None:
+            args.handler(ctx, args)
+        else:
+            from profiling import PROFILE_DIR, StageProfiler
+            stage = f'{position:02d}-{args.command}' if len(chain) > 1 else args.command
+            with StageProfiler(stage, Path(first.profile or PROFILE_DIR)) as profiler:
+                args.handler(ctx, args)
+            profiles.append(profiler.result)
+        if len(chain) > 1:
+            print(f"⏱ {args.command}: {(time.perf_counter() - started) * 1000:.0f} мс")
+    ctx.save()
+
+    if profiles:
+        from profiling import PROFILE_DIR, format_table
+        print(f"\n{format_table(profiles)}\nПрофили: {first.profile or PROFILE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Классификатор статей «рыба / не рыба» по заголовку со страницы каталога
+
+Работает ДО загрузки статьи: по тексту ссылки на странице каталога решает,
+стоит ли вообще скачивать страницу. Статьи о растениях, оборудовании,
+списки и обзоры отсекаются без запроса к сайту.
+
+Два уровня:
+1. Правила по словам (с границей слова) и список разрешенных названий видов
+2. Наивный Байес по токенам, обученный на заголовках уже собранного каталога;
+   метка — раздел сайта, из которого взята статья, и извлеченные данные
+
+Анонс карточки в оценке не участвует: общие слова («аквариумные»,
+«содержание») в нем чаще встречаются у обзорных статей, и рыбы с
+длинным анонсом ошибочно отсекались.
+"""
+
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+BASE_DIR = Path(__file__).parent.parent
+CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
+
+SPECIES_PATHS = [BASE_DIR / 'src' / 'data' / 'freshwater_species.json',
+                 BASE_DIR / 'src' / 'data' / 'marine_species.json']
+
+# Заголовки с этими словами — точно не статьи о конкретной рыбе. Шаблоны
+# начинаются с границы слова и не ловят части названий видов:
+# «водоросли в аквариуме», но не «Водорослеед сиамский»; «обзор», но не
+# «Неоны обзорная статья»
+EXCLUDE_PATTERNS = [
+    r'\bрастени', r'\bоборудован', r'\bфильтр(?:а|ы|ов|ах)?\b', r'\bобогревател',
+    r'\bкомпрессор', r'\bосвещен', r'\bгрунт', r'\bдекор', r'\bкорм(?:а|ов|ление)?\b',
+    r'\bлечени', r'\bболезн', r'\bсписок всех', r'\bкаталог', r'\bобзор\b',
+    r'\bсовместимост', r'\bводоросл(?:и|ей|ями)\b', r'\bакваскейп', r'\bco2\b', r'\bсо2\b',
+    r'\bв алфавитном порядке', r'\bразмножение аквариумных', r'\bполезные советы',
+    r'\bчерепах', r'\bлягушк', r'\bаквариумистика\b',
+]
+EXCLUDE_RE = re.compile('|'.join(EXCLUDE_PATTERNS))
+
+# Названия видов, которые совпадают с правилами исключения по основе слова.
+# Заголовок с таким названием или с названием вида из src/data — всегда рыба
+ALLOW_KEYWORDS = ['водорослеед']
+
+# Раздел сайта со статьями о рыбах: /akvariumnye_rybki/902-neony.html
+FISH_SECTION_RE = re.compile(r'/akvariumnye_rybki/\d+-[^/]+\.html$')
+
+STEM_LENGTH = 6            # грубая «основа» слова: первые 6 букв
+MIN_TOKEN_LENGTH = 3
+SKIP_THRESHOLD = 0.1       # пропускаем статью, только если P(рыба) ниже порога
+
+TOKEN_RE = re.compile(r'[а-яёa-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Токены для классификатора: нижний регистр, ё→е, обрезка до основы"""
+    text = text.lower().replace('ё', 'е')
+    return [t[:STEM_LENGTH] for t in TOKEN_RE.findall(text) if len(t) >= MIN_TOKEN_LENGTH]
+
+
+def _normalize(text: str) -> str:
+    return text.lower().replace('ё', 'е')
+
+
+def load_species_names(paths: Iterable[Path] = SPECIES_PATHS) -> List[str]:
+    """Русские названия видов из src/data (без уточнений в скобках)"""
+    names = set(ALLOW_KEYWORDS)
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                species = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for record in species:
+            name = _normalize(re.sub(r'\(.*?\)', '', record.get('name_ru', ''))).strip()
+            if name:
+                names.add(name)
+    return sorted(names)
+
+
+_ALLOW_RE = None
+
+
+def is_allowed_species(title: str) -> bool:
+    """В заголовке есть название вида из списка разрешенных"""
+    global _ALLOW_RE
+    if _ALLOW_RE is None:
+        _ALLOW_RE = re.compile(r'\b(?:' + '|'.join(re.escape(name) for name in load_species_names()) + ')')
+    return bool(_ALLOW_RE.search(_normalize(title)))
+
+
+def matches_exclude_rules(title: str) -> bool:
+    """Заголовок попадает под правила исключения (и не называет известный вид)"""
+    return bool(EXCLUDE_RE.search(_normalize(title))) and not is_allowed_species(title)
+
+
+def label_from_record(record: Dict) -> bool:
+    """
+    Метка для обучения, независимая от правил по заголовку: статья из
+    раздела рыб сайта или запись, из которой извлечены латинское название
+    и размер/объем, — рыба; страницы разделов и статьи других разделов — нет
+    """
+    if FISH_SECTION_RE.search(record.get('article_url', '')):
+        return True
+    return bool(record.get('name_lat')) and bool(record.get('size_cm') or record.get('min_tank_liters'))
+
+
+class ArticleClassifier:
+    """Правила + мультиномиальный наивный Байес по токенам заголовка"""
+
+    def __init__(self, threshold: float = SKIP_THRESHOLD):
+        self.threshold = threshold
+        self.token_counts: Dict[bool, Counter] = {True: Counter(), False: Counter()}
+        self.doc_counts: Dict[bool, int] = {True: 0, False: 0}
+        self.vocabulary: set = set()
+
+    @property
+    def trained(self) -> bool:
+        return self.doc_counts[True] > 0 and self.doc_counts[False] > 0
+
+    def train(self, samples: Iterable[Tuple[str, bool]]) -> 'ArticleClassifier':
+        """Обучить на парах (текст, это_рыба)"""
+        for text, is_fish in samples:
+            tokens = tokenize(text)
+            self.token_counts[is_fish].update(tokens)
+            self.doc_counts[is_fish] += 1
+            self.vocabulary.update(tokens)
+        return self
+
+    @staticmethod
+    def samples_from_catalog(catalog: List[Dict]) -> List[Tuple[str, bool]]:
+        """
+        Обучающая выборка из каталога: заголовки, метка — label_from_record
+        (раздел сайта и извлеченные данные, а не правила по заголовку: иначе
+        модель лишь повторяет правила вместе с их ошибками).
+        Описания не используются: страницы-списки перечисляют все виды,
+        и названия рыб начинают считаться признаком «не рыбы».
+        """
+        labels: Dict[str, bool] = {}
+        for item in catalog:
+            title = item.get('name_ru', '').strip()
+            if title:
+                labels[title] = labels.get(title, False) or label_from_record(item)
+        return sorted(labels.items())
+
+    @classmethod
+    def from_catalog(cls, path: Path = CATALOG_PATH, **kwargs) -> 'ArticleClassifier':
+        """Классификатор, обученный на каталоге (только правила, если каталога нет)"""
+        classifier = cls(**kwargs)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            return classifier
+        return classifier.train(cls.samples_from_catalog(catalog))
+
+    def probability(self, text: str) -> float:
+        """P(статья о рыбе | текст)"""
+        if not self.trained:
+            return 1.0
+        total_docs = self.doc_counts[True] + self.doc_counts[False]
+        vocab_size = len(self.vocabulary) + 1
+        log_scores = {}
+        for label in (True, False):
+            counts = self.token_counts[label]
+            denominator = sum(counts.values()) + vocab_size
+            score = math.log(self.doc_counts[label] / total_docs)
+            for token in tokenize(text):
+                # Незнакомые токены (новые виды) пропускаем: иначе из-за
+                # сглаживания они смещают оценку к меньшему классу
+                if token in self.vocabulary:
+                    score += math.log((counts[token] + 1) / denominator)
+            log_scores[label] = score
+        # Нормализация через разность логарифмов (без переполнения)
+        diff = log_scores[False] - log_scores[True]
+        if diff > 700:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(diff))
+
+    def is_fish(self, title: str) -> bool:
+        """Стоит ли загружать статью с таким заголовком"""
+        if matches_exclude_rules(title):
+            return False
+        return self.probability(title) >= self.threshold
+
+
+if __name__ == "__main__":
+    import sys
+
+    classifier = ArticleClassifier.from_catalog()
+    if not classifier.trained:
+        print(f"⚠ Каталог {CATALOG_PATH} не найден — работают только правила")
+    for title in sys.argv[1:] or ['Неон голубой', 'Компрессоры для аквариума: ТОП-5 лучших']:
+        verdict = "✅ рыба" if classifier.is_fish(title) else "❌ пропуск"
+        print(f"{verdict}  P={classifier.probability(title):.3f}  {title}")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Колоночное представление каталога для векторных расчетов на NumPy
+
+Числовые поля всех записей загружаются в массивы float64 (NaN — нет
+значения), категориальные — в массивы кодов. Используется проверкой
+каталога, заполнением пропусков и расчетами по аквариумам.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Числовые поля записи (water_params разворачиваются в плоские колонки)
+NUMERIC_FIELDS = [
+    'size_cm', 'min_tank_liters', 'bio_load_points', 'min_group_size', 'difficulty',
+    'ph_min', 'ph_max', 'temp_min', 'temp_max',
+]
+WATER_FIELDS = ['ph_min', 'ph_max', 'temp_min', 'temp_max']
+
+# Парсер ставит 0, когда значение не найдено: для этих полей 0 — пропуск
+ZERO_MEANS_MISSING = {'size_cm', 'min_tank_liters'}
+
+
+def normalize_family(name: str) -> str:
+    """Семейство для группировки: «Цихловые» и «цихловые» — одна группа"""
+    return re.sub(r'\s+', ' ', (name or '').lower().replace('ё', 'е')).strip()
+
+
+def genus_of(name_lat: str) -> str:
+    """Род из латинского названия (первое слово с заглавной буквы)"""
+    match = re.match(r'\s*([A-Z][a-z]+)\b', name_lat or '')
+    return match.group(1) if match else ''
+
+
+def _value(record: Dict, field: str):
+    if field in WATER_FIELDS:
+        return (record.get('water_params') or {}).get(field)
+    return record.get(field)
+
+
+class CatalogColumns:
+    """Числовые колонки и коды групп для списка записей каталога"""
+
+    def __init__(self, records: List[Dict]):
+        self.records = records
+        self.size = len(records)
+        self.ids = np.array([r.get('id', 0) for r in records], dtype=np.int64)
+        self.columns: Dict[str, np.ndarray] = {}
+        for field in NUMERIC_FIELDS:
+            column = np.full(self.size, np.nan)
+            for i, record in enumerate(records):
+                value = _value(record, field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    column[i] = value
+            if field in ZERO_MEANS_MISSING:
+                column[column == 0] = np.nan
+            self.columns[field] = column
+
+        self.family_names, self.family_codes = self._codes(
+            [normalize_family(r.get('family_group', '')) for r in records])
+        self.genus_names, self.genus_codes = self._codes(
+            [genus_of(r.get('name_lat', '')) for r in records])
+        self.types = np.array([r.get('type', '') for r in records])
+        # Записи парсера (есть URL статьи) — в отличие от выверенных вручную
+        self.scraped = np.array([bool(r.get('article_url')) for r in records], dtype=bool)
+
+    def imputed(self, field: str) -> np.ndarray:
+        """Маска записей, у которых поле заполнено impute_traits.py"""
+        return np.array([field in r.get('imputed_fields', ()) for r in self.records], dtype=bool)
+
+    @staticmethod
+    def _codes(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Коды категорий; пустое значение → -1"""
+        names, codes = np.unique(np.array(values, dtype=object).astype(str), return_inverse=True)
+        codes = codes.astype(np.int64)
+        empty = np.flatnonzero(names == '')
+        if empty.size:
+            codes[codes == empty[0]] = -1
+        return names, codes
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.columns[field]
+
+
+def group_median(values: np.ndarray, codes: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Медиана и число значений по группам без цикла по группам.
+    NaN и записи без группы (код -1) не учитываются.
+    """
+    mask = ~np.isnan(values) & (codes >= 0)
+    v = values[mask]
+    g = codes[mask]
+    order = np.lexsort((v, g))
+    v = v[order]
+    g = g[order]
+
+    counts = np.bincount(g, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    medians = np.full(n_groups, np.nan)
+    has = counts > 0
+    lo = starts[has] + (counts[has] - 1) // 2
+    hi = starts[has] + counts[has] // 2
+    medians[has] = (v[lo] + v[hi]) / 2
+    return medians, counts
+
+
+def robust_z(values: np.ndarray, codes: np.ndarray, n_groups: int,
+             min_group: int = 5, reference: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Робастная z-оценка внутри группы: 0.6745 * (x - медиана) / MAD.
+    Для групп меньше min_group и при MAD = 0 — NaN. reference — маска
+    значений, по которым считаются медиана и MAD (оценка — для всех).
+    """
+    sample = values if reference is None else np.where(reference, values, np.nan)
+    medians, counts = group_median(sample, codes, n_groups)
+    safe_codes = np.where(codes >= 0, codes, 0)
+    deviation = np.abs(values - medians[safe_codes])
+    mads, _ = group_median(np.where(np.isnan(sample), np.nan, deviation), codes, n_groups)
+
+    mad = mads[safe_codes]
+    valid = (codes >= 0) & (counts[safe_codes] >= min_group) & (mad > 0)
+    z = np.full(values.shape, np.nan)
+    z[valid] = 0.6745 * (values[valid] - medians[safe_codes][valid]) / mad[valid]
+    return z
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Индекс каталога для сопоставления внешних данных с записями fish_catalog.json
+
+Поиск записи за O(1) по URL статьи, нормализованному русскому или латинскому
+названию, и нечеткий поиск по общим словам названия через обратный индекс
+(«Гуппи Премиум» ↔ «Гуппи премиум (Poecilia reticulata)»). Если name_lat
+пуст, бином ищется в названии и описании (LatinNameExtractor из latin_names.py).
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+MIN_TOKEN_LENGTH = 3
+FUZZY_THRESHOLD = 0.6  # минимальный коэффициент Жаккара для нечеткого совпадения
+
+
+def normalize_name(name: str) -> str:
+    """Нормализует название для сравнения"""
+    name = (name or '').lower().replace('ё', 'е')
+    name = re.sub(r'[^\w\s]', ' ', name)
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+def latin_key(name_lat: str) -> str:
+    """Ключ бинома: род и вид строчными («Pterophyllum\xa0scalare Lichtenstein» → «pterophyllum scalare»)"""
+    words = [w for w in normalize_name(name_lat).split() if w.isascii() and w.isalpha()]
+    return ' '.join(words[:2]) if len(words) >= 2 else ''
+
+
+def name_tokens(name: str) -> set:
+    """Значимые слова названия"""
+    return {t for t in normalize_name(name).split() if len(t) >= MIN_TOKEN_LENGTH}
+
+
+def canonical_url(url: str) -> str:
+    """URL статьи без query/fragment, схема https, без завершающего слеша"""
+    if not url:
+        return ''
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', parts.netloc.lower(), path, '', ''))
+
+
+class CatalogIndex:
+    """Индексы по записям каталога: URL, названия, слова названия"""
+
+    def __init__(self, records: List[Dict], latin_extractor=None):
+        self.records = records
+        # LatinNameExtractor: бином из названия или описания, если name_lat пуст
+        self.latin_extractor = latin_extractor
+        self.by_url: Dict[str, Dict] = {}
+        self.by_name: Dict[str, Dict] = {}
+        self.by_latin: Dict[str, Dict] = {}
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.tokens: List[set] = []
+
+        for position, record in enumerate(records):
+            url = canonical_url(record.get('article_url', ''))
+            if url:
+                self.by_url.setdefault(url, record)
+            name = normalize_name(record.get('name_ru', ''))
+            if name:
+                self.by_name.setdefault(name, record)
+            latin = latin_key(record.get('name_lat', ''))
+            if not latin and latin_extractor is not None:
+                latin = latin_key(latin_extractor.extract(
+                    f"{record.get('name_ru', '')}\n{record.get('description_short', '')}"))
+            if latin:
+                self.by_latin.setdefault(latin, record)
+            tokens = name_tokens(record.get('name_ru', ''))
+            self.tokens.append(tokens)
+            for token in tokens:
+                self.postings[token].append(position)
+
+    def fuzzy(self, name: str) -> Optional[Dict]:
+        """Лучшее совпадение по словам названия (только если оно однозначно)"""
+        query = name_tokens(name)
+        if not query:
+            return None
+        overlap: Dict[int, int] = defaultdict(int)
+        for token in query:
+            for position in self.postings.get(token, ()):
+                overlap[position] += 1
+
+        best: List[Tuple[float, int]] = []
+        for position, common in overlap.items():
+            score = common / len(query | self.tokens[position])
+            if score >= FUZZY_THRESHOLD:
+                best.append((score, position))
+        if not best:
+            return None
+        best.sort(reverse=True)
+        if len(best) > 1 and best[0][0] == best[1][0] \
+                and self.records[best[0][1]] is not self.records[best[1][1]]:
+            return None  # неоднозначно
+        return self.records[best[0][1]]
+
+    def match(self, name: str = '', url: str = '', name_lat: str = '',
+              text: str = '') -> Tuple[Optional[Dict], str]:
+        """Найти запись; возвращает (запись, способ сопоставления)"""
+        url = canonical_url(url)
+        if url and url in self.by_url:
+            return self.by_url[url], 'url'
+        if not name_lat and self.latin_extractor is not None:
+            name_lat = self.latin_extractor.extract(f'{name}\n{text}')
+        latin = latin_key(name_lat)
+        if latin and latin in self.by_latin:
+            return self.by_latin[latin], 'latin'
+        normalized = normalize_name(name)
+        if normalized and normalized in self.by_name:
+            return self.by_name[normalized], 'name'
+        record = self.fuzzy(name)
+        if record is not None:
+            return record, 'fuzzy'
+        return None, ''
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Локальный HTTP-сервис каталога рыб (только стандартная библиотека)
+
+Фронтенд может загружать только нужные виды вместо всего каталога в сборке:
+    GET /api/species?type=freshwater&volume=240&difficulty=2&temperament=peaceful
+                    &ph=6.5-7.5&temp=25&q=неон&page=1&per_page=24
+    GET /api/species/<id>
+    GET /api/search?q=неон&limit=10
+    GET /api/health
+
+Ответы кэшируются (LRU) и отдаются с ETag: повторный запрос с
+If-None-Match получает 304 без тела. При Accept-Encoding: gzip тело
+сжимается. Файлы данных перечитываются при изменении.
+
+    python3 catalog_service.py [файлы.json ...] [--port 8787]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from catalog_store import load_catalog
+from community_solver import SPECIES_PATHS
+from search_index import SearchIndex
+from water_index import WaterIndex
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8787
+PER_PAGE = 24
+MAX_PER_PAGE = 100
+CACHE_SIZE = 256
+GZIP_MIN_BYTES = 1024
+RELOAD_CHECK_INTERVAL = 1.0  # с
+
+MARINE_TYPES = {'saltwater', 'marine'}
+DIFFICULTY_LEVELS = {'beginner': 1, 'intermediate': 2, 'advanced': 3}
+
+
+def temperament_category(temperament: str) -> str:
+    """Категория темперамента как convertTemperament во фронтенде"""
+    lower = (temperament or '').lower()
+    if 'мир' in lower or 'peace' in lower:
+        return 'peaceful'
+    if 'полу' in lower or 'террит' in lower or 'semi' in lower:
+        return 'semi-aggressive'
+    if 'агр' in lower or 'хищ' in lower or 'pred' in lower:
+        return 'aggressive'
+    return 'peaceful'
+
+
+def parse_range(value: str) -> Tuple[float, float]:
+    """'6.5-7.5' → (6.5, 7.5), '25' → (25, 25)"""
+    low, _, high = value.replace(',', '.').partition('-')
+    return float(low), float(high or low)
+
+
+class CatalogSnapshot:
+    """
+    Записи каталога и индексы одной версии файлов. Не меняется после
+    создания: запрос работает с одним снимком от начала до конца, даже
+    если каталог тем временем перечитан
+    """
+
+    def __init__(self, records: List[Dict], version: str = ''):
+        self.version = version
+        self.records = records
+        self.by_id = {str(r.get('id')): r for r in records}
+        self.water = WaterIndex(records, id_prefix='')
+        self.search_index = SearchIndex.build(records, id_prefix='')
+
+    def search(self, query: str) -> List[Dict]:
+        """Записи по поисковому индексу (названия, синонимы, описание), лучшие первыми"""
+        return [self.records[doc] for doc, _ in self.search_index.rank(query, limit=None)]
+
+    def filter(self, params: Dict[str, str]) -> List[Dict]:
+        """Записи, прошедшие все фильтры запроса"""
+        records = self.search(params['q']) if params.get('q') else self.records
+
+        water_ranges = {name: parse_range(params[name]) for name in ('ph', 'temp') if params.get(name)}
+        if water_ranges:
+            allowed = self.water.query('overlap', **water_ranges)
+            records = [r for r in records if str(r.get('id')) in allowed]
+
+        if params.get('type'):
+            wants_marine = params['type'] in MARINE_TYPES
+            records = [r for r in records if (r.get('type') in MARINE_TYPES) == wants_marine]
+        if params.get('volume'):
+            volume = float(params['volume'])
+            records = [r for r in records if (r.get('min_tank_liters') or 0) <= volume]
+        if params.get('difficulty'):
+            level = params['difficulty']
+            max_difficulty = DIFFICULTY_LEVELS.get(level) or int(level)
+            records = [r for r in records if (r.get('difficulty') or 1) <= max_difficulty]
+        if params.get('temperament'):
+            records = [r for r in records
+                       if temperament_category(r.get('temperament', '')) == params['temperament']]
+        return records
+
+
+class CatalogData:
+    """Текущий снимок каталога; перечитывается при изменении файлов"""
+
+    def __init__(self, paths: List[Path]):
+        self.paths = paths
+        self.lock = threading.Lock()
+        self.snapshot = CatalogSnapshot([])
+        self._checked_at = 0.0
+        self.reload_if_changed(force=True)
+
+    @property
+    def version(self) -> str:
+        return self.snapshot.version
+
+    @property
+    def records(self) -> List[Dict]:
+        return self.snapshot.records
+
+    def _fingerprint(self) -> str:
+        parts = []
+        for path in self.paths:
+            if path.exists():
+                stat = path.stat()
+                parts.append(f"{path}:{stat.st_mtime_ns}:{stat.st_size}")
+        return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+    def reload_if_changed(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return
+        with self.lock:
+            self._checked_at = now
+            fingerprint = self._fingerprint()
+            if fingerprint == self.version:
+                return
+            records = []
+            for path in self.paths:
+                if path.exists():
+                    records.extend(load_catalog(path))
+            # Снимок собирается целиком и подменяется одним присваиванием
+            self.snapshot = CatalogSnapshot(records, fingerprint)
+
+
+class ResponseCache:
+    """LRU готовых ответов: ключ → (ETag, тело, тело в gzip или None)"""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self.items: 'OrderedDict[tuple, Tuple[str, bytes, Optional[bytes]]]' = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[Tuple[str, bytes, Optional[bytes]]]:
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key: tuple, item: Tuple[str, bytes, Optional[bytes]]):
+        with self.lock:
+            self.items[key] = item
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+
+class CatalogService:
+    """Обработка запросов API поверх CatalogData"""
+
+    def __init__(self, data: CatalogData):
+        self.data = data
+        self.cache = ResponseCache()
+
+    def species_list(self, snapshot: CatalogSnapshot, params: Dict[str, str]) -> Dict:
+        records = snapshot.filter(params)
+        per_page = min(MAX_PER_PAGE, max(1, int(params.get('per_page', PER_PAGE))))
+        page = max(1, int(params.get('page', 1)))
+        start = (page - 1) * per_page
+        return {
+            'total': len(records),
+            'page': page,
+            'per_page': per_page,
+            'pages': (len(records) + per_page - 1) // per_page,
+            'items': records[start:start + per_page],
+        }
+
+    def search(self, snapshot: CatalogSnapshot, params: Dict[str, str]) -> Dict:
+        limit = min(MAX_PER_PAGE, max(1, int(params.get('limit', 10))))
+        records = snapshot.search(params.get('q', ''))[:limit]
+        return {'items': [{'id': r.get('id'), 'name_ru': r.get('name_ru', ''),
+                           'name_lat': r.get('name_lat', ''), 'image_url': r.get('image_url', '')}
+                          for r in records]}
+
+    def route(self, snapshot: CatalogSnapshot, path: str, params: Dict[str, str]) -> Tuple[HTTPStatus, Dict]:
+        """Путь → (статус, JSON-ответ)"""
+        parts = [p for p in path.split('/') if p]
+        try:
+            if parts == ['api', 'health']:
+                return HTTPStatus.OK, {'status': 'ok', 'records': len(snapshot.records),
+                                       'version': snapshot.version,
+                                       'cache': {'hits': self.cache.hits, 'misses': self.cache.misses}}
+            if parts == ['api', 'species']:
+                return HTTPStatus.OK, self.species_list(snapshot, params)
+            if len(parts) == 3 and parts[:2] == ['api', 'species']:
+                record = snapshot.by_id.get(parts[2])
+                if record is None:
+                    return HTTPStatus.NOT_FOUND, {'error': 'вид не найден'}
+                return HTTPStatus.OK, record
+            if parts == ['api', 'search']:
+                return HTTPStatus.OK, self.search(snapshot, params)
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {'error': f'неверный параметр: {e}'}
+        return HTTPStatus.NOT_FOUND, {'error': 'неизвестный адрес'}
+
+    def respond(self, path: str, params: Dict[str, str]) -> Tuple[HTTPStatus, str, bytes, Optional[bytes]]:
+        """
+        Ответ с ETag: (статус, ETag, тело, тело в gzip или None). Успешные
+        ответы берутся из кэша вместе со сжатым телом
+        """
+        self.data.reload_if_changed()
+        snapshot = self.data.snapshot
+        key = (snapshot.version, path, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return (HTTPStatus.OK, *cached)
+
+        status, payload = self.route(snapshot, path, params)
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        if status == HTTPStatus.OK and path != '/api/health':
+            self.cache.put(key, (etag, body, gzipped))
+        return status, etag, body, gzipped
+
+
+class CatalogRequestHandler(BaseHTTPRequestHandler):
+    service: CatalogService = None
+    quiet = False
+
+    def do_GET(self):
+        # http.server декодирует строку запроса как latin-1; браузеры кодируют %XX,
+        # а curl и консоль могут прислать UTF-8 как есть
+        url = urlsplit(self.path.encode('iso-8859-1', 'replace').decode('utf-8', 'replace'))
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        status, etag, body, gzipped_body = self.service.respond(url.path.rstrip('/') or '/', params)
+
+        if status == HTTPStatus.OK and etag in self.headers.get('If-None-Match', ''):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        gzipped = gzipped_body is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if gzipped:
+            body = gzipped_body
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')  # браузер переспрашивает с If-None-Match
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(paths: List[Path], host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                  quiet: bool = False) -> ThreadingHTTPServer:
+    """HTTP-сервер каталога (запуск — serve_forever())"""
+    handler = type('Handler', (CatalogRequestHandler,),
+                   {'service': CatalogService(CatalogData(paths)), 'quiet': quiet})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="HTTP-сервис каталога рыб")
+    arg_parser.add_argument('catalog', nargs='*', help="JSON с видами (по умолчанию src/data)")
+    arg_parser.add_argument('--host', default=DEFAULT_HOST)
+    arg_parser.add_argument('--port', type=int, default=int(os.environ.get('CATALOG_PORT', DEFAULT_PORT)))
+    arg_parser.add_argument('--quiet', action='store_true', help="не писать журнал запросов")
+    args = arg_parser.parse_args()
+
+    paths = [Path(p) for p in args.catalog] or SPECIES_PATHS
+    server = create_server(paths, args.host, args.port, args.quiet)
+    print(f"🐟 Каталог: {len(server.RequestHandlerClass.service.data.records)} видов")
+    print(f"🌐 http://{args.host}:{args.port}/api/species")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹ Остановлено")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Надежная запись каталога: атомарная замена файлов и журнал правок
+
+- atomic_write_text / atomic_write_json: запись во временный файл рядом
+  с целевым, fsync и rename. Прерванная запись не портит исходный файл.
+- CatalogPatcher: правки записей (id → поля) копятся в памяти и журнале
+  (JSON Lines), а каталог переписывается один раз в commit(). После сбоя
+  журнал подхватывается при следующем запуске, и работа продолжается.
+- RecordJournal: записи целиком в файле JSON Lines; каталог собирается из
+  него потоково, в памяти одновременно одна запись (долгий обход).
+- iter_catalog: чтение каталога по одной записи, без загрузки файла целиком.
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Union
+
+PathLike = Union[str, Path]
+
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_SYNC_EVERY = 20  # fsync журнала раз в N правок
+READ_CHUNK = 1 << 16     # iter_catalog читает файл кусками по 64 КБ
+
+
+def _fsync_directory(directory: Path):
+    """Зафиксировать rename на диске (на Windows не поддерживается)"""
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+@contextmanager
+def _atomic_file(path: PathLike, encoding: str = 'utf-8') -> Iterator[IO[str]]:
+    """Файл для записи: временный рядом с целевым, после закрытия — fsync и rename"""
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            os.chmod(tmp_name, path.stat().st_mode & 0o777)
+        else:
+            os.chmod(tmp_name, 0o666 & ~_current_umask())  # mkstemp создает файл с правами 0600
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    _fsync_directory(path.parent)
+
+
+def atomic_write_text(path: PathLike, text: str, encoding: str = 'utf-8'):
+    """Записать текст через временный файл + fsync + rename"""
+    with _atomic_file(path, encoding) as f:
+        f.write(text)
+
+
+def atomic_write_chunks(path: PathLike, chunks: Iterable[str], encoding: str = 'utf-8'):
+    """Как atomic_write_text, но текст приходит частями (не собирается в памяти целиком)"""
+    with _atomic_file(path, encoding) as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+def atomic_write_json(path: PathLike, data: Any, indent: Optional[int] = 2):
+    """Атомарно записать JSON (формат как у json.dump в остальных скриптах)"""
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+
+def atomic_write_records(path: PathLike, records: Iterable[Dict], indent: Optional[int] = 2) -> int:
+    """
+    Атомарно записать JSON-массив записей, получая их по одной (генератор,
+    журнал, выборка из базы). Результат побайтно совпадает с atomic_write_json.
+    """
+    count = 0
+
+    def chunks() -> Iterator[str]:
+        nonlocal count
+        for record in records:
+            text = json.dumps(record, ensure_ascii=False, indent=indent)
+            if indent is None:
+                yield ('[' if not count else ', ') + text
+            else:
+                pad = ' ' * indent
+                yield ('[\n' if not count else ',\n') + pad + text.replace('\n', '\n' + pad)
+            count += 1
+        yield '[]' if not count else ('\n]' if indent is not None else ']')
+
+    atomic_write_chunks(path, chunks())
+    return count
+
+
+def load_catalog(path: PathLike) -> List[Dict]:
+    """Прочитать каталог"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_catalog(path: PathLike) -> Iterator[Dict]:
+    """
+    Записи каталога (JSON-массив) по одной: в памяти — текущая запись и
+    непрочитанный остаток куска файла, а не весь каталог
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, position, eof = '', 0, False
+        started = False
+
+        def fill() -> bool:
+            nonlocal buffer, position, eof
+            chunk = f.read(READ_CHUNK)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            return bool(chunk)
+
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(buffer):
+                if not fill():
+                    raise ValueError(f"{path}: каталог оборван")
+                continue
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError(f"{path}: каталог — не JSON-массив")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Запись не уместилась в прочитанное: дочитываем и разбираем заново
+                if eof or not fill():
+                    raise
+                continue
+            position = end
+            yield record
+
+
+class CatalogPatcher:
+    """
+    Правки записей каталога с журналом и одной атомарной записью в конце
+
+        patcher = CatalogPatcher(OUTPUT_PATH)
+        recovered = patcher.apply_pending(catalog_data)  # правки прерванного запуска
+        patcher.patch(record_id, image_url=new_image)
+        patcher.commit(catalog_data)
+    """
+
+    def __init__(self, output_path: PathLike, key: str = 'id',
+                 journal_path: Optional[PathLike] = None):
+        self.output_path = Path(output_path)
+        self.key = key
+        self.journal_path = Path(journal_path) if journal_path else \
+            self.output_path.with_name(self.output_path.name + JOURNAL_SUFFIX)
+        self.pending: Dict[Any, Dict[str, Any]] = {}
+        self._journal = None
+        self._unsynced = 0
+        self._recover()
+
+    def _recover(self):
+        """Загрузить правки из журнала прерванного запуска"""
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # оборванная последняя строка
+                self.pending.setdefault(entry['key'], {}).update(entry['fields'])
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def patch(self, record_key: Any, **fields):
+        """Добавить правку записи (в память и журнал)"""
+        self.pending.setdefault(record_key, {}).update(fields)
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.write(json.dumps({'key': record_key, 'fields': fields}, ensure_ascii=False) + '\n')
+        self._unsynced += 1
+        if self._unsynced >= JOURNAL_SYNC_EVERY:
+            self.sync()
+
+    def sync(self):
+        """Сбросить журнал на диск"""
+        if self._journal is not None:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+
+    def apply_pending(self, records: List[Dict]) -> int:
+        """Применить накопленные правки к записям в памяти; возвращает число записей"""
+        applied = 0
+        for record in records:
+            fields = self.pending.get(record.get(self.key))
+            if fields:
+                record.update(fields)
+                applied += 1
+        return applied
+
+    def commit(self, records: Optional[List[Dict]] = None) -> int:
+        """
+        Применить все правки и атомарно записать каталог.
+        Если records не переданы, каталог читается из output_path.
+        """
+        if records is None:
+            records = load_catalog(self.output_path)
+        applied = self.apply_pending(records)
+        atomic_write_json(self.output_path, records)
+        self.close()
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        self.pending.clear()
+        return applied
+
+    def close(self):
+        """Закрыть журнал (правки остаются в нем до commit)"""
+        if self._journal is not None:
+            self.sync()
+            self._journal.close()
+            self._journal = None
+
+    def __enter__(self) -> 'CatalogPatcher':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # При ошибке журнал сохраняется для следующего запуска
+        self.close()
+
+
+class RecordJournal:
+    """
+    Записи каталога в файле JSON Lines: дозапись по одной, чтение по смещению
+    и потоковая сборка каталога
+
+        journal = RecordJournal('fish_catalog.jsonl')
+        offset = journal.append(record)
+        journal.write_catalog('fish_catalog.json')  # тот же формат, что atomic_write_json
+    """
+
+    def __init__(self, path: PathLike, truncate: bool = True):
+        self.path = Path(path)
+        self._file = open(self.path, 'w+b' if truncate else 'a+b')
+        if not truncate:
+            self._drop_partial_tail()
+        self.count = 0 if truncate else sum(1 for _ in self._lines())
+        self._unsynced = 0
+
+    def _drop_partial_tail(self):
+        """Обрезать строку, оборванную сбоем: иначе новая запись допишется к ней"""
+        size = self._file.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - READ_CHUNK)
+            self._file.seek(start)
+            newline = self._file.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            self._file.truncate(end)
+
+    def append_line(self, line: str) -> int:
+        """Дописать готовую строку JSON; возвращает ее смещение"""
+        offset = self._file.seek(0, os.SEEK_END)
+        self._file.write(line.encode('utf-8') + b'\n')
+        self.count += 1
+        self._unsynced += 1
+        if self._unsynced >= JOURNAL_SYNC_EVERY:
+            self.sync()
+        return offset
+
+    def append(self, record: Dict) -> int:
+        return self.append_line(json.dumps(record, ensure_ascii=False))
+
+    def read_line(self, offset: int) -> str:
+        self._file.flush()
+        self._file.seek(offset)
+        return self._file.readline().decode('utf-8').rstrip('\n')
+
+    def read(self, offset: int) -> Dict:
+        return json.loads(self.read_line(offset))
+
+    def _lines(self) -> Iterator[bytes]:
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            if line.endswith(b'\n'):  # оборванная последняя строка после сбоя пропускается
+                yield line
+
+    def __iter__(self) -> Iterator[Dict]:
+        for line in self._lines():
+            yield json.loads(line)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def write_catalog(self, output_path: PathLike, indent: Optional[int] = 2) -> int:
+        """Атомарно записать каталог (JSON-массив) из журнала, по записи за раз"""
+        return atomic_write_records(output_path, self, indent)
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def remove(self):
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
+
+    def __enter__(self) -> 'RecordJournal':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
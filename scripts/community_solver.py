@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Подбор совместимых сообществ рыб на битовых множествах
+
+Каждый вид — бит в целом числе Python. Для вида хранится маска
+совместимых с ним видов:
+- теги несовместимости по INCOMPATIBILITY_MATRIX (src/utils/compatibilityMatrix.ts),
+  в обе стороны, как areFishCompatible
+- пересечение диапазонов pH и температуры (нет данных — не конфликт)
+
+Маски строятся за O(n·t) по тегам и O(n log n) по диапазонам вместо
+попарного перебора O(n²·t²) в buildCompatibilityMatrix.
+
+Решатель перебирает максимальные совместимые наборы (Брон–Кербош),
+которые помещаются в бюджет биологической нагрузки, и отсекает ветви
+оценкой сверху (дробный рюкзак), оставляя top лучших наборов.
+
+    python3 community_solver.py --volume 240
+    python3 community_solver.py ../fish_catalog.json --bench
+"""
+
+import argparse
+import heapq
+import re
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from catalog_arrays import CatalogColumns
+from catalog_store import load_catalog
+
+BASE_DIR = Path(__file__).parent.parent
+DATA_DIR = BASE_DIR / 'src' / 'data'
+MATRIX_PATH = BASE_DIR / 'src' / 'utils' / 'compatibilityMatrix.ts'
+SPECIES_PATHS = [DATA_DIR / 'freshwater_species.json', DATA_DIR / 'marine_species.json']
+
+BIO_LOAD_PER_LITER = 0.3   # бюджет нагрузки: ~1 см рыбы на 2 л при bio_load ≈ 0.6 × размер
+MAX_NODES = 200000         # ограничение перебора для очень больших пулов
+RANGE_FIELDS = [('ph_min', 'ph_max'), ('temp_min', 'temp_max')]
+
+
+def parse_incompatibility_matrix(path: Path = MATRIX_PATH) -> Dict[str, List[str]]:
+    """INCOMPATIBILITY_MATRIX из compatibilityMatrix.ts: тег → несовместимые теги"""
+    text = Path(path).read_text(encoding='utf-8')
+    body = re.search(r'INCOMPATIBILITY_MATRIX[^=]*=\s*\{(.*?)\n\};', text, re.S)
+    if not body:
+        raise ValueError(f"INCOMPATIBILITY_MATRIX не найдена в {path}")
+    return {tag: re.findall(r"'([^']+)'", values)
+            for tag, values in re.findall(r"'([^']+)':\s*\[([^\]]*)\]", body.group(1))}
+
+
+def load_species(paths: Sequence[Path] = SPECIES_PATHS) -> List[Dict]:
+    """Все виды из JSON-файлов src/data"""
+    species = []
+    for path in paths:
+        if Path(path).exists():
+            species.extend(load_catalog(path))
+    return species
+
+
+def group_loads(cols: CatalogColumns) -> Tuple[np.ndarray, np.ndarray]:
+    """Размер группы (min_group_size, не меньше 1) и нагрузка группы"""
+    counts = np.maximum(1, np.nan_to_num(cols['min_group_size'], nan=1)).astype(int)
+    loads = np.nan_to_num(cols['bio_load_points'], nan=1) * counts
+    return counts, loads
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Номера установленных битов по возрастанию"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _cumulative_masks(order: Sequence[int]) -> List[int]:
+    """masks[k] — биты первых k видов из order"""
+    masks = [0]
+    for index in order:
+        masks.append(masks[-1] | (1 << index))
+    return masks
+
+
+def tag_conflict_masks(records: List[Dict], matrix: Dict[str, List[str]]) -> List[int]:
+    """Маски видов, несовместимых по тегам (в обе стороны)"""
+    species_with_tag: Dict[str, int] = defaultdict(int)
+    for index, record in enumerate(records):
+        for tag in record.get('incompatible_tags', ()):
+            species_with_tag[tag] |= 1 << index
+
+    # Тег t конфликтует с тегами matrix[t] и с тегами, у которых t в списке
+    related: Dict[str, set] = defaultdict(set)
+    for tag, others in matrix.items():
+        for other in others:
+            related[tag].add(other)
+            related[other].add(tag)
+    conflicts_of_tag = {tag: 0 for tag in related}
+    for tag, others in related.items():
+        for other in others:
+            conflicts_of_tag[tag] |= species_with_tag.get(other, 0)
+
+    masks = []
+    for record in records:
+        mask = 0
+        for tag in record.get('incompatible_tags', ()):
+            mask |= conflicts_of_tag.get(tag, 0)
+        masks.append(mask)
+    return masks
+
+
+def interval_conflict_masks(low: np.ndarray, high: np.ndarray) -> List[int]:
+    """
+    Маски видов с непересекающимся диапазоном [low, high].
+    Диапазоны j не пересекаются с i, если low_j > high_i или high_j < low_i:
+    оба множества — префиксы сортировок по low и high.
+    """
+    low = np.nan_to_num(low, nan=-np.inf)
+    high = np.nan_to_num(high, nan=np.inf)
+    by_low = np.argsort(low, kind='stable')
+    by_high = np.argsort(high, kind='stable')
+    lows_sorted = low[by_low].tolist()
+    highs_sorted = high[by_high].tolist()
+    # Виды с low выше порога — суффикс by_low; храним префиксы обратного порядка
+    above = _cumulative_masks(by_low[::-1].tolist())
+    below = _cumulative_masks(by_high.tolist())
+
+    n = len(low)
+    masks = []
+    for i in range(n):
+        higher = n - bisect_right(lows_sorted, high[i])
+        lower = bisect_left(highs_sorted, low[i])
+        masks.append(above[higher] | below[lower])
+    return masks
+
+
+class SolveResult(NamedTuple):
+    sets: List[Tuple[float, float, Tuple[int, ...]]]  # (оценка, нагрузка, индексы видов)
+    nodes: int
+    complete: bool  # False — перебор остановлен по max_nodes
+
+
+class CommunitySolver:
+    """Совместимость видов на битовых масках и поиск лучших наборов"""
+
+    def __init__(self, records: List[Dict], matrix: Dict[str, List[str]],
+                 weights: Optional[np.ndarray] = None):
+        self.size = len(records)
+        cols = CatalogColumns(records)
+        counts, loads = group_loads(cols)
+        loads = np.maximum(loads, 1e-9)
+        weights = np.ones(self.size) if weights is None else np.asarray(weights, dtype=float)
+
+        # Внутренняя нумерация — по убыванию вес/нагрузка: младший бит маски
+        # кандидатов всегда лучший вид для ветвления и для оценки сверху
+        self.order = np.argsort(-weights / loads, kind='stable')
+        self.position = np.empty(self.size, dtype=np.int64)
+        self.position[self.order] = np.arange(self.size)
+        records = [records[i] for i in self.order]
+        self.counts = counts[self.order]
+        self.loads = loads[self.order].tolist()
+        self.weights = weights[self.order].tolist()
+        self._integral = all(float(w).is_integer() for w in self.weights)
+
+        conflicts = tag_conflict_masks(records, matrix)
+        for low_field, high_field in RANGE_FIELDS:
+            low, high = cols[low_field][self.order], cols[high_field][self.order]
+            for i, mask in enumerate(interval_conflict_masks(low, high)):
+                conflicts[i] |= mask
+        full = (1 << self.size) - 1
+        self.compatible = [full & ~mask & ~(1 << i) for i, mask in enumerate(conflicts)]
+
+        by_load = sorted(range(self.size), key=self.loads.__getitem__)
+        self._loads_sorted = [self.loads[i] for i in by_load]
+        self._fits = _cumulative_masks(by_load)
+
+    def is_compatible(self, i: int, j: int) -> bool:
+        """Совместимы ли виды i и j (индексы во входном списке)"""
+        return bool(self.compatible[self.position[i]] >> int(self.position[j]) & 1)
+
+    def fits_mask(self, budget: float) -> int:
+        """Виды, группа которых помещается в оставшийся бюджет"""
+        return self._fits[bisect_right(self._loads_sorted, budget + 1e-9)]
+
+    def _bound(self, candidates: int, budget: float) -> float:
+        """Оценка сверху: дробный рюкзак по кандидатам (биты уже в нужном порядке)"""
+        total = 0.0
+        for index in iter_bits(candidates):
+            load = self.loads[index]
+            if load <= budget:
+                total += self.weights[index]
+                budget -= load
+            else:
+                total += self.weights[index] * budget / load
+                break
+        # При целых весах оценку можно округлить вниз
+        return float(int(total + 1e-9)) if self._integral else total
+
+    def solve(self, budget: float, candidates: Optional[Sequence[int]] = None,
+              top: int = 5, max_nodes: int = MAX_NODES) -> SolveResult:
+        """
+        Лучшие по сумме весов максимальные наборы совместимых видов,
+        суммарная нагрузка групп которых не превышает budget
+        """
+        pool = (1 << self.size) - 1 if candidates is None else \
+            sum(1 << int(self.position[i]) for i in candidates)
+        best: List[Tuple[float, float, Tuple[int, ...]]] = []  # min-куча
+        nodes = 0
+
+        def threshold() -> float:
+            return best[0][0] if len(best) >= top else -1.0
+
+        def expand(chosen: Tuple[int, ...], load: float, score: float, p: int, x: int) -> bool:
+            nonlocal nodes
+            nodes += 1
+            if nodes > max_nodes:
+                return False
+            fit = self.fits_mask(budget - load)
+            p &= fit
+            if not p:
+                if chosen and not (x & fit):  # ничего совместимого больше не помещается
+                    entry = (score, load, tuple(sorted(int(self.order[i]) for i in chosen)))
+                    if len(best) < top:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+                return True
+            while p:
+                if score + self._bound(p, budget - load) <= threshold():
+                    return True
+                # Ветвимся по лучшему виду (младший бит)
+                bit = p & -p
+                index = bit.bit_length() - 1
+                if not expand(chosen + (index,), load + self.loads[index],
+                              score + self.weights[index],
+                              p & self.compatible[index], x & self.compatible[index]):
+                    return False
+                p ^= bit
+                x |= bit
+            return True
+
+        complete = expand((), 0.0, 0.0, pool, 0)
+        sets = sorted(best, reverse=True)
+        return SolveResult([(float(s), float(l), members) for s, l, members in sets], nodes, complete)
+
+    def group_size(self, index: int) -> int:
+        """Размер группы вида (индекс во входном списке)"""
+        return int(self.counts[self.position[index]])
+
+
+def naive_compatibility(records: List[Dict], matrix: Dict[str, List[str]]) -> int:
+    """Попарная проверка тегов как в buildCompatibilityMatrix (для бенчмарка)"""
+    conflicts = 0
+    for fish1 in records:
+        for fish2 in records:
+            if fish1 is fish2:
+                continue
+            tags1 = fish1.get('incompatible_tags', [])
+            tags2 = fish2.get('incompatible_tags', [])
+            if any(t2 in matrix.get(t1, []) for t1 in tags1 for t2 in tags2) or \
+                    any(t1 in matrix.get(t2, []) for t2 in tags2 for t1 in tags1):
+                conflicts += 1
+    return conflicts
+
+
+def benchmark(records: List[Dict], matrix: Dict[str, List[str]], volumes=(100, 240, 300)):
+    """Время построения масок и поиска наборов на пуле видов"""
+    print(f"Видов: {len(records)}")
+    started = time.perf_counter()
+    naive_compatibility(records, matrix)
+    naive_ms = (time.perf_counter() - started) * 1000
+    print(f"  попарная проверка тегов (как в TS):  {naive_ms:9.1f} мс")
+
+    started = time.perf_counter()
+    solver = CommunitySolver(records, matrix)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"  битовые маски (теги + pH/темп.):     {build_ms:9.1f} мс")
+
+    for volume in volumes:
+        started = time.perf_counter()
+        result = solver.solve(volume * BIO_LOAD_PER_LITER)
+        solve_ms = (time.perf_counter() - started) * 1000
+        best = result.sets[0] if result.sets else (0, 0, ())
+        status = "" if result.complete else " (остановлен по max_nodes)"
+        print(f"  {volume:4} л: {solve_ms:9.1f} мс, узлов {result.nodes:7}, "
+              f"лучший набор {len(best[2])} видов{status}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Подбор совместимых сообществ рыб")
+    arg_parser.add_argument('species', nargs='*', help="JSON с видами (по умолчанию src/data)")
+    arg_parser.add_argument('--volume', type=int, default=240, help="объем аквариума, л")
+    arg_parser.add_argument('--top', type=int, default=5, help="сколько наборов показать")
+    arg_parser.add_argument('--bench', action='store_true', help="замерить скорость")
+    args = arg_parser.parse_args()
+
+    records = load_species(args.species or SPECIES_PATHS)
+    matrix = parse_incompatibility_matrix()
+    if args.bench:
+        benchmark(records, matrix)
+        return
+
+    solver = CommunitySolver(records, matrix)
+    result = solver.solve(args.volume * BIO_LOAD_PER_LITER, top=args.top)
+    print(f"Объем {args.volume} л, бюджет нагрузки {args.volume * BIO_LOAD_PER_LITER:.0f}, "
+          f"узлов перебора: {result.nodes}")
+    for score, load, members in result.sets:
+        names = ', '.join(f"{records[i].get('name_ru', '')} ×{solver.group_size(i)}" for i in members)
+        print(f"  [{score:.0f} видов, нагрузка {load:.0f}] {names}")
+
+
+if __name__ == "__main__":
+    main()
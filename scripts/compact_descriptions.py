@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сжатие описаний (description_short): убираем шаблонный текст сайта
+
+description_short собирается из первых абзацев или начала текста статьи
+и содержит повторы заголовка, подписи «… фото», пустые строки и фразы,
+одинаковые во многих статьях. Этап очистки:
+- находит n-граммы слов, встречающиеся во многих статьях (шаблоны сайта),
+  и удаляет предложения, почти целиком из них состоящие; предложения с
+  числами, единицами (°C, pH, л, см) и названиями параметров остаются:
+  «Температура воды: 24-26.» одинакова по словам у многих видов, но
+  значения у каждого свои
+- удаляет повторы заголовка и подписи к фото
+- нормализует пробелы и обрезает текст по границе предложения
+
+Сжатые записи отмечаются description_compacted и при повторном запуске
+не меняются: шаблоны, найденные по уже сжатым текстам, другие, и второй
+проход удалял бы новые предложения. Запись, загруженная парсером заново,
+отметки не имеет и сжимается.
+
+Полный текст статей хранится в fulltext_index.py, поэтому сокращение
+не теряет данные для поиска.
+
+    python3 compact_descriptions.py [fish_catalog.json] [--max-chars 600] [--dry-run]
+"""
+
+import argparse
+import json
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from catalog_index import normalize_name
+from catalog_store import atomic_write_json, load_catalog
+
+CATALOG_PATH = Path(__file__).parent.parent / 'fish_catalog.json'
+
+NGRAM_SIZE = 4
+BOILERPLATE_MIN_DOCS = 5        # n-грамма в стольких статьях...
+BOILERPLATE_MIN_SHARE = 0.02    # ...и не менее чем в 2% — шаблон
+BOILERPLATE_COVERAGE = 0.6      # доля слов предложения в шаблонных n-граммах
+MAX_CHARS = 600
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+(?=[«"(A-ZА-ЯЁ0-9])')
+_SPACES = re.compile(r'[ \t\r\f\v\xa0\u200b]+')
+_PHOTO_CAPTION = re.compile(r'\bфото\s*$', re.IGNORECASE)
+# Числа, единицы и названия параметров — данные вида, а не шаблон сайта
+_DATA_SENTENCE = re.compile(
+    r'\d|°|\bp[hн]\b|\b(?:л|см|мм|dgh|gh|kh)\b|литр|температур|жесткост|жёсткост|кислотност|'
+    r'размер|длин|объем|объём|грамм', re.IGNORECASE)
+COMPACTED_FLAG = 'description_compacted'
+
+
+def split_sentences(text: str) -> List[str]:
+    """Строки статьи → предложения (строка без точки — отдельное предложение)"""
+    sentences = []
+    for line in (text or '').split('\n'):
+        line = _SPACES.sub(' ', line).strip()
+        if line:
+            sentences.extend(s.strip() for s in _SENTENCE_END.split(line) if s.strip())
+    return sentences
+
+
+def ngrams(words: List[str], n: int = NGRAM_SIZE) -> List[Tuple[str, ...]]:
+    return [tuple(words[i:i + n]) for i in range(len(words) - n + 1)]
+
+
+def learn_boilerplate(texts: List[str], n: int = NGRAM_SIZE) -> Set[Tuple[str, ...]]:
+    """n-граммы, встречающиеся во многих разных статьях"""
+    unique_texts = set(texts)  # дубликаты статей не должны превращать текст в шаблон
+    document_frequency: Counter = Counter()
+    for text in unique_texts:
+        document_frequency.update(set(ngrams(normalize_name(text).split(), n)))
+    min_docs = max(BOILERPLATE_MIN_DOCS, int(len(unique_texts) * BOILERPLATE_MIN_SHARE))
+    return {gram for gram, count in document_frequency.items() if count >= min_docs}
+
+
+def has_data(sentence: str) -> bool:
+    """Предложение с числами, единицами или параметрами содержания"""
+    return bool(_DATA_SENTENCE.search(sentence))
+
+
+def boilerplate_coverage(sentence: str, boilerplate: Set[Tuple[str, ...]], n: int = NGRAM_SIZE) -> float:
+    """Доля слов предложения, входящих хотя бы в одну шаблонную n-грамму"""
+    words = normalize_name(sentence).split()
+    if len(words) < n:
+        return 0.0
+    covered = [False] * len(words)
+    for i, gram in enumerate(ngrams(words, n)):
+        if gram in boilerplate:
+            covered[i:i + n] = [True] * n
+    return sum(covered) / len(words)
+
+
+def is_title_echo(sentence: str, title_words: List[str]) -> bool:
+    """Повтор заголовка или подпись к фото («Барбус огненный фото»)"""
+    words = normalize_name(sentence).split()
+    if not words:
+        return True
+    if _PHOTO_CAPTION.search(sentence) and len(words) <= len(title_words) + 3:
+        return True
+    return bool(title_words) and words == title_words
+
+
+def strip_title_prefix(sentence: str, title: str) -> str:
+    """«Барбус огненный Барбус огненный — рыба…» → «Барбус огненный — рыба…»"""
+    if title and sentence.lower().startswith(f'{title.lower()} {title.lower()}'):
+        return sentence[len(title) + 1:]
+    return sentence
+
+
+def trim_to_sentences(sentences: List[str], max_chars: int) -> str:
+    """Целые предложения в пределах max_chars; первое длинное режется по слову"""
+    text = ''
+    for sentence in sentences:
+        candidate = f'{text} {sentence}' if text else sentence
+        if len(candidate) > max_chars:
+            break
+        text = candidate
+    if not text and sentences:
+        text = sentences[0][:max_chars - 1].rsplit(' ', 1)[0].rstrip(' ,;:—-') + '…'
+    return text
+
+
+def compact_description(text: str, title: str, boilerplate: Set[Tuple[str, ...]],
+                        max_chars: int = MAX_CHARS) -> str:
+    title_words = normalize_name(title).split()
+    kept = []
+    for sentence in split_sentences(text):
+        if is_title_echo(sentence, title_words):
+            continue
+        if not has_data(sentence) and boilerplate_coverage(sentence, boilerplate) >= BOILERPLATE_COVERAGE:
+            continue
+        sentence = strip_title_prefix(sentence, title)
+        if sentence not in kept:
+            kept.append(sentence)
+    return trim_to_sentences(kept, max_chars)
+
+
+def _json_size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+
+
+def compact_catalog(records: List[Dict], max_chars: int = MAX_CHARS) -> Dict:
+    """
+    Сжать description_short у записей, еще не отмеченных COMPACTED_FLAG;
+    возвращает статистику в байтах. Шаблоны ищутся по всем описаниям.
+    """
+    started = time.perf_counter()
+    catalog_before = _json_size(records)
+    descriptions_before = sum(_json_size(r.get('description_short', '')) for r in records)
+
+    boilerplate = learn_boilerplate([r.get('description_short', '') for r in records])
+    changed = skipped = 0
+    for record in records:
+        if record.get(COMPACTED_FLAG):
+            skipped += 1
+            continue
+        text = record.get('description_short', '')
+        compacted = compact_description(text, record.get('name_ru', ''), boilerplate, max_chars)
+        if compacted != text:
+            record['description_short'] = compacted
+            changed += 1
+        record[COMPACTED_FLAG] = True
+
+    return {
+        'records': len(records),
+        'changed': changed,
+        'skipped': skipped,
+        'boilerplate_ngrams': len(boilerplate),
+        'descriptions_before': descriptions_before,
+        'descriptions_after': sum(_json_size(r.get('description_short', '')) for r in records),
+        'catalog_before': catalog_before,
+        'catalog_after': _json_size(records),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000),
+    }
+
+
+def _savings(before: int, after: int) -> str:
+    saved = before - after
+    share = saved / before * 100 if before else 0.0
+    return f"{before / 1024:8.0f} КБ → {after / 1024:6.0f} КБ  (−{saved / 1024:.0f} КБ, {share:.0f}%)"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Сжатие описаний рыб")
+    arg_parser.add_argument('catalog', nargs='?', default=str(CATALOG_PATH), help="путь к каталогу")
+    arg_parser.add_argument('--output', help="куда сохранить (по умолчанию — тот же файл)")
+    arg_parser.add_argument('--max-chars', type=int, default=MAX_CHARS, help="максимальная длина описания")
+    arg_parser.add_argument('--dry-run', action='store_true', help="только статистика, без записи")
+    args = arg_parser.parse_args()
+
+    records = load_catalog(args.catalog)
+    stats = compact_catalog(records, args.max_chars)
+
+    print("=" * 60)
+    print("СЖАТИЕ ОПИСАНИЙ")
+    print("=" * 60)
+    print(f"Записей: {stats['records']}, изменено: {stats['changed']}, "
+          f"уже сжаты: {stats['skipped']} ({stats['elapsed_ms']} мс)")
+    print(f"Шаблонных {NGRAM_SIZE}-грамм: {stats['boilerplate_ngrams']}")
+    print(f"Описания: {_savings(stats['descriptions_before'], stats['descriptions_after'])}")
+    print(f"Каталог:  {_savings(stats['catalog_before'], stats['catalog_after'])}")
+
+    if args.dry_run:
+        return
+    output = args.output or args.catalog
+    atomic_write_json(output, records)
+    print(f"\n💾 Сохранено: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Приоритетный фронтир обхода: статьи с самыми ценными пробелами — первыми
+
+Запрос к сайту стоит секунду паузы, поэтому запуск с ограниченным
+бюджетом (--budget) должен тратить его на записи, где данных не хватает
+больше всего. Сигналы (веса — WEIGHTS):
+- no_image: вид из FISH_WITHOUT_IMAGES.txt (нет фото в приложении);
+- package: вид входит в наборы комплектов Bio-cube
+  (packageRecommendations.json, построен по aquariumPackages.ts);
+- new: статьи еще нет в каталоге;
+- missing_image: у записи нет своего фото (пусто, баннер, заглушка);
+- no_name_lat, no_size: пустые name_lat / size_cm;
+- stale: давность загрузки (fetched_at), до STALE_DAYS дней; записи
+  без fetched_at загружались до появления поля и считаются самыми старыми.
+
+Виды сопоставляются с записями каталога через CatalogIndex (URL,
+латинское и русское название, нечетко по словам).
+
+    python3 crawl_frontier.py                 # 20 самых ценных статей
+    python3 crawl_frontier.py --limit 100 --json
+
+Фронтир используют fanfishka_parser.py --priority/--budget,
+crawl_queue.py seed --priority и extract_images_only.py.
+"""
+
+import argparse
+import heapq
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from catalog_index import CatalogIndex, canonical_url
+from catalog_store import load_catalog
+
+BASE_DIR = Path(__file__).parent.parent
+CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
+WITHOUT_IMAGES_PATH = BASE_DIR / 'FISH_WITHOUT_IMAGES.txt'
+RECOMMENDATIONS_PATH = BASE_DIR / 'src' / 'data' / 'packageRecommendations.json'
+SPECIES_PATHS = [BASE_DIR / 'src' / 'data' / 'freshwater_species.json',
+                 BASE_DIR / 'src' / 'data' / 'marine_species.json']
+
+WEIGHTS = {
+    'no_image': 5.0,
+    'package': 4.0,
+    'new': 3.0,
+    'stale': 3.0,          # максимум, набирается линейно за STALE_DAYS
+    'missing_image': 2.0,
+    'no_name_lat': 2.0,
+    'no_size': 1.5,
+}
+STALE_DAYS = 365
+PLACEHOLDER_IMAGES = ('sovmestimost_akvaryb.png', 'баннер', 'banner')
+
+# «   Неон Голубой (Paracheirodon innesi)» — строка вида в FISH_WITHOUT_IMAGES.txt
+_SPECIES_LINE = re.compile(r'^\s*(\S.*?)\s+\(([A-Z][a-z]+(?: [a-z]+)+)\)\s*$')
+
+
+@dataclass
+class FrontierItem:
+    url: str
+    score: float
+    reasons: List[str] = field(default_factory=list)
+    record: Optional[Dict] = None
+
+
+def needs_image(record: Dict) -> bool:
+    """Нет своего фото: пусто, баннер или общая заглушка сайта"""
+    image_url = (record.get('image_url') or '').strip().lower()
+    return not image_url or any(marker in image_url for marker in PLACEHOLDER_IMAGES)
+
+
+def staleness(record: Dict, now: datetime) -> float:
+    """0 — загружена только что, 1 — STALE_DAYS назад или раньше (или неизвестно когда)"""
+    fetched_at = record.get('fetched_at')
+    if not fetched_at:
+        return 1.0
+    try:
+        fetched = datetime.fromisoformat(fetched_at)
+    except ValueError:
+        return 1.0
+    if fetched.tzinfo is None:
+        fetched = fetched.replace(tzinfo=timezone.utc)
+    return min(1.0, max(0.0, (now - fetched).total_seconds() / 86400 / STALE_DAYS))
+
+
+def parse_without_images(path: Path = WITHOUT_IMAGES_PATH) -> List[Tuple[str, str]]:
+    """(русское, латинское название) видов из FISH_WITHOUT_IMAGES.txt"""
+    if not Path(path).exists():
+        return []
+    species = []
+    for line in Path(path).read_text(encoding='utf-8').splitlines():
+        match = _SPECIES_LINE.match(line)
+        if match:
+            species.append((match.group(1), match.group(2)))
+    return species
+
+
+def package_species(recommendations_path: Path = RECOMMENDATIONS_PATH,
+                    species_paths: Sequence[Path] = SPECIES_PATHS) -> List[Tuple[str, str]]:
+    """(русское, латинское название) видов из наборов всех комплектов"""
+    if not Path(recommendations_path).exists():
+        return []
+    with open(recommendations_path, 'r', encoding='utf-8') as f:
+        recommendations = json.load(f)
+    used = set()
+    for package in recommendations.values():
+        for level in package.get('levels', {}).values():
+            for fish_set in level.get('sets', []):
+                used.update(fish_id for fish_id, _ in fish_set['fish'])
+    species = {}
+    for path in species_paths:
+        if Path(path).exists():
+            for record in load_catalog(path):
+                species.setdefault(f"fish-{record['id']}", record)  # id как во fishDataConverter
+    return [(species[fish_id].get('name', species[fish_id].get('name_ru', '')),
+             species[fish_id].get('name_lat', '') or species[fish_id].get('scientificName', ''))
+            for fish_id in sorted(used) if fish_id in species]
+
+
+class Frontier:
+    """Оценки ценности для записей каталога и новых статей"""
+
+    def __init__(self, records: List[Dict], wanted_images: Iterable[Tuple[str, str]] = (),
+                 packaged: Iterable[Tuple[str, str]] = (), now: Optional[datetime] = None):
+        self.now = now or datetime.now(timezone.utc)
+        index = CatalogIndex(records)
+        flags: Dict[int, List[str]] = {}
+        for reason, species in (('no_image', wanted_images), ('package', packaged)):
+            for name, name_lat in species:
+                record, _ = index.match(name=name, name_lat=name_lat)
+                if record is not None and reason not in flags.setdefault(id(record), []):
+                    flags[id(record)].append(reason)
+
+        self.items: List[FrontierItem] = []
+        self.by_url: Dict[str, FrontierItem] = {}
+        for record in records:
+            url = record.get('article_url', '')
+            score, reasons = self.score(record, flags.get(id(record), []))
+            item = FrontierItem(url, score, reasons, record)
+            self.items.append(item)
+            if url:
+                self.by_url.setdefault(canonical_url(url), item)
+
+    @classmethod
+    def from_files(cls, records: List[Dict], without_images_path: Path = WITHOUT_IMAGES_PATH,
+                   recommendations_path: Path = RECOMMENDATIONS_PATH) -> 'Frontier':
+        return cls(records, parse_without_images(without_images_path), package_species(recommendations_path))
+
+    def score(self, record: Dict, reasons: List[str]) -> Tuple[float, List[str]]:
+        reasons = list(reasons)
+        if needs_image(record):
+            reasons.append('missing_image')
+        if not record.get('name_lat'):
+            reasons.append('no_name_lat')
+        if not record.get('size_cm'):
+            reasons.append('no_size')
+        score = sum(WEIGHTS[reason] for reason in reasons)
+        age = staleness(record, self.now)
+        if age:
+            reasons.append('stale')
+            score += WEIGHTS['stale'] * age
+        return round(score, 3), reasons
+
+    def item_for(self, url: str) -> FrontierItem:
+        """Оценка статьи по адресу; статьи, которой нет в каталоге, — new"""
+        item = self.by_url.get(canonical_url(url))
+        if item is not None:
+            return FrontierItem(url, item.score, item.reasons, item.record)
+        return FrontierItem(url, WEIGHTS['new'] + WEIGHTS['stale'], ['new'])
+
+    def order_urls(self, urls: Iterable[str]) -> List[FrontierItem]:
+        """Адреса по убыванию ценности (при равной — в исходном порядке)"""
+        items = [self.item_for(url) for url in urls]
+        return sorted(items, key=lambda item: -item.score)
+
+    def rank(self, records: Optional[List[Dict]] = None, limit: Optional[int] = None) -> List[FrontierItem]:
+        """Записи по убыванию ценности; records — подмножество каталога (по умолчанию весь)"""
+        if records is None:
+            items = self.items
+        else:
+            wanted = {id(record) for record in records}
+            items = [item for item in self.items if id(item.record) in wanted]
+        if limit is not None:
+            # nlargest устойчив: при равной оценке — в исходном порядке
+            return heapq.nlargest(limit, items, key=lambda item: item.score)
+        return sorted(items, key=lambda item: -item.score)
+
+
+def load_frontier(catalog_path: Path = CATALOG_PATH) -> Frontier:
+    """Фронтир по каталогу на диске (пустой каталог — все статьи new)"""
+    records = load_catalog(catalog_path) if Path(catalog_path).exists() else []
+    return Frontier.from_files(records)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Статьи каталога по ценности для повторного обхода")
+    arg_parser.add_argument('--catalog', default=str(CATALOG_PATH), help="путь к каталогу")
+    arg_parser.add_argument('--limit', type=int, default=20, help="сколько статей вывести")
+    arg_parser.add_argument('--json', action='store_true', help="вывести JSON (url, score, reasons)")
+    args = arg_parser.parse_args()
+
+    frontier = load_frontier(Path(args.catalog))
+    top = frontier.rank(limit=args.limit)
+    if args.json:
+        print(json.dumps([{'url': item.url, 'score': item.score, 'reasons': item.reasons} for item in top],
+                         ensure_ascii=False, indent=2))
+        return
+    counts: Dict[str, int] = {}
+    for item in frontier.items:
+        for reason in item.reasons:
+            counts[reason] = counts.get(reason, 0) + 1
+    print(f"📋 Записей: {len(frontier.items)}; сигналы: "
+          + ', '.join(f"{reason} {n}" for reason, n in sorted(counts.items(), key=lambda kv: -kv[1])))
+    for item in top:
+        name = (item.record or {}).get('name_ru', '')[:40]
+        print(f"{item.score:6.2f}  {name:40}  {','.join(item.reasons)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замер пиковой памяти (RSS) долгого обхода без сети
+
+Парсер проходит N синтетических статей (страницы собираются из записей
+каталога, если он есть, и дополняются шаблоном сайта: меню, ссылки,
+подвал). Перед обходом читается каталог прошлого обхода из N записей
+(load_previous_records, как в инкрементальном режиме). Каждый режим
+работает в отдельном процессе, пик RSS (ru_maxrss) снимается до и после
+чтения прошлого каталога и после каждой десятой части статей. Без
+--low-memory пик растет вместе с fish_data и промежуточными
+сохранениями, с --low-memory должен оставаться ровным.
+
+    python3 crawl_memory_bench.py                    # 10000 статей, оба режима
+    python3 crawl_memory_bench.py --articles 2000 --mode low-memory
+    python3 crawl_memory_bench.py --previous 0       # без прошлого каталога
+
+Код возврата 1, если пик в режиме --low-memory вырос больше MAX_GROWTH_MB
+от точки до чтения прошлого каталога до последней. Только Linux/macOS
+(модуль resource).
+"""
+
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+BASE_DIR = Path(__file__).parent.parent
+CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
+
+ARTICLES = 10000
+CHECKPOINTS = 10
+MAX_GROWTH_MB = 8.0
+MODES = {'default': False, 'low-memory': True}
+
+_NAV = ''.join(f'<li><a href="/akvariumnye-stati/razdel-{i}/">Раздел {i}</a></li>' for i in range(300))
+_FOOTER = '<p>Все права защищены. Копирование материалов только с активной ссылкой на сайт.</p>' * 20
+
+
+def peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024  # macOS — байты, Linux — КБ
+
+
+def load_samples() -> List[Dict]:
+    """Записи для текста страниц: каталог или простой шаблон"""
+    try:
+        from catalog_store import load_catalog
+        records = [r for r in load_catalog(CATALOG_PATH) if r.get('description_short')]
+    except (OSError, ValueError):
+        records = []
+    return records or [{
+        'name_ru': 'Неон голубой',
+        'name_lat': 'Paracheirodon innesi',
+        'description_short': 'Мирная стайная рыба. Температура 22-26 °C, pH 6.0-7.5, '
+                             'объем от 40 литров, размер до 4 см. Содержать от 10 особей.',
+    }]
+
+
+def render_page(number: int, sample: Dict) -> str:
+    """Страница статьи размером с настоящую (~60 КБ разметки)"""
+    name = f"{sample.get('name_ru', 'Рыба')} {number}"
+    latin = sample.get('name_lat') or ''
+    paragraphs = ''.join(f'<p>{sample["description_short"]} Статья №{number}, абзац {i}.</p>'
+                         for i in range(8))
+    return (f'<html><head><title>{name}</title></head><body>'
+            f'<nav><ul>{_NAV}</ul></nav>'
+            f'<article><h1 class="entry-title">{name} ({latin})</h1>'
+            f'<div class="entry-content"><img src="/upload/fish-{number}.jpg" width="600">'
+            f'{paragraphs}<p>Температура 22-26 °C, pH 6.5-7.5, семейство: Харациновые.</p></div></article>'
+            f'<footer>{_FOOTER}</footer></body></html>')
+
+
+def article_url(number: int) -> str:
+    return f'https://fanfishka.ru/akvariumnye-stati/akvariumnye_rybki/fish-{number}.html'
+
+
+def previous_catalog(count: int, samples: List[Dict]) -> Iterator[Dict]:
+    """Каталог прошлого обхода: записи тех же статей, что обходятся"""
+    for number in range(count):
+        sample = samples[number % len(samples)]
+        yield {'id': number + 1, 'name_ru': f"{sample.get('name_ru', 'Рыба')} {number}",
+               'name_lat': sample.get('name_lat', ''), 'article_url': article_url(number),
+               'description_short': sample['description_short']}
+
+
+def run_worker(mode: str, articles: int, previous: int) -> Dict:
+    """Обход в текущем процессе; пик RSS по контрольным точкам"""
+    from bs4 import BeautifulSoup
+    from catalog_store import atomic_write_records
+    from fanfishka_parser import FanFishkaParser
+
+    logging.disable(logging.INFO)  # строка журнала на статью — не то, что мы меряем
+    samples = load_samples()
+
+    class ReplayParser(FanFishkaParser):
+        def get_page(self, url: str, retries: int = 3):
+            number = int(url.rsplit('-', 1)[-1].split('.')[0])
+            html = render_page(number, samples[number % len(samples)]).encode('utf-8')
+            return BeautifulSoup(html, 'html.parser', from_encoding='utf-8')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_file = Path(tmp) / 'fish_catalog.json'
+        if previous:
+            atomic_write_records(output_file, previous_catalog(previous, samples))
+        parser = ReplayParser(low_memory=MODES[mode], output_file=str(output_file))
+        parser.delay = 0
+        step = max(1, articles // CHECKPOINTS)
+        checkpoints = [{'articles': 'старт', 'peak_rss_mb': round(peak_rss_mb(), 1)}]
+        started = time.perf_counter()
+        parser.load_previous_records()
+        checkpoints.append({'articles': 'каталог', 'peak_rss_mb': round(peak_rss_mb(), 1)})
+        for first in range(0, articles, step):
+            parser.fish_links = [article_url(n) for n in range(first, min(first + step, articles))]
+            parser.crawl_articles()
+            checkpoints.append({'articles': min(first + step, articles), 'peak_rss_mb': round(peak_rss_mb(), 1)})
+        records = parser.record_count
+        parser.save()
+        elapsed = time.perf_counter() - started
+    return {'mode': mode, 'seconds': round(elapsed, 1), 'checkpoints': checkpoints,
+            'final_peak_rss_mb': round(peak_rss_mb(), 1), 'records': records}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Пик памяти долгого обхода (синтетические статьи)")
+    arg_parser.add_argument('--articles', type=int, default=ARTICLES, help="число статей")
+    arg_parser.add_argument('--previous', type=int, help="записей в прошлом каталоге (по умолчанию = --articles)")
+    arg_parser.add_argument('--mode', choices=list(MODES), action='append', help="режим (по умолчанию оба)")
+    arg_parser.add_argument('--worker', choices=list(MODES), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    previous = args.articles if args.previous is None else args.previous
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.articles, previous)))
+        return
+
+    failed = False
+    for mode in args.mode or list(MODES):
+        output = subprocess.run([sys.executable, __file__, '--worker', mode, '--articles', str(args.articles),
+                                 '--previous', str(previous)],
+                                capture_output=True, text=True, cwd=Path(__file__).parent)
+        if output.returncode != 0:
+            print(f"❌ {mode}: {output.stderr.strip()[-2000:]}")
+            failed = True
+            continue
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        points = result['checkpoints']
+        growth = points[-1]['peak_rss_mb'] - points[0]['peak_rss_mb']
+        print(f"\n{mode}: {args.articles} статей, прошлый каталог {previous} записей, {result['seconds']} с "
+              f"({args.articles / max(result['seconds'], 1e-9):.0f} статей/с)")
+        print('  статей  ' + ''.join(f"{p['articles']:>8}" for p in points))
+        print('  пик, МБ ' + ''.join(f"{p['peak_rss_mb']:>8.1f}" for p in points))
+        print(f"  рост пика с начала (до чтения прошлого каталога): {growth:+.1f} МБ, "
+              f"со сборкой каталога: {result['final_peak_rss_mb']:.1f} МБ")
+        if MODES[mode]:
+            ok = growth <= MAX_GROWTH_MB
+            print(f"  {'✅' if ok else '❌'} допустимый рост {MAX_GROWTH_MB} МБ")
+            failed = failed or not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Распределенный обход: общая очередь статей для нескольких воркеров
+
+Координатор кладет найденные статьи в очередь, воркеры (процессы на
+одной машине или на разных хостах, каждый со своим IP и своей паузой
+между запросами) берут их в аренду пачками, разбирают тем же
+FanFishkaParser и сдают записи. Каталог собирается из очереди в конце.
+
+    python3 crawl_queue.py seed --sitemap              # заполнить очередь
+    python3 crawl_queue.py work --processes 4          # 4 воркера на этой машине
+    python3 crawl_queue.py --queue redis://host:6379/0 work   # воркер на другом хосте
+    python3 crawl_queue.py status
+    python3 crawl_queue.py export                      # → fish_catalog.json
+
+Гарантии:
+- адрес попадает в очередь один раз (без #фрагмента); повторный seed
+  возвращает в работу только статьи с более новым lastmod;
+- аренда (lease) истекает через --lease секунд: задачу упавшего воркера
+  заберет другой, а воркер продлевает аренду своей пачки перед каждой
+  статьей. После MAX_ATTEMPTS попыток задача считается неудачной
+  (status, requeue);
+- сдача результата идемпотентна: запись и отметка «готово» пишутся
+  одной транзакцией, повторная сдача той же статьи (воркер «ожил» после
+  истечения аренды) отбрасывается.
+
+Очередь — SQLite в режиме WAL (по умолчанию .pipeline/crawl_queue.db;
+только локальный диск: WAL не работает на сетевых ФС) или Redis
+(совместимые серверы: Valkey, KeyDB, Dragonfly) — адрес redis://...,
+нужен пакет redis. Для Redis операции выполняются Lua-скриптами
+атомарно на сервере.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urldefrag
+
+from catalog_store import atomic_write_records, load_catalog
+from http_client import polite_sleep
+
+BASE_DIR = Path(__file__).parent.parent
+DEFAULT_QUEUE = BASE_DIR / '.pipeline' / 'crawl_queue.db'
+CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
+
+LEASE_SECONDS = 300       # аренда пачки; продлевается перед каждой статьей
+CLAIM_BATCH = 5           # статей за одно обращение к очереди
+MAX_ATTEMPTS = 3          # после стольких неудач (или истекших аренд) — failed
+POLL_SECONDS = 5          # пауза, пока у других воркеров есть аренды
+REDIS_PREFIX = 'aquacat:crawl:'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq           INTEGER PRIMARY KEY AUTOINCREMENT,
+    url           TEXT NOT NULL UNIQUE,
+    lastmod       TEXT,
+    title         TEXT NOT NULL DEFAULT '',
+    priority      REAL NOT NULL DEFAULT 0,
+    state         TEXT NOT NULL DEFAULT 'pending',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    last_error    TEXT NOT NULL DEFAULT '',
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks(state, priority DESC, seq);
+CREATE INDEX IF NOT EXISTS tasks_lease ON tasks(state, lease_expires);
+CREATE TABLE IF NOT EXISTS results (
+    url          TEXT PRIMARY KEY,
+    record       TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    worker       TEXT NOT NULL,
+    finished_at  REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class Task:
+    url: str
+    lastmod: Optional[str] = None
+    title: str = ''
+    priority: float = 0.0
+    attempts: int = 0
+
+
+def record_json(record: Dict) -> Tuple[str, str]:
+    """Запись для хранения в очереди и ее хэш"""
+    text = json.dumps(record, ensure_ascii=False)
+    return text, hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class SqliteQueue:
+    """Очередь в файле SQLite (WAL): воркеры — процессы на этой машине"""
+
+    def __init__(self, path=DEFAULT_QUEUE, max_attempts: int = MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        # Транзакции открываются явно (BEGIN IMMEDIATE), ожидание блокировки — до 60 с
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE: блокировка записи берется сразу, два воркера не прочитают
+        # одни и те же pending-задачи до того, как один из них их займет
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    def enqueue(self, tasks: Iterable[Task]) -> int:
+        """Добавить задачи; возвращает число новых (и возвращенных в работу)"""
+        added = 0
+        now = time.time()
+        with self._transaction() as conn:
+            for task in tasks:
+                url = urldefrag(task.url)[0]
+                row = conn.execute('SELECT state, lastmod FROM tasks WHERE url = ?', (url,)).fetchone()
+                if row is None:
+                    conn.execute('INSERT INTO tasks (url, lastmod, title, priority, updated_at) '
+                                 'VALUES (?, ?, ?, ?, ?)', (url, task.lastmod, task.title, task.priority, now))
+                    added += 1
+                elif (row['state'] in ('done', 'failed') and task.lastmod
+                      and task.lastmod > (row['lastmod'] or '')):
+                    # Статья изменилась после прошлого обхода
+                    conn.execute("UPDATE tasks SET state = 'pending', attempts = 0, lastmod = ?, priority = ?, "
+                                 "last_error = '', updated_at = ? WHERE url = ?",
+                                 (task.lastmod, task.priority, now, url))
+                    added += 1
+        return added
+
+    def _expire_leases(self, conn, now: float):
+        """Аренды упавших воркеров: задача снова в очереди (попытка засчитана)"""
+        conn.execute(
+            "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "last_error = CASE WHEN attempts >= ? THEN 'аренда истекла' ELSE last_error END, "
+            "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE state = 'leased' AND lease_expires < ?",
+            (self.max_attempts, self.max_attempts, now, now))
+
+    def claim(self, worker: str, limit: int = CLAIM_BATCH, lease: float = LEASE_SECONDS) -> List[Task]:
+        """Взять в аренду до limit задач (сначала с большим priority, затем по порядку)"""
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            rows = conn.execute(
+                "SELECT url, lastmod, title, priority, attempts FROM tasks WHERE state = 'pending' "
+                "ORDER BY priority DESC, seq LIMIT ?", (limit,)).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET state = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                [(worker, now + lease, now, row['url']) for row in rows])
+        return [Task(row['url'], row['lastmod'], row['title'], row['priority'], row['attempts'] + 1)
+                for row in rows]
+
+    def extend(self, worker: str, urls: List[str], lease: float = LEASE_SECONDS) -> int:
+        """Продлить аренду; возвращает число задач, все еще принадлежащих воркеру"""
+        now = time.time()
+        with self._transaction() as conn:
+            return sum(conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE url = ? AND state = 'leased' AND lease_owner = ?",
+                (now + lease, now, url, worker)).rowcount for url in urls)
+
+    def complete(self, worker: str, url: str, record: Dict) -> bool:
+        """
+        Сдать результат. False — статья уже готова (ее сдал другой воркер,
+        забравший задачу после истечения аренды): запись отбрасывается.
+        """
+        text, content_hash = record_json(record)
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT state FROM tasks WHERE url = ?', (url,)).fetchone()
+            if row is None or row['state'] == 'done':
+                return False
+            conn.execute(
+                'INSERT INTO results (url, record, content_hash, worker, finished_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(url) DO UPDATE SET record = excluded.record, content_hash = excluded.content_hash, '
+                'worker = excluded.worker, finished_at = excluded.finished_at',
+                (url, text, content_hash, worker, now))
+            conn.execute("UPDATE tasks SET state = 'done', lease_owner = NULL, lease_expires = NULL, "
+                         "last_error = '', updated_at = ? WHERE url = ?", (now, url))
+        return True
+
+    def fail(self, worker: str, url: str, error: str) -> bool:
+        """Неудача: задача вернется в очередь или, после MAX_ATTEMPTS, станет failed"""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "last_error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE url = ? AND state = 'leased' AND lease_owner = ?",
+                (self.max_attempts, error, time.time(), url, worker)).rowcount > 0
+
+    def release(self, worker: str, urls: List[str]) -> int:
+        """Вернуть невыполненные задачи (остановка воркера), попытка не засчитывается"""
+        with self._transaction() as conn:
+            return sum(conn.execute(
+                "UPDATE tasks SET state = 'pending', attempts = attempts - 1, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE url = ? AND state = 'leased' AND lease_owner = ?",
+                (time.time(), url, worker)).rowcount for url in urls)
+
+    def requeue_failed(self) -> int:
+        with self._transaction() as conn:
+            return conn.execute("UPDATE tasks SET state = 'pending', attempts = 0, updated_at = ? "
+                                "WHERE state = 'failed'", (time.time(),)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.conn.execute('SELECT state, COUNT(*) AS n FROM tasks GROUP BY state')
+        return {row['state']: row['n'] for row in rows}
+
+    def is_drained(self) -> bool:
+        """Нет ни ожидающих задач, ни аренд"""
+        return self.conn.execute(
+            "SELECT 1 FROM tasks WHERE state IN ('pending', 'leased') LIMIT 1").fetchone() is None
+
+    def leases(self) -> List[Tuple[str, str, float]]:
+        """(адрес, воркер, истекает) для текущих аренд"""
+        rows = self.conn.execute("SELECT url, lease_owner, lease_expires FROM tasks "
+                                 "WHERE state = 'leased' ORDER BY lease_expires")
+        return [(row['url'], row['lease_owner'], row['lease_expires']) for row in rows]
+
+    def failures(self) -> List[Tuple[str, str]]:
+        rows = self.conn.execute("SELECT url, last_error FROM tasks WHERE state = 'failed' ORDER BY seq")
+        return [(row['url'], row['last_error']) for row in rows]
+
+    def results(self) -> Iterator[Dict]:
+        """Записи готовых статей в порядке добавления в очередь (по одной)"""
+        cursor = self.conn.execute("SELECT r.record FROM tasks t JOIN results r ON r.url = t.url "
+                                   "WHERE t.state = 'done' ORDER BY t.seq")
+        for row in cursor:
+            yield json.loads(row['record'])
+
+
+# Lua-скрипты Redis: каждая операция атомарна на сервере. Ключи строятся
+# внутри скриптов от префикса, поэтому нужен один сервер (не Redis Cluster).
+# Порядок выдачи: очки в pending = seq - priority * 1e9.
+_REDIS_ENQUEUE = """
+local p, url, lastmod, title, priority, now = ARGV[1], ARGV[2], ARGV[3], ARGV[4], tonumber(ARGV[5]), ARGV[6]
+local key = p .. 'task:' .. url
+local state = redis.call('HGET', key, 'state')
+if not state then
+    local seq = redis.call('INCR', p .. 'seq')
+    redis.call('HSET', key, 'seq', seq, 'lastmod', lastmod, 'title', title, 'priority', priority,
+               'state', 'pending', 'attempts', 0, 'owner', '', 'error', '', 'updated_at', now)
+    redis.call('ZADD', p .. 'pending', seq - priority * 1e9, url)
+    return 1
+end
+if (state == 'done' or state == 'failed') and lastmod ~= ''
+        and lastmod > (redis.call('HGET', key, 'lastmod') or '') then
+    redis.call('ZREM', p .. 'done', url)
+    redis.call('SREM', p .. 'failed', url)
+    redis.call('HSET', key, 'state', 'pending', 'attempts', 0, 'lastmod', lastmod, 'priority', priority,
+               'error', '', 'updated_at', now)
+    local seq = tonumber(redis.call('HGET', key, 'seq'))
+    redis.call('ZADD', p .. 'pending', seq - priority * 1e9, url)
+    return 1
+end
+return 0
+"""
+
+_REDIS_CLAIM = """
+local p, worker, limit, now, lease, max_attempts =
+    ARGV[1], ARGV[2], tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6])
+for _, url in ipairs(redis.call('ZRANGEBYSCORE', p .. 'leased', '-inf', '(' .. now)) do
+    local key = p .. 'task:' .. url
+    redis.call('ZREM', p .. 'leased', url)
+    if tonumber(redis.call('HGET', key, 'attempts')) >= max_attempts then
+        redis.call('HSET', key, 'state', 'failed', 'owner', '', 'error', 'аренда истекла', 'updated_at', now)
+        redis.call('SADD', p .. 'failed', url)
+    else
+        redis.call('HSET', key, 'state', 'pending', 'owner', '', 'updated_at', now)
+        local task = redis.call('HMGET', key, 'seq', 'priority')
+        redis.call('ZADD', p .. 'pending', tonumber(task[1]) - tonumber(task[2]) * 1e9, url)
+    end
+end
+local claimed = {}
+for _, url in ipairs(redis.call('ZRANGE', p .. 'pending', 0, limit - 1)) do
+    local key = p .. 'task:' .. url
+    redis.call('ZREM', p .. 'pending', url)
+    redis.call('ZADD', p .. 'leased', now + lease, url)
+    redis.call('HSET', key, 'state', 'leased', 'owner', worker, 'updated_at', now)
+    redis.call('HINCRBY', key, 'attempts', 1)
+    local task = redis.call('HMGET', key, 'lastmod', 'title', 'priority', 'attempts')
+    table.insert(claimed, {url, task[1], task[2], task[3], task[4]})
+end
+return claimed
+"""
+
+_REDIS_EXTEND = """
+local p, worker, expires = ARGV[1], ARGV[2], ARGV[3]
+local extended = 0
+for i = 4, #ARGV do
+    local key = p .. 'task:' .. ARGV[i]
+    if redis.call('HGET', key, 'state') == 'leased' and redis.call('HGET', key, 'owner') == worker then
+        redis.call('ZADD', p .. 'leased', expires, ARGV[i])
+        extended = extended + 1
+    end
+end
+return extended
+"""
+
+_REDIS_COMPLETE = """
+local p, url, worker, record, now = ARGV[1], ARGV[2], ARGV[3], ARGV[4], ARGV[5]
+local key = p .. 'task:' .. url
+local state = redis.call('HGET', key, 'state')
+if not state or state == 'done' then
+    return 0
+end
+redis.call('ZREM', p .. 'leased', url)
+redis.call('ZREM', p .. 'pending', url)
+redis.call('SREM', p .. 'failed', url)
+redis.call('HSET', key, 'state', 'done', 'owner', '', 'error', '', 'worker', worker, 'updated_at', now)
+redis.call('ZADD', p .. 'done', redis.call('HGET', key, 'seq'), url)
+redis.call('HSET', p .. 'results', url, record)
+return 1
+"""
+
+# ARGV[3]: 'fail' — неудача (попытка засчитана), 'release' — возврат без попытки
+_REDIS_RETURN = """
+local p, worker, mode, error, now, max_attempts = ARGV[1], ARGV[2], ARGV[3], ARGV[4], ARGV[5], tonumber(ARGV[6])
+local returned = 0
+for i = 7, #ARGV do
+    local url = ARGV[i]
+    local key = p .. 'task:' .. url
+    if redis.call('HGET', key, 'state') == 'leased' and redis.call('HGET', key, 'owner') == worker then
+        redis.call('ZREM', p .. 'leased', url)
+        if mode == 'release' then
+            redis.call('HINCRBY', key, 'attempts', -1)
+        else
+            redis.call('HSET', key, 'error', error)
+        end
+        if mode == 'fail' and tonumber(redis.call('HGET', key, 'attempts')) >= max_attempts then
+            redis.call('HSET', key, 'state', 'failed', 'owner', '', 'updated_at', now)
+            redis.call('SADD', p .. 'failed', url)
+        else
+            redis.call('HSET', key, 'state', 'pending', 'owner', '', 'updated_at', now)
+            local task = redis.call('HMGET', key, 'seq', 'priority')
+            redis.call('ZADD', p .. 'pending', tonumber(task[1]) - tonumber(task[2]) * 1e9, url)
+        end
+        returned = returned + 1
+    end
+end
+return returned
+"""
+
+_REDIS_REQUEUE = """
+local p, now = ARGV[1], ARGV[2]
+local urls = redis.call('SMEMBERS', p .. 'failed')
+for _, url in ipairs(urls) do
+    local key = p .. 'task:' .. url
+    redis.call('HSET', key, 'state', 'pending', 'attempts', 0, 'updated_at', now)
+    local task = redis.call('HMGET', key, 'seq', 'priority')
+    redis.call('ZADD', p .. 'pending', tonumber(task[1]) - tonumber(task[2]) * 1e9, url)
+end
+redis.call('DEL', p .. 'failed')
+return #urls
+"""
+
+
+class RedisQueue:
+    """
+    Очередь на сервере Redis (или совместимом): воркеры на разных хостах.
+    Ключи: <prefix>task:<url> (hash), pending / leased / done (zset),
+    failed (set), results (hash url → запись JSON).
+    """
+
+    RESULTS_BATCH = 500
+
+    def __init__(self, url: str, max_attempts: int = MAX_ATTEMPTS, prefix: str = REDIS_PREFIX):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Для очереди в Redis нужен пакет redis: pip install redis") from None
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.path = url
+        self.prefix = prefix
+        self.max_attempts = max_attempts
+        self._enqueue = self.client.register_script(_REDIS_ENQUEUE)
+        self._claim = self.client.register_script(_REDIS_CLAIM)
+        self._extend = self.client.register_script(_REDIS_EXTEND)
+        self._complete = self.client.register_script(_REDIS_COMPLETE)
+        self._return = self.client.register_script(_REDIS_RETURN)
+        self._requeue = self.client.register_script(_REDIS_REQUEUE)
+
+    def close(self):
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def enqueue(self, tasks: Iterable[Task]) -> int:
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for task in tasks:
+            self._enqueue(args=[self.prefix, urldefrag(task.url)[0], task.lastmod or '', task.title,
+                                task.priority, now], client=pipe)
+        return sum(pipe.execute())
+
+    def claim(self, worker: str, limit: int = CLAIM_BATCH, lease: float = LEASE_SECONDS) -> List[Task]:
+        rows = self._claim(args=[self.prefix, worker, limit, time.time(), lease, self.max_attempts])
+        return [Task(url, lastmod or None, title, float(priority), int(attempts))
+                for url, lastmod, title, priority, attempts in rows]
+
+    def extend(self, worker: str, urls: List[str], lease: float = LEASE_SECONDS) -> int:
+        return self._extend(args=[self.prefix, worker, time.time() + lease, *urls]) if urls else 0
+
+    def complete(self, worker: str, url: str, record: Dict) -> bool:
+        text, _ = record_json(record)
+        return bool(self._complete(args=[self.prefix, url, worker, text, time.time()]))
+
+    def fail(self, worker: str, url: str, error: str) -> bool:
+        return bool(self._return(args=[self.prefix, worker, 'fail', error, time.time(), self.max_attempts, url]))
+
+    def release(self, worker: str, urls: List[str]) -> int:
+        if not urls:
+            return 0
+        return self._return(args=[self.prefix, worker, 'release', '', time.time(), self.max_attempts, *urls])
+
+    def requeue_failed(self) -> int:
+        return self._requeue(args=[self.prefix, time.time()])
+
+    def counts(self) -> Dict[str, int]:
+        p = self.prefix
+        counts = {'pending': self.client.zcard(p + 'pending'), 'leased': self.client.zcard(p + 'leased'),
+                  'done': self.client.zcard(p + 'done'), 'failed': self.client.scard(p + 'failed')}
+        return {state: n for state, n in counts.items() if n}
+
+    def is_drained(self) -> bool:
+        return not (self.client.zcard(self.prefix + 'pending') or self.client.zcard(self.prefix + 'leased'))
+
+    def leases(self) -> List[Tuple[str, str, float]]:
+        rows = self.client.zrange(self.prefix + 'leased', 0, -1, withscores=True)
+        return [(url, self.client.hget(self.prefix + 'task:' + url, 'owner'), expires) for url, expires in rows]
+
+    def failures(self) -> List[Tuple[str, str]]:
+        urls = self.client.smembers(self.prefix + 'failed')
+        return sorted((url, self.client.hget(self.prefix + 'task:' + url, 'error') or '') for url in urls)
+
+    def results(self) -> Iterator[Dict]:
+        done = self.prefix + 'done'
+        for start in range(0, self.client.zcard(done), self.RESULTS_BATCH):
+            urls = self.client.zrange(done, start, start + self.RESULTS_BATCH - 1)
+            for text in self.client.hmget(self.prefix + 'results', urls):
+                if text:
+                    yield json.loads(text)
+
+
+def open_queue(target: str = str(DEFAULT_QUEUE), max_attempts: int = MAX_ATTEMPTS):
+    """Файл SQLite или адрес redis:// (rediss://, unix://)"""
+    if target.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisQueue(target, max_attempts)
+    return SqliteQueue(target, max_attempts)
+
+
+# Координатор и воркер --------------------------------------------------------
+
+def seed_from_site(queue, discovery: str = 'sitemap', catalog_path: Path = CATALOG_PATH,
+                   priority: bool = False) -> Tuple[int, int]:
+    """
+    Найти статьи (как fanfishka_parser.py) и поставить в очередь.
+    С картой сайта неизменившиеся статьи сразу сдаются записью прошлого
+    обхода. С priority воркеры берут статьи по ценности (crawl_frontier.py).
+    Возвращает (новых задач, взято из прошлого обхода).
+    """
+    from fanfishka_parser import FanFishkaParser
+    from sitemap_discovery import is_unchanged
+
+    parser = FanFishkaParser(discovery=discovery, output_file=str(catalog_path))
+    parser.discover_links()
+    scores = frontier_scores(parser.fish_links, catalog_path) if priority else {}
+    added = queue.enqueue(Task(url, parser.link_lastmod.get(url), parser.link_titles.get(url, ''),
+                               scores.get(url, 0.0)) for url in parser.fish_links)
+    reused = 0
+    for url in parser.fish_links:
+        previous = parser.previous_record(url)
+        if is_unchanged(previous, parser.link_lastmod.get(url)) and queue.complete('seed', url, previous):
+            reused += 1
+    return added, reused
+
+
+def frontier_scores(urls: List[str], catalog_path: Path = CATALOG_PATH) -> Dict[str, float]:
+    """Приоритет задач — оценка ценности статьи (crawl_frontier.py)"""
+    from crawl_frontier import load_frontier
+    frontier = load_frontier(catalog_path)
+    return {url: frontier.item_for(url).score for url in urls}
+
+
+def run_worker(queue, parser, worker: str, batch: int = CLAIM_BATCH, lease: float = LEASE_SECONDS,
+               max_tasks: Optional[int] = None, poll: float = POLL_SECONDS) -> Counter:
+    """
+    Брать статьи из очереди, пока она не опустеет (или max_tasks).
+    Пока у других воркеров есть аренды, воркер ждет: если чей-то процесс
+    упал, его задачи вернутся в очередь после истечения аренды.
+    """
+    stats: Counter = Counter()
+    while max_tasks is None or stats['claimed'] < max_tasks:
+        limit = batch if max_tasks is None else min(batch, max_tasks - stats['claimed'])
+        tasks = queue.claim(worker, limit, lease)
+        if not tasks:
+            if queue.is_drained():
+                break
+            time.sleep(poll)
+            continue
+        stats['claimed'] += len(tasks)
+        pending = [task.url for task in tasks]
+        try:
+            for task in tasks:
+                if not queue.extend(worker, pending, lease):
+                    break  # аренда истекла, задачи уже у других воркеров
+                parser.link_lastmod[task.url] = task.lastmod
+                try:
+                    record = parser.parse_fish_article(task.url)
+                except Exception as e:
+                    record, error = None, f'{type(e).__name__}: {e}'
+                else:
+                    error = 'страница не загрузилась'
+                pending.remove(task.url)
+                if record is None:
+                    queue.fail(worker, task.url, error)
+                    stats['failed'] += 1
+                elif queue.complete(worker, task.url, record.to_dict()):
+                    stats['done'] += 1
+                else:
+                    stats['duplicate'] += 1
+                polite_sleep(parser.delay)
+        finally:
+            # Остановка (Ctrl+C) посреди пачки: остальное сразу вернуть в очередь
+            if pending:
+                stats['released'] += queue.release(worker, pending)
+    return stats
+
+
+def export_catalog(queue, output_path: Path = CATALOG_PATH, previous_path: Optional[Path] = None) -> int:
+    """
+    Собрать каталог из очереди (потоково). id берутся из прошлого
+    каталога по article_url, новым статьям — следующие свободные.
+    """
+    previous_path = Path(previous_path or output_path)
+    previous_ids = {}
+    if previous_path.exists():
+        previous_ids = {r['article_url']: r['id'] for r in load_catalog(previous_path)
+                        if r.get('article_url') and r.get('id') is not None}
+    next_id = max(previous_ids.values(), default=0) + 1
+
+    def records() -> Iterator[Dict]:
+        nonlocal next_id
+        for record in queue.results():
+            record_id = previous_ids.get(record.get('article_url'))
+            if record_id is None:
+                record_id, next_id = next_id, next_id + 1
+            record['id'] = record_id
+            yield record
+
+    return atomic_write_records(output_path, records())
+
+
+def spawn_workers(processes: int, argv: List[str]) -> int:
+    """Запустить воркеры отдельными процессами; код возврата — худший из них"""
+    children = [subprocess.Popen([sys.executable, __file__, *argv, '--worker-id',
+                                  f'{socket.gethostname()}-{os.getpid()}-{n}'])
+                for n in range(1, processes + 1)]
+    try:
+        return max(child.wait() for child in children)
+    except KeyboardInterrupt:
+        # Ctrl+C уже доставлен всей группе процессов: ждем, пока воркеры вернут задачи
+        return max(child.wait() for child in children)
+
+
+def print_status(queue):
+    counts = queue.counts()
+    total = sum(counts.values())
+    print(f"📋 Очередь {queue.path}: {total} статей")
+    for state in ('pending', 'leased', 'done', 'failed'):
+        print(f"   {state:8} {counts.get(state, 0):6}")
+    now = time.time()
+    leases = queue.leases()
+    if leases:
+        print("Аренды:")
+        for owner, n in Counter(owner for _, owner, _ in leases).most_common():
+            expires = min(e for _, o, e in leases if o == owner)
+            print(f"   {owner}: {n} (истекает через {expires - now:.0f} с)")
+    failures = queue.failures()
+    if failures:
+        print(f"Неудачи ({len(failures)}; вернуть в очередь: requeue):")
+        for url, error in failures[:20]:
+            print(f"   {url}  {error}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Распределенный обход fanfishka.ru через общую очередь")
+    arg_parser.add_argument('--queue', default=str(DEFAULT_QUEUE),
+                            help="файл SQLite или адрес redis://host:6379/0")
+    arg_parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS, help="попыток на статью")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    seed = commands.add_parser('seed', help="поставить статьи в очередь")
+    seed.add_argument('--sitemap', action='store_true', help="карта сайта, неизменившиеся — из каталога")
+    seed.add_argument('--urls', metavar='FILE', help="адреса из файла, по одному в строке («-» — stdin)")
+    seed.add_argument('--catalog', default=str(CATALOG_PATH), help="прошлый обход")
+    seed.add_argument('--priority', action='store_true',
+                      help="сначала статьи с самыми ценными пробелами (crawl_frontier.py)")
+
+    work = commands.add_parser('work', help="разбирать статьи из очереди")
+    work.add_argument('--worker-id', default=f'{socket.gethostname()}-{os.getpid()}')
+    work.add_argument('--processes', type=int, default=1, help="воркеров на этой машине")
+    work.add_argument('--batch', type=int, default=CLAIM_BATCH, help="статей за одну аренду")
+    work.add_argument('--lease', type=float, default=LEASE_SECONDS, help="срок аренды, с")
+    work.add_argument('--delay', type=float, help="пауза между запросами, с (у каждого воркера своя)")
+    work.add_argument('--max-tasks', type=int, help="остановиться после стольких статей")
+    work.add_argument('--fulltext', nargs='?', const='fish_fulltext.db', metavar='DB',
+                      help="сохранять полный текст статей в индекс FTS5")
+
+    export = commands.add_parser('export', help="собрать каталог из очереди")
+    export.add_argument('--output', default=str(CATALOG_PATH))
+    export.add_argument('--previous', help="каталог со стабильными id (по умолчанию --output)")
+
+    commands.add_parser('status', help="состояние очереди")
+    commands.add_parser('requeue', help="вернуть неудачные статьи в очередь")
+    args = arg_parser.parse_args()
+
+    if args.command == 'work' and args.processes > 1:
+        argv = ['--queue', args.queue, '--max-attempts', str(args.max_attempts), 'work',
+                '--batch', str(args.batch), '--lease', str(args.lease)]
+        for option, value in (('--delay', args.delay), ('--max-tasks', args.max_tasks),
+                              ('--fulltext', args.fulltext)):
+            if value is not None:
+                argv += [option, str(value)]
+        sys.exit(spawn_workers(args.processes, argv))
+
+    try:
+        queue = open_queue(args.queue, args.max_attempts)
+    except RuntimeError as e:
+        arg_parser.error(str(e))
+    with queue:
+        if args.command == 'seed':
+            if args.urls:
+                lines = sys.stdin if args.urls == '-' else open(args.urls, 'r', encoding='utf-8')
+                with lines:
+                    urls = [line.strip() for line in lines if line.strip()]
+                scores = frontier_scores(urls, Path(args.catalog)) if args.priority else {}
+                added = queue.enqueue(Task(url, priority=scores.get(url, 0.0)) for url in urls)
+                print(f"✅ В очереди новых статей: {added}")
+            else:
+                added, reused = seed_from_site(queue, 'sitemap' if args.sitemap else 'pagination',
+                                               Path(args.catalog), args.priority)
+                print(f"✅ В очереди новых статей: {added}, без изменений (из каталога): {reused}")
+        elif args.command == 'work':
+            from fanfishka_parser import FanFishkaParser
+            parser = FanFishkaParser(fulltext_db=args.fulltext)
+            if args.delay is not None:
+                parser.delay = args.delay
+            started = time.perf_counter()
+            try:
+                stats = run_worker(queue, parser, args.worker_id, args.batch, args.lease, args.max_tasks)
+            except KeyboardInterrupt:
+                print(f"\n⏹ {args.worker_id}: остановлен, невыполненные статьи возвращены в очередь")
+                sys.exit(130)
+            finally:
+                if parser.fulltext:
+                    parser.fulltext.close()
+            print(f"✅ {args.worker_id}: готово {stats['done']}, неудач {stats['failed']}, "
+                  f"уже сданы другими {stats['duplicate']} ({time.perf_counter() - started:.0f} с)")
+        elif args.command == 'export':
+            count = export_catalog(queue, Path(args.output), args.previous and Path(args.previous))
+            print(f"✅ {args.output}: {count} записей")
+            if not queue.is_drained():
+                print("⚠️ В очереди остались невыполненные статьи (status)")
+        elif args.command == 'status':
+            print_status(queue)
+        elif args.command == 'requeue':
+            print(f"✅ Возвращено в очередь: {queue.requeue_failed()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск почти одинаковых статей в каталоге (MinHash + LSH) и слияние дубликатов
+
+Обход собирает одну и ту же статью несколько раз: разные адреса
+(…/578-guppi.html и …/akvariumnye_rybki/578-guppi.html, «#comment»),
+перепубликации и копии с мелкими правками. Этап дедупликации:
+- шинглы — символьные 5-граммы нормализованного name_ru и описания
+- MinHash-сигнатура из NUM_PERM хэш-функций (numpy, все записи разом)
+- LSH: сигнатура делится на полосы, записи с совпавшей полосой —
+  кандидаты; сравниваются только они, а не все пары
+- кандидаты с оценкой сходства Жаккара ≥ порога (или один адрес статьи)
+  объединяются в кластеры (система непересекающихся множеств); разные
+  разновидности («Меченосец белый» и «Меченосец красный») с общим вводным
+  текстом не сливаются: слова одного названия должны входить в другое
+  («Гуппи» и «Гуппи Премиум»)
+- в кластере выбирается каноническая запись (фото, латинское название,
+  параметры воды, длина описания), пустые поля дополняются из остальных
+
+    python3 dedup_catalog.py [fish_catalog.json] [--threshold 0.8] [--dry-run] [--report]
+"""
+
+import argparse
+import time
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+from urllib.parse import urldefrag, urlparse
+
+import numpy as np
+
+from catalog_index import normalize_name
+from catalog_store import atomic_write_json, load_catalog
+
+CATALOG_PATH = Path(__file__).parent.parent / 'fish_catalog.json'
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32              # 32 полосы × 4 строки: кандидаты от сходства ~0.4
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.8         # оценка сходства Жаккара для дубликата
+SEED = 1
+
+_PRIME = (1 << 31) - 1  # a·x < 2^62 помещается в int64
+_MAX_HASH = np.int64(_PRIME)
+
+
+def article_key(url: str) -> str:
+    """Адрес статьи без якоря и раздела: …/akvariumnye_rybki/578-guppi.html → 578-guppi.html"""
+    path = urlparse(urldefrag(url or '')[0]).path.rstrip('/')
+    return path.rsplit('/', 1)[-1]
+
+
+def shingles(record: Dict, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Хэши символьных n-грамм названия и описания"""
+    text = normalize_name(f"{record.get('name_ru', '')} {record.get('description_short', '')}")
+    if len(text) < size:
+        text = text.ljust(size)
+    return {zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1)}
+
+
+def names_compatible(name_a: str, name_b: str) -> bool:
+    """Одно название уточняет другое, а не называет другую разновидность"""
+    words_a, words_b = set(normalize_name(name_a).split()), set(normalize_name(name_b).split())
+    return words_a <= words_b or words_b <= words_a
+
+
+class MinHasher:
+    """Семейство хэш-функций (a·x + b) mod p; сигнатура — минимум по шинглам"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+
+    def signature(self, hashes: Set[int]) -> np.ndarray:
+        if not hashes:
+            return np.full(len(self.a), _MAX_HASH, dtype=np.int64)
+        x = np.fromiter(hashes, dtype=np.int64, count=len(hashes)) % _PRIME
+        return ((np.outer(x, self.a) + self.b) % _PRIME).min(axis=0)
+
+    def signatures(self, shingle_sets: List[Set[int]]) -> np.ndarray:
+        """Матрица сигнатур: записи × хэш-функции"""
+        return np.vstack([self.signature(s) for s in shingle_sets]) if shingle_sets else \
+            np.empty((0, len(self.a)), dtype=np.int64)
+
+
+def lsh_candidates(signatures: np.ndarray, bands: int = BANDS) -> Set[Tuple[int, int]]:
+    """Пары записей, у которых совпала хотя бы одна полоса сигнатуры"""
+    rows = signatures.shape[1] // bands
+    pairs: Set[Tuple[int, int]] = set()
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = defaultdict(list)
+        chunk = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i in range(len(chunk)):
+            buckets[chunk[i].tobytes()].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+class DisjointSet:
+    """Система непересекающихся множеств со сжатием путей"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, x: int, y: int):
+        root_x, root_y = self.find(x), self.find(y)
+        if root_x != root_y:
+            self.parent[max(root_x, root_y)] = min(root_x, root_y)
+
+    def groups(self) -> List[List[int]]:
+        members: Dict[int, List[int]] = defaultdict(list)
+        for x in range(len(self.parent)):
+            members[self.find(x)].append(x)
+        return list(members.values())
+
+
+def find_clusters(records: List[Dict], threshold: float = THRESHOLD) -> Tuple[List[List[int]], Dict]:
+    """Кластеры дубликатов (из двух и более записей) и статистика поиска"""
+    started = time.perf_counter()
+    signatures = MinHasher().signatures([shingles(r) for r in records])
+    candidates = lsh_candidates(signatures)
+
+    clusters = DisjointSet(len(records))
+    keys = [article_key(r.get('article_url', '')) for r in records]
+    by_key: Dict[str, int] = {}
+    for i, key in enumerate(keys):
+        if key:
+            clusters.union(by_key.setdefault(key, i), i)
+
+    # Названия кластера: общее «Макрогнатус» не должно связать двух разных макрогнатусов
+    names = {i: {r.get('name_ru', '')} for i, r in enumerate(records)}
+    for i in range(len(records)):
+        root = clusters.find(i)
+        if root != i:
+            names[root] |= names.pop(i)
+
+    merged_pairs = 0
+    for i, j in sorted(candidates):
+        similarity = float(np.mean(signatures[i] == signatures[j]))
+        if similarity < threshold:
+            continue
+        root_i, root_j = clusters.find(i), clusters.find(j)
+        if root_i == root_j:
+            continue
+        if all(names_compatible(a, b) for a in names[root_i] for b in names[root_j]):
+            clusters.union(root_i, root_j)
+            merged = names.pop(root_i) | names.pop(root_j)
+            names[clusters.find(root_i)] = merged
+            merged_pairs += 1
+
+    groups = [sorted(g) for g in clusters.groups() if len(g) > 1]
+    n = len(records)
+    return groups, {
+        'records': n,
+        'candidate_pairs': len(candidates),
+        'all_pairs': n * (n - 1) // 2,
+        'similar_pairs': merged_pairs,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000),
+    }
+
+
+def completeness(record: Dict) -> tuple:
+    """Ключ выбора канонической записи: чем больше, тем лучше"""
+    water = record.get('water_params') or {}
+    url = record.get('article_url', '')
+    return (
+        bool(record.get('image_url')),
+        bool(record.get('name_lat')),
+        sum(water.get(k) is not None for k in ('ph_min', 'ph_max', 'temp_min', 'temp_max')),
+        -len(record.get('imputed_fields', [])),
+        '#' not in url,
+        len(record.get('description_short', '')),
+        -int(record.get('id') or 0),
+    )
+
+
+def _is_empty(value) -> bool:
+    return value in (None, '', 0, [], {})
+
+
+def merge_cluster(records: List[Dict]) -> Dict:
+    """Каноническая запись кластера с пустыми полями, дополненными из остальных"""
+    ranked = sorted(records, key=completeness, reverse=True)
+    canonical = dict(ranked[0])
+    canonical['water_params'] = dict(canonical.get('water_params') or {})
+    imputed = set(canonical.get('imputed_fields', []))
+
+    for other in ranked[1:]:
+        for field, value in other.items():
+            if field in ('id', 'article_url', 'imputed_fields', 'duplicates'):
+                continue
+            if field == 'water_params':
+                for key, param in (value or {}).items():
+                    if canonical['water_params'].get(key) is None and param is not None:
+                        canonical['water_params'][key] = param
+            elif field == 'incompatible_tags':
+                canonical[field] = sorted(set(canonical.get(field) or []) | set(value or []))
+            elif _is_empty(canonical.get(field)) and not _is_empty(value):
+                canonical[field] = value
+                imputed.discard(field)
+
+    canonical['duplicates'] = sorted(
+        {d for r in ranked[1:] for d in [r.get('id'), *r.get('duplicates', [])]} - {canonical.get('id')},
+        key=lambda d: int(d or 0))
+    if imputed or 'imputed_fields' in canonical:
+        canonical['imputed_fields'] = sorted(imputed)
+    return canonical
+
+
+def dedup(records: List[Dict], threshold: float = THRESHOLD) -> Tuple[List[Dict], List[List[int]], Dict]:
+    """Каталог без дубликатов (порядок по первой записи кластера), кластеры и статистика"""
+    groups, stats = find_clusters(records, threshold)
+    cluster_of = {i: group for group in groups for i in group}
+    result = []
+    for i, record in enumerate(records):
+        group = cluster_of.get(i)
+        if group is None:
+            result.append(record)
+        elif group[0] == i:
+            result.append(merge_cluster([records[j] for j in group]))
+    stats['clusters'] = len(groups)
+    stats['removed'] = len(records) - len(result)
+    return result, groups, stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Поиск и слияние дубликатов статей")
+    arg_parser.add_argument('catalog', nargs='?', default=str(CATALOG_PATH), help="путь к каталогу")
+    arg_parser.add_argument('--output', help="куда сохранить (по умолчанию — тот же файл)")
+    arg_parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                            help=f"порог сходства Жаккара (по умолчанию {THRESHOLD})")
+    arg_parser.add_argument('--report', action='store_true', help="вывести состав кластеров")
+    arg_parser.add_argument('--dry-run', action='store_true', help="только статистика, без записи")
+    args = arg_parser.parse_args()
+
+    records = load_catalog(args.catalog)
+    result, groups, stats = dedup(records, args.threshold)
+
+    print("=" * 60)
+    print("ДЕДУПЛИКАЦИЯ КАТАЛОГА")
+    print("=" * 60)
+    print(f"Записей: {stats['records']} → {len(result)} ({stats['elapsed_ms']} мс)")
+    print(f"Пар-кандидатов LSH: {stats['candidate_pairs']} из {stats['all_pairs']}, "
+          f"похожих: {stats['similar_pairs']}")
+    print(f"Кластеров: {stats['clusters']}, удалено записей: {stats['removed']}")
+
+    if args.report:
+        for group in sorted(groups, key=len, reverse=True):
+            names = {records[i].get('name_ru', '') for i in group}
+            ids = ', '.join(str(records[i].get('id')) for i in group)
+            print(f"  [{ids}] {' | '.join(sorted(names))}")
+
+    if args.dry_run:
+        return
+    output = args.output or args.catalog
+    atomic_write_json(output, result)
+    print(f"\n💾 Сохранено: {output}")
+
+
+if __name__ == "__main__":
+    main()
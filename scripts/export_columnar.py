@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Экспорт каталога в колоночные форматы (Arrow IPC и Parquet) для аналитики
+
+Вместо повторного чтения всего fish_catalog.json анализ читает только
+нужные колонки:
+- fish_catalog.arrow — Arrow IPC без сжатия, открывается через memory map
+  без копирования данных
+- fish_catalog.parquet — сжатый (zstd) файл для хранения и обмена
+
+water_params разворачиваются в колонки ph_min/ph_max/temp_min/temp_max,
+features_list и incompatible_tags хранятся как списки строк.
+
+Требуется pyarrow (pip install pyarrow).
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from catalog_arrays import WATER_FIELDS
+from catalog_store import load_catalog
+
+BASE_DIR = Path(__file__).parent.parent
+CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
+ARROW_PATH = BASE_DIR / 'fish_catalog.arrow'
+PARQUET_PATH = BASE_DIR / 'fish_catalog.parquet'
+
+# Повторяющиеся строки хранятся словарем (код + таблица значений)
+_category = pa.dictionary(pa.int16(), pa.string())
+
+SCHEMA = pa.schema([
+    ('id', pa.int32()),
+    ('name_ru', pa.string()),
+    ('name_lat', pa.string()),
+    ('type', _category),
+    ('family_group', _category),
+    ('size_cm', pa.float32()),
+    ('min_tank_liters', pa.int32()),
+    ('bio_load_points', pa.int16()),
+    ('temperament', _category),
+    ('min_group_size', pa.int16()),
+    ('difficulty', pa.int8()),
+    ('ph_min', pa.float32()),
+    ('ph_max', pa.float32()),
+    ('temp_min', pa.float32()),
+    ('temp_max', pa.float32()),
+    ('incompatible_tags', pa.list_(pa.string())),
+    ('description_short', pa.string()),
+    ('description_compacted', pa.bool_()),
+    ('features_list', pa.list_(pa.string())),
+    ('image_url', pa.string()),
+    ('article_url', pa.string()),
+    ('source_lastmod', pa.string()),
+    ('fetched_at', pa.string()),
+    ('imputed_fields', pa.list_(pa.string())),
+])
+
+
+def records_to_table(records: List[Dict]) -> pa.Table:
+    """Список записей каталога → таблица Arrow по схеме SCHEMA"""
+    columns: Dict[str, list] = {field.name: [] for field in SCHEMA}
+    for record in records:
+        water = record.get('water_params') or {}
+        for name in columns:
+            columns[name].append(water.get(name) if name in WATER_FIELDS else record.get(name))
+    return pa.Table.from_pydict(columns, schema=SCHEMA)
+
+
+def write_arrow(table: pa.Table, path: Path = ARROW_PATH):
+    """Arrow IPC (формат file) без сжатия — пригоден для memory map"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    tmp_path.replace(path)
+
+
+def write_parquet(table: pa.Table, path: Path = PARQUET_PATH):
+    """Parquet со сжатием zstd"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    pq.write_table(table, str(tmp_path), compression='zstd')
+    tmp_path.replace(path)
+
+
+def read_columns(columns: Optional[List[str]] = None, path: Path = ARROW_PATH) -> pa.Table:
+    """
+    Прочитать только нужные колонки.
+    .arrow открывается через memory map, из .parquet читаются только
+    страницы запрошенных колонок.
+    """
+    path = Path(path)
+    if path.suffix == '.parquet':
+        return pq.read_table(str(path), columns=columns, memory_map=True)
+    source = pa.memory_map(str(path), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+
+def is_fresh(path: Path, catalog_path: Path = CATALOG_PATH) -> bool:
+    """Экспорт существует и не старше каталога"""
+    return path.exists() and (not catalog_path.exists()
+                              or path.stat().st_mtime >= catalog_path.stat().st_mtime)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Экспорт каталога в Arrow/Parquet")
+    arg_parser.add_argument('catalog', nargs='?', default=str(CATALOG_PATH), help="путь к каталогу")
+    arg_parser.add_argument('--format', choices=['arrow', 'parquet', 'both'], default='both')
+    arg_parser.add_argument('--output-dir', default=str(BASE_DIR), help="папка для файлов")
+    args = arg_parser.parse_args()
+
+    started = time.perf_counter()
+    table = records_to_table(load_catalog(args.catalog))
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    written = []
+    if args.format in ('arrow', 'both'):
+        written.append(output_dir / ARROW_PATH.name)
+        write_arrow(table, written[-1])
+    if args.format in ('parquet', 'both'):
+        written.append(output_dir / PARQUET_PATH.name)
+        write_parquet(table, written[-1])
+
+    elapsed = (time.perf_counter() - started) * 1000
+    source_size = Path(args.catalog).stat().st_size
+    print(f"✅ Экспортировано записей: {table.num_rows}, колонок: {table.num_columns} ({elapsed:.0f} мс)")
+    print(f"   {Path(args.catalog).name}: {source_size / 1024:.0f} КБ")
+    for path in written:
+        print(f"   {path.name}: {path.stat().st_size / 1024:.0f} КБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,52 +3,53 @@
 """
 Скрипт для извлечения главных изображений рыб со страниц КАТАЛОГА
 (где видны карточки с фото, как на скриншоте)
+
+Режим --harvest: обходит ВСЕ страницы каталога параллельно и собирает
+с карточек название, миниатюру, канонический URL статьи и анонс, не
+открывая сами статьи (~N/10 запросов вместо N). Результаты
+сопоставляются с каталогом через CatalogIndex.
 """
 
-import requests
 from bs4 import BeautifulSoup
+import argparse
 import time
-import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+
+from http_client import fetch_soup, polite_sleep
+from article_classifier import ArticleClassifier
+from catalog_index import CatalogIndex, canonical_url, normalize_name
+from latin_names import LatinNameExtractor
+from catalog_store import CatalogPatcher, atomic_write_json, load_catalog
 
 BASE_DIR = Path(__file__).parent.parent
 CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
 OUTPUT_PATH = BASE_DIR / 'fish_catalog.json'
+HARVEST_PATH = BASE_DIR / 'catalog_listing.json'  # сырые данные карточек
 
 BASE_URL = "https://fanfishka.ru"
 CATALOG_BASE_URL = "https://fanfishka.ru/akvariumnye-stati/akvariumnye_rybki/page/"
+ARTICLE_LINK_RE = re.compile(r'/akvariumnye-stati/akvariumnye_rybki/(?!page/)')
 DELAY_BETWEEN_REQUESTS = 1
+HARVEST_WORKERS = 4  # параллельных загрузок страниц каталога
+SUMMARY_MAX_CHARS = 500
 
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-}
+# Изображения, которые не являются фото рыбы
+SKIP_IMAGE_PATTERNS = [
+    'sovmestimost_akvaryb.png',
+    'баннер', 'banner', 'navigator',
+    'logo', 'icon', 'avatar', 'thumb', 'widget'
+]
 
 def get_page(url: str, retries: int = 3) -> Optional[BeautifulSoup]:
-    """Получить страницу с обработкой ошибок"""
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=10)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            return BeautifulSoup(response.text, 'html.parser')
-        except requests.RequestException as e:
-            if attempt < retries - 1:
-                time.sleep(2)
-            else:
-                return None
-    return None
-
-def extract_fish_images_from_catalog_page(soup: BeautifulSoup, page_url: str) -> Dict[str, str]:
-    """
-    Извлекает изображения рыб со страницы каталога
-    Возвращает словарь: {название_рыбы: url_изображения}
-    """
-    fish_images = {}
-    
-    # Ищем все карточки рыб на странице каталога
+    """Получить страницу через общий пул keep-alive соединений"""
+    return fetch_soup(url, retries=retries)
+
+def find_cards(soup: BeautifulSoup, verbose: bool = True) -> list:
+    """Найти карточки статей на странице каталога"""
     # Различные селекторы для карточек
     card_selectors = [
         '.post-box',
@@ -65,19 +66,61 @@ def extract_fish_images_from_catalog_page(soup: BeautifulSoup, page_url: str) ->
         found_cards = soup.select(selector)
         if found_cards:
             cards = found_cards
-            print(f"   Найдено карточек через селектор '{selector}': {len(cards)}")
+            if verbose:
+                print(f"   Найдено карточек через селектор '{selector}': {len(cards)}")
             break
     
     # Если не нашли через селекторы, ищем по структуре
     if not cards:
         # Ищем все ссылки на статьи о рыбах и их родительские элементы
-        fish_links = soup.find_all('a', href=re.compile(r'/akvariumnye-stati/akvariumnye_rybki/'))
+        fish_links = soup.find_all('a', href=ARTICLE_LINK_RE)
         for link in fish_links:
             # Ищем карточку (родительский элемент)
             card = link.find_parent(['article', 'div', 'li'])
             if card and card not in cards:
                 cards.append(card)
     
+    return cards
+
+def card_image_url(card, min_width: int = 150) -> Optional[str]:
+    """Фото рыбы из карточки (без баннеров, иконок и дефолтной картинки)"""
+    img = card.select_one('img')
+    if not img:
+        return None
+    img_src = (img.get('src') or
+              img.get('data-src') or
+              img.get('data-lazy-src') or
+              img.get('data-original') or
+              img.get('data-url'))
+    if not img_src:
+        return None
+    
+    img_src = urljoin(BASE_URL, img_src)
+    if any(skip in img_src.lower() for skip in SKIP_IMAGE_PATTERNS):
+        return None
+    
+    # Проверяем размер
+    width = img.get('width') or img.get('data-width')
+    if not width:
+        # Если размер не указан, но это не дефолтное - берем
+        return img_src
+    try:
+        w = int(str(width).replace('px', ''))
+        return img_src if w > min_width else None  # Только достаточно большие изображения
+    except ValueError:
+        return img_src
+
+def extract_fish_images_from_catalog_page(soup: BeautifulSoup, page_url: str,
+                                          classifier: Optional[ArticleClassifier] = None) -> Dict[str, str]:
+    """
+    Извлекает изображения рыб со страницы каталога
+    Возвращает словарь: {название_рыбы: url_изображения}
+    """
+    fish_images = {}
+    classifier = classifier or ArticleClassifier()
+    
+    # Ищем все карточки рыб на странице каталога
+    cards = find_cards(soup)
     print(f"   Всего найдено карточек: {len(cards)}")
     
     # Для каждой карточки извлекаем название и изображение
@@ -90,48 +133,161 @@ def extract_fish_images_from_catalog_page(soup: BeautifulSoup, page_url: str) ->
         fish_name = title_elem.get_text(strip=True)
         
         # Пропускаем не-рыбы
-        if any(kw in fish_name.lower() for kw in ['растени', 'оборудован', 'список всех', 'каталог']):
+        if not classifier.is_fish(fish_name):
             continue
         
         # Ищем изображение в карточке
-        img = card.select_one('img')
-        if img:
-            img_src = (img.get('src') or 
-                      img.get('data-src') or 
-                      img.get('data-lazy-src') or
-                      img.get('data-original') or
-                      img.get('data-url'))
-            
-            if img_src:
-                img_src = urljoin(BASE_URL, img_src)
-                
-                # Пропускаем дефолтные и баннеры
-                skip_patterns = [
-                    'sovmestimost_akvaryb.png',
-                    'баннер', 'banner', 'navigator',
-                    'logo', 'icon', 'avatar', 'thumb', 'widget'
-                ]
-                
-                if not any(skip in img_src.lower() for skip in skip_patterns):
-                    # Проверяем размер
-                    width = img.get('width') or img.get('data-width') or '0'
-                    try:
-                        w = int(str(width).replace('px', ''))
-                        if w > 150:  # Только достаточно большие изображения
-                            fish_images[fish_name] = img_src
-                            print(f"      ✓ {fish_name[:30]}: {img_src[:50]}...")
-                    except:
-                        # Если размер не указан, но это не дефолтное - берем
-                        fish_images[fish_name] = img_src
-                        print(f"      ✓ {fish_name[:30]}: {img_src[:50]}...")
+        img_src = card_image_url(card)
+        if img_src:
+            fish_images[fish_name] = img_src
+            print(f"      ✓ {fish_name[:30]}: {img_src[:50]}...")
     
     return fish_images
 
-def normalize_name(name: str) -> str:
-    """Нормализует название для сравнения"""
-    return re.sub(r'[^\w\s]', '', name.lower().strip())
+def harvest_catalog_page(soup: BeautifulSoup, classifier: ArticleClassifier) -> List[Dict]:
+    """
+    Собрать с карточек страницы каталога: название, миниатюру,
+    канонический URL статьи и видимый анонс
+    """
+    entries = []
+    for card in find_cards(soup, verbose=False):
+        link = (card.select_one('h2 a, h3 a, h4 a, .entry-title a, .post-title a') or
+                card.find('a', href=ARTICLE_LINK_RE))
+        if not link or not link.get('href'):
+            continue
+        name = link.get_text(' ', strip=True) or link.get('title', '')
+        if not name or not classifier.is_fish(name):
+            continue
+        
+        # Анонс: абзацы карточки, кроме заголовка
+        summary_parts = [p.get_text(' ', strip=True) for p in card.find_all('p')]
+        summary = ' '.join(part for part in summary_parts if part and part != name)
+        
+        entries.append({
+            'name': name,
+            'article_url': canonical_url(urljoin(BASE_URL, link['href'])),
+            'thumbnail': card_image_url(card) or '',
+            'summary': summary[:SUMMARY_MAX_CHARS],
+        })
+    return entries
+
+def find_last_page(first_page: BeautifulSoup) -> int:
+    """Номер последней страницы каталога по ссылкам пагинации"""
+    last_page = 1
+    pagination_links = first_page.find_all('a', href=re.compile(r'/page/\d+/'))
+    for link in pagination_links:
+        href = link.get('href', '')
+        match = re.search(r'/page/(\d+)/', href)
+        if match:
+            last_page = max(last_page, int(match.group(1)))
+    return last_page
+
+def harvest_all_pages(last_page: int, classifier: ArticleClassifier,
+                      first_page: Optional[BeautifulSoup] = None,
+                      workers: int = HARVEST_WORKERS) -> List[Dict]:
+    """Параллельно обойти все страницы каталога; карточки в порядке страниц"""
+    
+    def harvest_page(page_num: int) -> List[Dict]:
+        if page_num == 1 and first_page is not None:
+            soup = first_page
+        else:
+            soup = get_page(f"{CATALOG_BASE_URL}{page_num}/")
+            polite_sleep(DELAY_BETWEEN_REQUESTS)  # вежливость: пауза на поток
+        if not soup:
+            print(f"   ⚠ Страница {page_num}: не удалось загрузить")
+            return []
+        entries = harvest_catalog_page(soup, classifier)
+        print(f"   [Страница {page_num}/{last_page}] карточек: {len(entries)}")
+        return entries
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pages = list(executor.map(harvest_page, range(1, last_page + 1)))
+    
+    # Одна статья может встречаться на нескольких страницах
+    seen = set()
+    entries = []
+    for page_entries in pages:
+        for entry in page_entries:
+            if entry['article_url'] not in seen:
+                seen.add(entry['article_url'])
+                entries.append(entry)
+    return entries
+
+def is_default_image(image_url: str) -> bool:
+    """Изображение дефолтное, баннер или отсутствует"""
+    image_url = (image_url or '').lower()
+    return (not image_url or 'sovmestimost' in image_url or
+            'баннер' in image_url or 'banner' in image_url)
+
+def apply_harvest(entries: List[Dict], catalog_data: List[Dict]) -> Dict[str, int]:
+    """Сопоставить карточки с каталогом и обновить записи; возвращает статистику"""
+    index = CatalogIndex(catalog_data, LatinNameExtractor.from_sources(catalog_data))
+    stats = {'matched': 0, 'images': 0, 'urls': 0, 'descriptions': 0, 'unmatched': 0}
+    
+    for entry in entries:
+        record, method = index.match(name=entry['name'], url=entry['article_url'],
+                                     text=entry['summary'])
+        if record is None:
+            stats['unmatched'] += 1
+            continue
+        stats['matched'] += 1
+        
+        if entry['thumbnail'] and is_default_image(record.get('image_url', '')):
+            record['image_url'] = entry['thumbnail']
+            stats['images'] += 1
+            print(f"   ✅ Обновлено ({method}): {record['name_ru'][:30]}")
+        if not record.get('article_url'):
+            record['article_url'] = entry['article_url']
+            stats['urls'] += 1
+        if entry['summary'] and not record.get('description_short'):
+            record['description_short'] = entry['summary']
+            stats['descriptions'] += 1
+    return stats
+
+def run_harvest(catalog_data: List[Dict], workers: int = HARVEST_WORKERS, output_path: Path = OUTPUT_PATH):
+    """Режим полного сбора со страниц каталога (без открытия статей)"""
+    classifier = ArticleClassifier.from_catalog(CATALOG_PATH)
+    
+    first_page = get_page(f"{CATALOG_BASE_URL}1/")
+    if not first_page:
+        print("❌ Не удалось загрузить первую страницу каталога")
+        return
+    last_page = find_last_page(first_page)
+    print(f"📄 Найдено страниц каталога: {last_page}, потоков: {workers}")
+    print()
+    
+    started = time.time()
+    entries = harvest_all_pages(last_page, classifier, first_page=first_page, workers=workers)
+    print(f"\n📦 Собрано карточек: {len(entries)} за {time.time() - started:.1f} с")
+    
+    atomic_write_json(HARVEST_PATH, entries)
+    print(f"📁 Карточки сохранены в: {HARVEST_PATH}")
+    
+    stats = apply_harvest(entries, catalog_data)
+    
+    print(f"\n💾 Сохранение результатов...")
+    atomic_write_json(output_path, catalog_data)
+    
+    print()
+    print("=" * 60)
+    print("РЕЗУЛЬТАТЫ")
+    print("=" * 60)
+    print(f"🔗 Сопоставлено с каталогом: {stats['matched']} (не найдено: {stats['unmatched']})")
+    print(f"✅ Обновлено изображений: {stats['images']}")
+    print(f"🌐 Добавлено URL статей: {stats['urls']}")
+    print(f"📝 Добавлено описаний: {stats['descriptions']}")
+    print(f"📁 Результат сохранен в: {output_path}")
+    print()
+    print("✨ Готово!")
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="Изображения рыб со страниц каталога fanfishka.ru")
+    arg_parser.add_argument('--harvest', action='store_true',
+                            help="собрать карточки со всех страниц каталога параллельно")
+    arg_parser.add_argument('--workers', type=int, default=HARVEST_WORKERS,
+                            help="число параллельных загрузок в режиме --harvest")
+    args = arg_parser.parse_args()
+    
     print("=" * 60)
     print("ИЗВЛЕЧЕНИЕ ГЛАВНЫХ ИЗОБРАЖЕНИЙ СО СТРАНИЦ КАТАЛОГА")
     print("=" * 60)
@@ -139,14 +295,23 @@ def main():
     
     # Читаем существующий каталог
     print("📖 Чтение каталога...")
-    with open(CATALOG_PATH, 'r', encoding='utf-8') as f:
-        catalog_data = json.load(f)
+    catalog_data = load_catalog(CATALOG_PATH)
     
     print(f"✅ Загружено {len(catalog_data)} записей")
     
+    if args.harvest:
+        run_harvest(catalog_data, workers=args.workers)
+        return
+    
+    # Правки копятся в журнале; каталог переписывается один раз в конце
+    patcher = CatalogPatcher(OUTPUT_PATH)
+    recovered = patcher.apply_pending(catalog_data)
+    if recovered:
+        print(f"♻ Восстановлено {recovered} правок из журнала прерванного запуска")
+    
     # Фильтруем только статьи о рыбах
     fish_articles = [
-        item for item in catalog_data 
+        item for item in catalog_data
         if (item.get('size_cm', 0) > 0 or item.get('min_tank_liters', 0) > 0) and
            not any(kw in item.get('name_ru', '').lower() for kw in ['растени', 'оборудован', 'список'])
     ]
@@ -156,6 +321,8 @@ def main():
     catalog_dict = {item['id']: item for item in catalog_data}
     fish_name_map = {normalize_name(item['name_ru']): item['id'] for item in fish_articles}
     
+    classifier = ArticleClassifier.from_catalog(CATALOG_PATH)
+    
     print(f"\n🔄 Парсинг страниц каталога для извлечения изображений...")
     print()
     
@@ -166,13 +333,7 @@ def main():
         return
     
     # Ищем последнюю страницу
-    last_page = 1
-    pagination_links = first_page.find_all('a', href=re.compile(r'/page/\d+/'))
-    for link in pagination_links:
-        href = link.get('href', '')
-        match = re.search(r'/page/(\d+)/', href)
-        if match:
-            last_page = max(last_page, int(match.group(1)))
+    last_page = find_last_page(first_page)
     
     print(f"📄 Найдено страниц каталога: {last_page}")
     print()
@@ -191,7 +352,7 @@ def main():
             continue
         
         # Извлекаем изображения со страницы
-        fish_images = extract_fish_images_from_catalog_page(soup, page_url)
+        fish_images = extract_fish_images_from_catalog_page(soup, page_url, classifier)
         
         # Обновляем каталог
         for fish_name, image_url in fish_images.items():
@@ -201,26 +362,22 @@ def main():
                 if fish_id in catalog_dict:
                     old_image = catalog_dict[fish_id].get('image_url', '')
                     # Обновляем только если старое изображение дефолтное или баннер
-                    if ('sovmestimost' in old_image.lower() or 
-                        'баннер' in old_image.lower() or 
-                        'banner' in old_image.lower() or
-                        not old_image):
+                    if is_default_image(old_image):
                         catalog_dict[fish_id]['image_url'] = image_url
+                        patcher.patch(fish_id, image_url=image_url)
                         total_updated += 1
                         print(f"   ✅ Обновлено: {catalog_dict[fish_id]['name_ru'][:30]}")
         
-        # Промежуточное сохранение каждые 10 страниц
+        # Журнал сбрасывается на диск каждые 10 страниц
         if page_num % 10 == 0:
-            with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-                json.dump(list(catalog_dict.values()), f, ensure_ascii=False, indent=2)
-            print(f"\n💾 Промежуточное сохранение ({page_num} страниц обработано)\n")
+            patcher.sync()
+            print(f"\n💾 Журнал правок сохранен ({page_num} страниц обработано)\n")
         
-        time.sleep(DELAY_BETWEEN_REQUESTS)
+        polite_sleep(DELAY_BETWEEN_REQUESTS)
     
     # Сохраняем обновленный каталог
     print(f"\n💾 Сохранение результатов...")
-    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-        json.dump(list(catalog_dict.values()), f, ensure_ascii=False, indent=2)
+    patcher.commit(list(catalog_dict.values()))
     
     print()
     print("=" * 60)
@@ -233,4 +390,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -3,17 +3,23 @@
 """
 Скрипт для извлечения ТОЛЬКО изображений из уже собранных статей о рыбах
 Не парсит статьи заново, только обновляет изображения
+
+Статьи обрабатываются по ценности (crawl_frontier.py): сначала виды из
+FISH_WITHOUT_IMAGES.txt и комплектов. --budget N ограничивает число
+запросов к сайту.
 """
 
-import requests
 from bs4 import BeautifulSoup
-import time
-import json
+import argparse
 import re
 from urllib.parse import urljoin
 from pathlib import Path
 from typing import Optional
 
+from http_client import fetch_soup, polite_sleep
+from catalog_store import CatalogPatcher, load_catalog
+from crawl_frontier import Frontier, needs_image
+
 BASE_DIR = Path(__file__).parent.parent
 CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
 OUTPUT_PATH = BASE_DIR / 'fish_catalog.json'  # Перезаписываем исходный файл
@@ -21,24 +27,9 @@ OUTPUT_PATH = BASE_DIR / 'fish_catalog.json'  # Перезаписываем и
 BASE_URL = "https://fanfishka.ru"
 DELAY_BETWEEN_REQUESTS = 1
 
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-}
-
 def get_page(url: str, retries: int = 3) -> Optional[BeautifulSoup]:
-    """Получить страницу с обработкой ошибок"""
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=10)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            return BeautifulSoup(response.text, 'html.parser')
-        except requests.RequestException as e:
-            if attempt < retries - 1:
-                time.sleep(2)
-            else:
-                return None
-    return None
+    """Получить страницу через общий пул keep-alive соединений"""
+    return fetch_soup(url, retries=retries)
 
 def extract_image_from_page(soup: BeautifulSoup) -> Optional[str]:
     """Извлечь главное изображение рыбы со страницы каталога"""
@@ -255,6 +246,11 @@ def reconstruct_url(item: dict) -> list:
     return possible_urls
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="Обновление изображений записей каталога")
+    arg_parser.add_argument('--budget', type=int, metavar='N', help="не больше N запросов к сайту")
+    arg_parser.add_argument('--no-priority', action='store_true', help="в порядке каталога, без crawl_frontier.py")
+    args = arg_parser.parse_args()
+    
     print("=" * 60)
     print("ИЗВЛЕЧЕНИЕ ИЗОБРАЖЕНИЙ ДЛЯ АКВАРИУМНЫХ РЫБ")
     print("=" * 60)
@@ -262,25 +258,30 @@ def main():
     
     # Читаем существующий каталог
     print("📖 Чтение каталога...")
-    with open(CATALOG_PATH, 'r', encoding='utf-8') as f:
-        catalog_data = json.load(f)
+    catalog_data = load_catalog(CATALOG_PATH)
     
     print(f"✅ Загружено {len(catalog_data)} записей")
     
+    # Правки копятся в журнале; каталог переписывается один раз в конце
+    patcher = CatalogPatcher(OUTPUT_PATH)
+    recovered = patcher.apply_pending(catalog_data)
+    if recovered:
+        print(f"♻ Восстановлено {recovered} правок из журнала прерванного запуска")
+    
     # Фильтруем только статьи о рыбах
     fish_articles = [item for item in catalog_data if is_fish_article(item)]
     print(f"✅ Найдено {len(fish_articles)} статей о рыбах")
     
     # Фильтруем те, у которых дефолтное изображение или баннеры
-    articles_to_update = [
-        item for item in fish_articles 
-        if ('sovmestimost_akvaryb.png' in item.get('image_url', '').lower() or
-            'баннер' in item.get('image_url', '').lower() or
-            'banner' in item.get('image_url', '').lower() or
-            not item.get('image_url') or
-            item.get('image_url', '').strip() == '')
-    ]
+    articles_to_update = [item for item in fish_articles if needs_image(item)]
     print(f"📸 Требуют обновления изображений: {len(articles_to_update)}")
+    if not args.no_priority:
+        # Самые ценные пробелы — первыми: бюджета может не хватить на все
+        ranked = Frontier.from_files(catalog_data).rank(articles_to_update)
+        articles_to_update = [entry.record for entry in ranked]
+        if ranked:
+            print(f"🎯 Первая по приоритету: {ranked[0].record.get('name_ru', '')} "
+                  f"({', '.join(ranked[0].reasons)})")
     print()
     
     # Создаем словарь для быстрого поиска
@@ -290,11 +291,16 @@ def main():
     updated_count = 0
     not_found_count = 0
     error_count = 0
+    requests_made = 0
     
     print("🔄 Начало извлечения изображений...")
     print()
     
     for i, item in enumerate(articles_to_update, 1):
+        if args.budget is not None and requests_made >= args.budget:
+            print(f"\n⏹ Бюджет {args.budget} запросов исчерпан, отложено статей: "
+                  f"{len(articles_to_update) - i + 1}")
+            break
         article_id = item.get('id')
         fish_name = item.get('name_ru', 'N/A')[:40]
         
@@ -309,12 +315,15 @@ def main():
         
         image_found = False
         for url in possible_urls:
+            if args.budget is not None and requests_made >= args.budget:
+                break
+            requests_made += 1
             soup = get_page(url)
             if soup:
                 new_image = extract_image_from_page(soup)
                 # Проверяем, что это не дефолтное и не баннер
                 if new_image and not any(skip in new_image.lower() for skip in ['sovmestimost', 'баннер', 'banner', 'navigator']):
-                    catalog_dict[article_id]['image_url'] = new_image
+                    patcher.patch(article_id, image_url=new_image)
                     updated_count += 1
                     print(f"   ✅ Найдено: {new_image[:60]}...")
                     image_found = True
@@ -323,24 +332,22 @@ def main():
                     # Пробуем следующий URL
                     continue
             
-            time.sleep(DELAY_BETWEEN_REQUESTS)
+            polite_sleep(DELAY_BETWEEN_REQUESTS)
         
         if not image_found:
             not_found_count += 1
             print(f"   ❌ Изображение не найдено")
         
-        # Промежуточное сохранение каждые 50 статей
+        # Журнал сбрасывается на диск каждые 50 статей
         if i % 50 == 0:
-            with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-                json.dump(list(catalog_dict.values()), f, ensure_ascii=False, indent=2)
-            print(f"\n💾 Промежуточное сохранение ({i} статей обработано)\n")
+            patcher.sync()
+            print(f"\n💾 Журнал правок сохранен ({i} статей обработано)\n")
         
-        time.sleep(DELAY_BETWEEN_REQUESTS)
+        polite_sleep(DELAY_BETWEEN_REQUESTS)
     
     # Сохраняем обновленный каталог
     print(f"\n💾 Сохранение результатов...")
-    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-        json.dump(list(catalog_dict.values()), f, ensure_ascii=False, indent=2)
+    patcher.commit(list(catalog_dict.values()))
     
     print()
     print("=" * 60)
@@ -349,6 +356,7 @@ def main():
     print(f"✅ Обновлено изображений: {updated_count}")
     print(f"❌ Не найдено: {not_found_count}")
     print(f"⚠ Ошибки: {error_count}")
+    print(f"🌐 Запросов к сайту: {requests_made}")
     print(f"📁 Результат сохранен в: {OUTPUT_PATH}")
     print()
     print("✨ Готово!")
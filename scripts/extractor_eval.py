@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Эталонный набор для экстракторов: точность по полям и скорость
+
+Эталон (extractor_golden.json) засевается из src/data/freshwater_species.json:
+там вручную выверены pH, температура, размер и темперамент. Виды
+сопоставляются со статьями каталога (CatalogIndex), страницы статей
+хранятся в кассете (http_cassette.py), поэтому проверка идет без сети и
+каждый раз на одних и тех же страницах.
+
+    python3 extractor_eval.py build --record     # эталон + запись страниц в кассету
+    python3 extractor_eval.py run                # точность и скорость
+    python3 extractor_eval.py run --output report.json
+    python3 extractor_eval.py run --compare report.json   # код 1, если F1 поля упал
+
+Для каждого поля: precision = верные / извлеченные, recall = верные /
+заданные в эталоне; числа сравниваются с допуском TOLERANCES. Поле
+без значения в эталоне (null — неизвестно) не оценивается. Скорость —
+записей в секунду для разбора HTML, extract_fish_record целиком,
+extract_water_params / extract_size / extract_temperament по тексту
+статьи и селекторов изображений extract_images_only.py и reparse_images.py.
+
+Статья подходит виду, только если все слова ее заголовка есть в
+названии вида («Скалярии» — да, «Скалярия биколор» и «Цихлазомы виды»
+— нет): name_lat каталога извлечен парсером и часто указывает на статью
+о другой форме или обзор рода.
+
+Значения эталона — это данные вида, а не текст конкретной статьи.
+Сверенные со страницей записи отмечаются "verified": true, их значения
+взяты из текста статьи (null — в статье не указано). build их не
+перезаписывает, а run --verified оценивает только их. Ожидаемое
+изображение задается только вручную, поэтому поля image_url оцениваются
+только на сверенных записях. Поле, для которого в эталоне нет ни одного
+значения, в отчет не попадает.
+
+Кассета extractor_golden.cassette не хранится в репозитории, и run
+в свежей копии не запустится: сначала нужна запись из сети (build
+--record). Каждый записывает свой снимок сайта, поэтому отчеты
+сравнимы только на одной кассете: отчет хранит ее отпечаток, и
+--compare предупреждает, если кассета другая.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urlsplit
+
+from catalog_index import MIN_TOKEN_LENGTH, CatalogIndex, canonical_url, name_tokens, normalize_name
+from catalog_store import atomic_write_json, load_catalog
+from crawl_frontier import needs_image
+
+BASE_DIR = Path(__file__).parent.parent
+CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
+SPECIES_PATH = BASE_DIR / 'src' / 'data' / 'freshwater_species.json'
+GOLDEN_PATH = BASE_DIR / 'extractor_golden.json'
+GOLDEN_CASSETTE = BASE_DIR / 'extractor_golden.cassette'
+
+WATER_FIELDS = ('ph_min', 'ph_max', 'temp_min', 'temp_max')
+# Допуск для чисел: (абсолютный, относительный) — верно, если укладывается в больший
+TOLERANCES = {
+    'ph_min': (0.5, 0.0),
+    'ph_max': (0.5, 0.0),
+    'temp_min': (1.0, 0.0),
+    'temp_max': (1.0, 0.0),
+    'size_cm': (1.0, 0.2),
+}
+IMAGE_FIELDS = ('image_url', 'image_url:extract_images_only', 'image_url:reparse_images')
+FIELDS = (*WATER_FIELDS, 'size_cm', 'temperament', *IMAGE_FIELDS)
+# Темперамент в freshwater_species.json подробнее, чем три класса extract_temperament;
+# «Активный» и «Прихотливый» — не темперамент, такие виды поле не оценивают
+TEMPERAMENT_CLASSES = {
+    'Мирный': 'Мирный',
+    'Полуагрессивный': 'Полуагрессивный',
+    'Территориальный': 'Полуагрессивный',
+    'Задира': 'Полуагрессивный',
+    'Агрессивный_к_своим': 'Полуагрессивный',
+    'Агрессивный': 'Агрессивный',
+    'Хищник': 'Агрессивный',
+}
+# Слова заголовка статьи, которые не отличают вид («Рыбка петушок», «Парчовый сом»)
+GENERIC_WORDS = {'рыбка', 'рыбки', 'рыба', 'аквариумная', 'сом'}
+ENDING_LENGTH = 2  # слова различаются только окончанием: «скалярии» ~ «скалярия», «дискусы» ~ «дискус»
+REPEAT = 3
+MAX_F1_DROP = 0.02
+
+_THUMBNAIL_SUFFIX = re.compile(r'-\d+x\d+(?=\.\w+$)')
+
+
+def image_key(url: Optional[str]) -> str:
+    """Путь изображения без домена и суффикса миниатюры WordPress (-300x200)"""
+    if not url:
+        return ''
+    return _THUMBNAIL_SUFFIX.sub('', urlsplit(url).path.lower())
+
+
+def _same_word(a: str, b: str) -> bool:
+    return len(os.path.commonprefix([a, b])) >= max(len(a), len(b)) - ENDING_LENGTH
+
+
+def title_words(title: str) -> set:
+    """Слова заголовка статьи без второго названия («Неон голубой или обыкновенный»)"""
+    title = re.split(r'\s+или\s+', title.lower(), maxsplit=1)[0]
+    return name_tokens(title) - GENERIC_WORDS
+
+
+def names_agree(species_name: str, title: str) -> int:
+    """
+    Число слов заголовка, если все они есть в названии вида и среди них
+    видовое слово («Акантофтальмус Кюля» — не «Акантофтальмусы»), иначе 0
+    """
+    words = title_words(title)
+    species_words = name_tokens(species_name)
+    own = [w for w in normalize_name(re.sub(r'\(.*?\)', ' ', species_name)).split()
+           if len(w) >= MIN_TOKEN_LENGTH and w not in GENERIC_WORDS]
+    if not words or not all(any(_same_word(w, s) for s in species_words) for w in words):
+        return 0
+    if own and not any(_same_word(w, own[-1]) for w in words):
+        return 0
+    return len(words)
+
+
+def find_article(index: CatalogIndex, sp: Dict) -> Tuple[Optional[Dict], str]:
+    """
+    Статья вида: совпадение CatalogIndex, если заголовок согласуется с
+    названием, иначе самый полный согласованный заголовок каталога
+    (несколько разных статей с одинаковой оценкой — нет совпадения; одна
+    статья бывает в каталоге по двум адресам, они сравниваются по имени файла)
+    """
+    name = sp.get('name_ru', '')
+    record, how = index.match(name=name, name_lat=sp.get('name_lat', ''))
+    if record is not None and record.get('article_url') and names_agree(name, record.get('name_ru', '')):
+        return record, how
+    best: Dict[str, Dict] = {}
+    best_score = 0
+    for candidate in index.records:
+        article = canonical_url(candidate.get('article_url', '')).rsplit('/', 1)[-1]
+        score = names_agree(name, candidate.get('name_ru', '')) if article else 0
+        if score > best_score:
+            best, best_score = {}, score
+        if score and score == best_score:
+            best.setdefault(article, candidate)
+    if len(best) == 1:
+        return next(iter(best.values())), 'title'
+    return None, ''
+
+
+def build_golden(species: List[Dict], records: List[Dict], previous: List[Dict]) -> List[Dict]:
+    """Эталон из видов и каталога; сверенные вручную записи переносятся как есть"""
+    verified = {entry['id']: entry for entry in previous if entry.get('verified')}
+    index = CatalogIndex(records)
+    golden = []
+    for sp in species:
+        if sp['id'] in verified:
+            golden.append(verified[sp['id']])
+            continue
+        record, how = find_article(index, sp)
+        water = sp.get('water_params') or {}
+        expected = {name: water.get(name) for name in WATER_FIELDS}
+        expected['size_cm'] = sp.get('size_cm') or None
+        expected['temperament'] = TEMPERAMENT_CLASSES.get(sp.get('temperament', ''))
+        expected['image_url'] = None  # только вручную, по странице статьи
+        golden.append({
+            'id': sp['id'],
+            'name_ru': sp.get('name_ru', ''),
+            'name_lat': sp.get('name_lat', ''),
+            'article_url': urldefrag(record['article_url'])[0] if record and record.get('article_url') else None,
+            'match': how,
+            'verified': False,
+            'expected': expected,
+        })
+    return golden
+
+
+def record_pages(golden: List[Dict], cassette_path: Path) -> Tuple[int, int]:
+    """Загрузить страницы эталона в кассету (уже записанные не запрашиваются)"""
+    from http_cassette import use_cassette
+    from http_client import fetch, polite_sleep
+
+    cassette = use_cassette(cassette_path, 'auto')
+    missing = 0
+    for entry in golden:
+        if not entry['article_url']:
+            continue
+        recorded = cassette.recorded
+        if fetch(entry['article_url']) is None:
+            missing += 1
+        if cassette.recorded > recorded:
+            polite_sleep(1)  # только для запросов в сеть
+    return cassette.recorded, missing
+
+
+def load_pages(golden: List[Dict], cassette_path: Path) -> Tuple[List[Tuple[Dict, bytes]], int]:
+    """Страницы эталона из кассеты; (страницы, сколько нет в кассете)"""
+    from http_cassette import use_cassette
+    from http_client import fetch
+
+    use_cassette(cassette_path, 'replay')
+    pages, missing = [], 0
+    for entry in golden:
+        if not entry['article_url']:
+            continue
+        response = fetch(entry['article_url'], retries=1)
+        if response is None:
+            missing += 1
+        else:
+            pages.append((entry, response.content))
+    return pages, missing
+
+
+def is_correct(field: str, predicted, expected) -> bool:
+    if field in TOLERANCES:
+        absolute, relative = TOLERANCES[field]
+        return abs(float(predicted) - float(expected)) <= max(absolute, relative * abs(float(expected)))
+    if field.startswith('image_url'):
+        return image_key(predicted) == image_key(expected)
+    return predicted == expected
+
+
+def predictions(record, images: Dict[str, Optional[str]]) -> Dict:
+    """Значения полей, извлеченные со страницы (None — не извлечено)"""
+    values = {name: record.water_params.get(name) for name in WATER_FIELDS}
+    values['size_cm'] = record.size_cm or None
+    values['temperament'] = record.temperament or None
+    values['image_url'] = record.image_url or None
+    values.update(images)
+    for field in IMAGE_FIELDS:
+        if values[field] and needs_image({'image_url': values[field]}):
+            values[field] = None  # заглушка сайта — это не найденное фото
+    return values
+
+
+def score(counts: Counter) -> Dict[str, float]:
+    precision = counts['correct'] / counts['predicted'] if counts['predicted'] else 0.0
+    recall = counts['correct'] / counts['expected'] if counts['expected'] else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'expected': counts['expected'], 'predicted': counts['predicted'], 'correct': counts['correct'],
+            'precision': round(precision, 3), 'recall': round(recall, 3), 'f1': round(f1, 3)}
+
+
+def evaluate(pages: List[Tuple[Dict, bytes]], repeat: int = REPEAT) -> Dict:
+    """Точность по полям (первый проход) и записей в секунду по этапам (все проходы)"""
+    from bs4 import BeautifulSoup
+    from extract_images_only import extract_image_from_page as image_from_catalog_page
+    from fanfishka_parser import FanFishkaParser
+    from reparse_images import extract_image_from_page as image_from_article
+
+    parser = FanFishkaParser(output_file=str(CATALOG_PATH))
+    counts: Dict[str, Counter] = {field: Counter() for field in FIELDS}
+    seconds: Counter = Counter()
+
+    def timed(stage: str, func: Callable, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds[stage] += time.perf_counter() - started
+        return result
+
+    for attempt in range(repeat):
+        for entry, content in pages:
+            url = entry['article_url']
+            soup = timed('html', BeautifulSoup, content, 'html.parser', from_encoding='utf-8')
+            record = timed('extract_fish_record', parser.extract_fish_record, soup, url)
+            text, _ = parser.find_article_text(soup)
+            timed('extract_water_params', parser.extract_water_params, text)
+            timed('extract_size', parser.extract_size, text)
+            timed('extract_temperament', parser.extract_temperament, text)
+            images = {
+                'image_url:extract_images_only': timed('extract_images_only', image_from_catalog_page, soup),
+                'image_url:reparse_images': timed('reparse_images', image_from_article, soup, url),
+            }
+            soup.decompose()
+            if attempt:
+                continue
+            predicted = predictions(record, images)
+            for field in FIELDS:
+                expected = entry['expected'].get(field.split(':')[0])
+                if expected is None or (field in IMAGE_FIELDS and not entry['verified']):
+                    continue  # неизвестно; изображение — только сверенное вручную
+                value = predicted[field]
+                counts[field]['expected'] += 1
+                if value is not None:
+                    counts[field]['predicted'] += 1
+                    if is_correct(field, value, expected):
+                        counts[field]['correct'] += 1
+
+    processed = len(pages) * repeat
+    return {
+        'pages': len(pages),
+        'repeat': repeat,
+        'fields': {field: score(counts[field]) for field in FIELDS if counts[field]['expected']},
+        'unscored': [field for field in FIELDS if not counts[field]['expected']],
+        'records_per_second': {stage: round(processed / total, 1) for stage, total in seconds.items() if total},
+    }
+
+
+def cassette_fingerprint(path: Path) -> str:
+    """Отпечаток кассеты: отчеты сравнимы, только если он совпадает"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def compare(report: Dict, baseline: Dict, max_drop: float = MAX_F1_DROP) -> List[str]:
+    """Поля, у которых F1 упал больше чем на max_drop"""
+    worse = []
+    for field, current in report['fields'].items():
+        before = baseline.get('fields', {}).get(field)
+        if before and before['f1'] - current['f1'] > max_drop:
+            worse.append(f"{field}: F1 {before['f1']:.3f} → {current['f1']:.3f}")
+    return worse
+
+
+def print_report(report: Dict, baseline: Optional[Dict] = None):
+    print(f"Страниц: {report['pages']} (проходов для замера скорости: {report['repeat']})")
+    print(f"{'поле':32} {'эталон':>6} {'извл.':>6} {'верно':>6} {'precision':>9} {'recall':>7} {'F1':>6}")
+    for field, s in report['fields'].items():
+        delta = ''
+        if baseline and field in baseline.get('fields', {}):
+            delta = f"  ({s['f1'] - baseline['fields'][field]['f1']:+.3f})"
+        print(f"{field:32} {s['expected']:6} {s['predicted']:6} {s['correct']:6} "
+              f"{s['precision']:9.3f} {s['recall']:7.3f} {s['f1']:6.3f}{delta}")
+    if report.get('unscored'):
+        print(f"Не оцениваются (нет значений в эталоне): {', '.join(report['unscored'])}")
+    print("\nЗаписей в секунду:")
+    for stage, rate in report['records_per_second'].items():
+        delta = ''
+        before = (baseline or {}).get('records_per_second', {}).get(stage)
+        if before:
+            delta = f"  ({(rate / before - 1) * 100:+.0f}%)"
+        print(f"  {stage:28} {rate:10.1f}{delta}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Точность и скорость экстракторов на эталонном наборе")
+    arg_parser.add_argument('--golden', default=str(GOLDEN_PATH), help="файл эталона")
+    arg_parser.add_argument('--cassette', default=str(GOLDEN_CASSETTE), help="кассета со страницами эталона")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="собрать эталон из freshwater_species.json и каталога")
+    build.add_argument('--catalog', default=str(CATALOG_PATH), help="каталог со ссылками на статьи")
+    build.add_argument('--record', action='store_true', help="записать страницы статей в кассету (сеть)")
+
+    run = commands.add_parser('run', help="оценить экстракторы")
+    run.add_argument('--verified', action='store_true', help="только сверенные вручную записи")
+    run.add_argument('--repeat', type=int, default=REPEAT, help="проходов для замера скорости")
+    run.add_argument('--output', help="сохранить отчет JSON")
+    run.add_argument('--compare', metavar='REPORT', help="сравнить с прошлым отчетом")
+    run.add_argument('--max-drop', type=float, default=MAX_F1_DROP, help="допустимое падение F1")
+    args = arg_parser.parse_args()
+
+    golden_path = Path(args.golden)
+    previous = load_catalog(golden_path) if golden_path.exists() else []
+
+    if args.command == 'build':
+        golden = build_golden(load_catalog(SPECIES_PATH), load_catalog(args.catalog), previous)
+        atomic_write_json(golden_path, golden)
+        linked = sum(1 for entry in golden if entry['article_url'])
+        print(f"✅ {golden_path.name}: {len(golden)} видов, со статьей {linked}, "
+              f"сверено вручную {sum(1 for entry in golden if entry['verified'])}")
+        if args.record:
+            recorded, missing = record_pages(golden, Path(args.cassette))
+            print(f"📼 {Path(args.cassette).name}: записано страниц {recorded}, не загрузилось {missing}")
+        return
+
+    golden = [entry for entry in previous if entry['verified'] or not args.verified]
+    if not golden:
+        arg_parser.error("нет сверенных вручную записей (\"verified\": true)" if args.verified and previous
+                         else f"эталон пуст: {golden_path} (python3 extractor_eval.py build)")
+    if not Path(args.cassette).exists():
+        arg_parser.error(f"нет кассеты {args.cassette}: python3 extractor_eval.py build --record")
+    pages, missing = load_pages(golden, Path(args.cassette))
+    if missing:
+        print(f"⚠️ Нет в кассете страниц: {missing} (build --record)")
+    if not pages:
+        arg_parser.error("нет страниц для оценки")
+
+    report = evaluate(pages, args.repeat)
+    report['cassette'] = cassette_fingerprint(Path(args.cassette))
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('cassette') != report['cassette']:
+            print(f"⚠️ {args.compare} снят на другой кассете: разница может быть в страницах, а не в коде")
+    print_report(report, baseline)
+    if args.output:
+        atomic_write_json(args.output, report)
+        print(f"📄 Отчет: {args.output}")
+    if baseline:
+        worse = compare(report, baseline, args.max_drop)
+        if worse:
+            print("❌ Точность упала:\n  " + "\n  ".join(worse))
+            sys.exit(1)
+        print("✅ Точность не хуже прошлого отчета")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,36 @@
 # -*- coding: utf-8 -*-
 """
 Скрипт для парсинга каталога аквариумных рыбок с сайта fanfishka.ru
+
+С --low-memory память не растет с размером каталога: записи сразу
+уходят в журнал JSON Lines (fish_catalog.jsonl), прошлый обход читается
+по смещениям из временного файла, а каталог собирается из журнала
+потоково в конце. Дерево BeautifulSoup каждой страницы разбирается
+(decompose) сразу после извлечения в любом режиме.
+
+С --priority статьи обходятся по ценности (crawl_frontier.py: виды без
+фото, виды комплектов, пустые name_lat/size_cm, давность fetched_at),
+--budget N ограничивает число загрузок: для остальных статей остается
+запись прошлого обхода.
 """
 
-import requests
-from bs4 import BeautifulSoup
-import time
+from bs4 import BeautifulSoup, Tag
+from datetime import datetime, timezone
 import json
 import re
-from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Optional
+from urllib.parse import urldefrag, urljoin, urlparse
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from pathlib import Path
 import logging
+import argparse
+import os
+
+from http_client import create_session, fetch_soup, polite_sleep
+from sitemap_discovery import discover_articles, is_unchanged
+from article_classifier import ArticleClassifier
+from catalog_store import RecordJournal, atomic_write_json, atomic_write_records, iter_catalog
+from fulltext_index import FullTextIndex
+from latin_names import LatinNameExtractor
 
 # Настройка логирования
 logging.basicConfig(
@@ -25,39 +45,87 @@ BASE_URL = "https://fanfishka.ru"
 START_URL = "https://fanfishka.ru/akvariumnye-stati/akvariumnye_rybki/page/1/"
 DELAY_BETWEEN_REQUESTS = 1  # секунды
 OUTPUT_FILE = "fish_catalog.json"
+SAVE_EVERY = 10  # промежуточное сохранение каталога (с --low-memory — fsync журнала)
+MIN_CATALOG_SHARE = 0.5  # каталог меньше этой доли прошлого не записывается без --force
+
+
+class FishRecord:
+    """
+    Запись о рыбе. __slots__ вместо словаря: поля хранятся в массиве
+    фиксированного размера, без хэш-таблицы на каждую запись.
+    to_dict() — формат fish_catalog.json (тот же порядок ключей).
+    """
+    __slots__ = ('id', 'name_ru', 'name_lat', 'type', 'family_group', 'size_cm', 'min_tank_liters',
+                 'bio_load_points', 'temperament', 'min_group_size', 'difficulty', 'water_params',
+                 'incompatible_tags', 'description_short', 'features_list', 'image_url',
+                 'article_url', 'source_lastmod', 'fetched_at')
+
+    def __init__(self, id: int, article_url: str, source_lastmod: Optional[str] = None):
+        self.id = id
+        self.name_ru = ''
+        self.name_lat = ''
+        self.type = 'freshwater'
+        self.family_group = ''
+        self.size_cm = 0
+        self.min_tank_liters = 0
+        self.bio_load_points = 2
+        self.temperament = 'Мирный'
+        self.min_group_size = 1
+        self.difficulty = 2
+        self.water_params = {
+            'ph_min': None,
+            'ph_max': None,
+            'temp_min': None,
+            'temp_max': None
+        }
+        self.incompatible_tags: List[str] = []
+        self.description_short = ''
+        self.features_list: List[str] = []
+        self.image_url = ''  # Добавляем поле для изображения
+        self.article_url = article_url  # Сохраняем URL статьи для перепарсинга
+        self.source_lastmod = source_lastmod  # lastmod из карты сайта
+        self.fetched_at: Optional[str] = None  # время загрузки статьи (UTC, ISO 8601)
 
-# User-Agent для имитации браузера
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-}
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
 
 
 class FanFishkaParser:
     """Класс для парсинга каталога рыб с fanfishka.ru"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(HEADERS)
+    def __init__(self, discovery: str = 'pagination', fulltext_db: Optional[str] = None,
+                 low_memory: bool = False, output_file: str = OUTPUT_FILE,
+                 priority: bool = False, budget: Optional[int] = None, force: bool = False):
+        self.session = create_session()
+        self.discovery = discovery  # 'pagination' или 'sitemap'
+        self.output_file = output_file
+        self.delay = DELAY_BETWEEN_REQUESTS
         self.fish_links = []
         self.fish_data = []
         self.fish_id_counter = 1
+        self.link_lastmod: Dict[str, Optional[str]] = {}
+        self.previous_records: Dict[str, Dict] = {}
+        self.link_titles: Dict[str, str] = {}  # текст ссылки со страницы каталога
+        # --low-memory: записи — в журнал, прошлый обход — во временный файл (url → смещение)
+        self.low_memory = low_memory
+        self.journal: Optional[RecordJournal] = None
+        self.previous_journal: Optional[RecordJournal] = None
+        self.previous_offsets: Dict[str, int] = {}
+        self.journaled: Set[str] = set()  # статьи, уже записанные в журнал (--low-memory)
+        self.classifier = ArticleClassifier.from_catalog(output_file)
+        # Словарь родов: виды src/data, FISH_LIST.csv и name_lat прошлого обхода
+        self.latin_names = LatinNameExtractor.from_catalog(output_file)
+        # Полный текст статей для поиска без повторного обхода (fulltext_index.py)
+        self.fulltext = FullTextIndex(fulltext_db) if fulltext_db else None
+        # Порядок обхода по ценности (crawl_frontier.py) и лимит загрузок статей
+        self.priority = priority or budget is not None
+        self.budget = budget
+        # Записать каталог, даже если он намного меньше прошлого (MIN_CATALOG_SHARE)
+        self.force = force
     
     def get_page(self, url: str, retries: int = 3) -> Optional[BeautifulSoup]:
         """Получить страницу с обработкой ошибок"""
-        for attempt in range(retries):
-            try:
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
-                response.encoding = 'utf-8'
-                return BeautifulSoup(response.text, 'html.parser')
-            except requests.RequestException as e:
-                logger.warning(f"Ошибка при запросе {url} (попытка {attempt + 1}/{retries}): {e}")
-                if attempt < retries - 1:
-                    time.sleep(2)
-                else:
-                    logger.error(f"Не удалось загрузить {url}")
-                    return None
-        return None
+        return fetch_soup(url, session=self.session, retries=retries)
     
     def find_last_page(self) -> int:
         """Определить номер последней страницы каталога"""
@@ -128,9 +196,10 @@ class FanFishkaParser:
                 if test_soup:
                     # Проверяем, есть ли контент на странице
                     content = test_soup.get_text()
+                    test_soup.decompose()
                     if len(content) > 1000:  # Если есть достаточно контента
                         last_page = test_page
-                        time.sleep(0.5)
+                        polite_sleep(0.5)
                     else:
                         break
                 else:
@@ -139,6 +208,7 @@ class FanFishkaParser:
             if last_page > 1:
                 logger.info(f"Найдена последняя страница методом проверки: {last_page}")
         
+        soup.decompose()
         logger.info(f"Используется последняя страница: {last_page}")
         return max(last_page, 1)
     
@@ -182,6 +252,7 @@ class FanFishkaParser:
                             '/fish/'
                         ]) and '/page/' not in href:  # Исключаем ссылки на страницы пагинации
                             full_url = urljoin(BASE_URL, href)
+                            self.remember_link_title(full_url, element)
                             if full_url not in links and full_url not in self.fish_links:
                                 links.append(full_url)
                 
@@ -203,6 +274,7 @@ class FanFishkaParser:
                         '/akvariumnye-stati/'
                     ]) and '/page/' not in href and href not in ['#', '']:
                         full_url = urljoin(BASE_URL, href)
+                        self.remember_link_title(full_url, link)
                         # Проверяем, что это не главная страница каталога
                         if full_url != page_url and full_url not in links and full_url not in self.fish_links:
                             links.append(full_url)
@@ -218,24 +290,86 @@ class FanFishkaParser:
                 for sample in sample_links[:5]:
                     logger.debug(f"  - {sample.get('href', '')}")
         
+        soup.decompose()
         return links
     
+    def remember_link_title(self, url: str, anchor):
+        """Запомнить текст ссылки (у карточки бывает ссылка-картинка и ссылка-заголовок)"""
+        title = anchor.get_text(' ', strip=True) or anchor.get('title', '')
+        if len(title) > len(self.link_titles.get(url, '')):
+            self.link_titles[url] = title
+    
+    def filter_non_fish_links(self, links: List[str]) -> List[str]:
+        """Отбросить статьи не о рыбах по заголовку ссылки, не загружая их"""
+        kept = []
+        for url in links:
+            title = self.link_titles.get(url)
+            if title and not self.classifier.is_fish(title):
+                logger.info(f"⏭ Пропуск (не рыба): {title}")
+                continue
+            kept.append(url)
+        if len(kept) < len(links):
+            logger.info(f"Классификатор отсеял {len(links) - len(kept)} статей не о рыбах")
+        return kept
+    
+    def load_previous_records(self):
+        """Загрузить результаты прошлого обхода для инкрементального режима"""
+        if not os.path.exists(self.output_file):
+            return
+        if self.low_memory:
+            self.spill_previous_records()
+            return
+        try:
+            with open(self.output_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать {self.output_file}: {e}")
+            return
+        if records:
+            self.fish_id_counter = max(r.get('id', 0) for r in records) + 1
+        self.previous_records = {r['article_url']: r for r in records if r.get('article_url')}
+        logger.info(f"Загружено {len(self.previous_records)} записей прошлого обхода")
+    
+    def spill_previous_records(self):
+        """
+        --low-memory: каталог читается по записи (iter_catalog) прямо во
+        временный журнал, в памяти только url → смещение
+        """
+        journal = RecordJournal(Path(self.output_file).with_suffix('.previous.jsonl'))
+        offsets: Dict[str, int] = {}
+        max_id = 0
+        try:
+            for record in iter_catalog(self.output_file):
+                max_id = max(max_id, record.get('id', 0))
+                if record.get('article_url'):
+                    offsets[record['article_url']] = journal.append(record)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать {self.output_file}: {e}")
+            journal.remove()
+            return
+        if offsets or max_id:
+            self.fish_id_counter = max(self.fish_id_counter, max_id + 1)
+        self.previous_journal = journal
+        self.previous_offsets = offsets
+        logger.info(f"Загружено {len(self.previous_offsets)} записей прошлого обхода")
+    
+    def previous_record(self, url: str) -> Optional[Dict]:
+        """Запись прошлого обхода для статьи"""
+        if self.previous_journal is not None:
+            offset = self.previous_offsets.get(url)
+            return self.previous_journal.read(offset) if offset is not None else None
+        return self.previous_records.get(url)
+    
+    def collect_links_from_sitemap(self) -> List[str]:
+        """Собрать ссылки на статьи через sitemap.xml и ленты (без пагинации)"""
+        articles = discover_articles(session=self.session)
+        self.link_lastmod = dict(articles)
+        logger.info(f"Через карту сайта найдено {len(articles)} статей")
+        return [url for url, _ in articles]
+    
     def extract_latin_name(self, text: str) -> str:
-        """Извлечь латинское название из текста"""
-        # Паттерны для поиска латинского названия
-        patterns = [
-            r'\(([A-Z][a-z]+(?:\s+[a-z]+)+)\)',  # (Paracheirodon innesi)
-            r'([A-Z][a-z]+\s+[a-z]+)',  # Paracheirodon innesi
-            r'Латинское название[:\s]+([A-Z][a-z]+(?:\s+[a-z]+)+)',
-            r'Научное название[:\s]+([A-Z][a-z]+(?:\s+[a-z]+)+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                return match.group(1).strip()
-        
-        return ""
+        """Извлечь латинское название из текста (по словарю родов, см. latin_names.py)"""
+        return self.latin_names.extract(text)
     
     def extract_water_params(self, text: str) -> Dict[str, Optional[float]]:
         """Извлечь параметры воды из текста"""
@@ -384,37 +518,47 @@ class FanFishkaParser:
         
         return "freshwater"  # По умолчанию пресноводная
     
-    def parse_fish_article(self, url: str) -> Optional[Dict]:
+    def parse_fish_article(self, url: str) -> Optional[FishRecord]:
         """Парсинг отдельной статьи о рыбе"""
         logger.info(f"Парсинг статьи: {url}")
         soup = self.get_page(url)
         if not soup:
             return None
+        try:
+            record = self.extract_fish_record(soup, url)
+            record.fetched_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+            return record
+        finally:
+            # Дерево полно циклических ссылок (parent, next_element): без decompose
+            # оно живет до сборки циклов, и на больших страницах память растет
+            soup.decompose()
+    
+    def find_article_text(self, soup: BeautifulSoup) -> Tuple[str, Optional[Tag]]:
+        """Текст статьи для извлечения характеристик и его контейнер (None — вся страница)"""
+        content_selectors = [
+            '.entry-content',
+            '.post-content',
+            '.article-content',
+            '.content',
+            'article',
+            '.post-body'
+        ]
         
-        fish_data = {
-            'id': self.fish_id_counter,
-            'name_ru': '',
-            'name_lat': '',
-            'type': 'freshwater',
-            'family_group': '',
-            'size_cm': 0,
-            'min_tank_liters': 0,
-            'bio_load_points': 2,
-            'temperament': 'Мирный',
-            'min_group_size': 1,
-            'difficulty': 2,
-            'water_params': {
-                'ph_min': None,
-                'ph_max': None,
-                'temp_min': None,
-                'temp_max': None
-            },
-            'incompatible_tags': [],
-            'description_short': '',
-            'features_list': [],
-            'image_url': '',  # Добавляем поле для изображения
-            'article_url': url  # Сохраняем URL статьи для перепарсинга
-        }
+        article_text = ""
+        content_elem = None
+        for selector in content_selectors:
+            content_elem = soup.select_one(selector)
+            if content_elem:
+                article_text = content_elem.get_text()
+                break
+        
+        if not article_text:
+            article_text = soup.get_text()
+        return article_text, content_elem
+    
+    def extract_fish_record(self, soup: BeautifulSoup, url: str) -> FishRecord:
+        """Извлечь запись о рыбе из загруженной страницы статьи"""
+        fish_data = FishRecord(self.fish_id_counter, url, self.link_lastmod.get(url))
         
         # Извлечение заголовка (name_ru)
         title_selectors = ['h1', '.entry-title', '.post-title', '.article-title', 'title']
@@ -423,15 +567,15 @@ class FanFishkaParser:
             if title_elem:
                 title_text = title_elem.get_text(strip=True)
                 if title_text:
-                    fish_data['name_ru'] = title_text
+                    fish_data.name_ru = title_text
                     # Извлекаем латинское название из заголовка
-                    fish_data['name_lat'] = self.extract_latin_name(title_text)
+                    fish_data.name_lat = self.extract_latin_name(title_text)
                     break
         
         # Если не нашли латинское название в заголовке, ищем в тексте
-        if not fish_data['name_lat']:
+        if not fish_data.name_lat:
             article_text = soup.get_text()
-            fish_data['name_lat'] = self.extract_latin_name(article_text)
+            fish_data.name_lat = self.extract_latin_name(article_text)
         
         # Извлечение основного изображения (улучшенная версия)
         image_url = None
@@ -526,27 +670,15 @@ class FanFishkaParser:
                 image_url = candidate_images[0][1]
         
         if image_url:
-            fish_data['image_url'] = image_url
+            fish_data.image_url = image_url
         
         # Извлечение текста статьи
-        content_selectors = [
-            '.entry-content',
-            '.post-content',
-            '.article-content',
-            '.content',
-            'article',
-            '.post-body'
-        ]
+        article_text, content_elem = self.find_article_text(soup)
         
-        article_text = ""
-        for selector in content_selectors:
-            content_elem = soup.select_one(selector)
-            if content_elem:
-                article_text = content_elem.get_text()
-                break
-        
-        if not article_text:
-            article_text = soup.get_text()
+        if self.fulltext:
+            # С разделителем строк: абзацы и ячейки таблиц не склеиваются
+            full_text = (content_elem or soup).get_text('\n')
+            self.fulltext.add(url, fish_data.name_ru, full_text, fish_data.name_lat)
         
         # Извлечение описания (description_short)
         # Пробуем найти несколько первых абзацев для более полного описания
@@ -561,36 +693,36 @@ class FanFishkaParser:
             # Объединяем абзацы в одно описание
             full_description = ' '.join(description_parts)
             # Ограничиваем длину до 1000 символов
-            fish_data['description_short'] = full_description[:1000]
+            fish_data.description_short = full_description[:1000]
         elif article_text:
             # Если не нашли абзацы, берем начало текста статьи
-            fish_data['description_short'] = article_text[:1000].strip()
+            fish_data.description_short = article_text[:1000].strip()
         
         # Извлечение параметров воды
         water_params = self.extract_water_params(article_text)
-        fish_data['water_params'].update(water_params)
+        fish_data.water_params.update(water_params)
         
         # Извлечение минимального объема
         min_volume = self.extract_min_volume(article_text)
         if min_volume:
-            fish_data['min_tank_liters'] = min_volume
+            fish_data.min_tank_liters = min_volume
         
         # Извлечение размера
         size = self.extract_size(article_text)
         if size:
-            fish_data['size_cm'] = int(size)
+            fish_data.size_cm = int(size)
         
         # Определение темперамента
-        fish_data['temperament'] = self.extract_temperament(article_text)
+        fish_data.temperament = self.extract_temperament(article_text)
         
         # Определение минимального размера стаи
-        fish_data['min_group_size'] = self.extract_min_group_size(article_text)
+        fish_data.min_group_size = self.extract_min_group_size(article_text)
         
         # Определение сложности
-        fish_data['difficulty'] = self.determine_difficulty(article_text)
+        fish_data.difficulty = self.determine_difficulty(article_text)
         
         # Определение типа (пресноводная/морская)
-        fish_data['type'] = self.determine_fish_type(article_text, url)
+        fish_data.type = self.determine_fish_type(article_text, url)
         
         # Извлечение семейства (family_group)
         family_patterns = [
@@ -601,97 +733,287 @@ class FanFishkaParser:
         for pattern in family_patterns:
             match = re.search(pattern, article_text, re.IGNORECASE)
             if match:
-                fish_data['family_group'] = match.group(1).strip()
+                fish_data.family_group = match.group(1).strip()
                 break
         
         # Создание списка особенностей
         features = []
-        if fish_data['water_params']['temp_min']:
-            features.append(f"Температура: {fish_data['water_params']['temp_min']}-{fish_data['water_params']['temp_max']}°C")
-        if fish_data['water_params']['ph_min']:
-            features.append(f"pH: {fish_data['water_params']['ph_min']}-{fish_data['water_params']['ph_max']}")
-        if fish_data['min_tank_liters']:
-            features.append(f"Минимальный объем: {fish_data['min_tank_liters']} л")
-        if fish_data['temperament']:
-            features.append(f"Темперамент: {fish_data['temperament']}")
+        if fish_data.water_params['temp_min']:
+            features.append(f"Температура: {fish_data.water_params['temp_min']}-{fish_data.water_params['temp_max']}°C")
+        if fish_data.water_params['ph_min']:
+            features.append(f"pH: {fish_data.water_params['ph_min']}-{fish_data.water_params['ph_max']}")
+        if fish_data.min_tank_liters:
+            features.append(f"Минимальный объем: {fish_data.min_tank_liters} л")
+        if fish_data.temperament:
+            features.append(f"Темперамент: {fish_data.temperament}")
         
-        fish_data['features_list'] = features
+        fish_data.features_list = features
         
         # Сохраняем image_url (пользователю нужны фото)
         # Если не нашли изображение через селекторы, пробуем найти любую картинку в статье
-        if not fish_data.get('image_url'):
+        if not fish_data.image_url:
             all_images = soup.find_all('img')
             for img in all_images:
                 img_src = img.get('src') or img.get('data-src')
                 if img_src and not any(skip in img_src.lower() for skip in ['logo', 'icon', 'avatar', 'banner']):
-                    fish_data['image_url'] = urljoin(BASE_URL, img_src)
+                    fish_data.image_url = urljoin(BASE_URL, img_src)
                     break
         
         self.fish_id_counter += 1
         return fish_data
     
-    def run(self):
-        """Основной метод запуска парсера"""
+    def run(self) -> bool:
+        """Основной метод запуска парсера; False — каталог не записан"""
         logger.info("Начало парсинга каталога fanfishka.ru")
+        previous_count = self.previous_count()
+        self.discover_links()
+        skipped = self.crawl_articles()
         
-        # Шаг 1: Определение последней страницы
-        last_page = self.find_last_page()
-        
-        # Шаг 2: Сбор всех ссылок на статьи
-        logger.info(f"Сбор ссылок со страниц 1-{last_page}...")
-        for page_num in range(1, last_page + 1):
-            page_url = f"https://fanfishka.ru/akvariumnye-stati/akvariumnye_rybki/page/{page_num}/"
-            logger.info(f"Обработка страницы {page_num}/{last_page}")
-            
-            links = self.collect_fish_links_from_page(page_url)
-            self.fish_links.extend(links)
+        # Шаг 4: Сохранение результатов
+        if not self.force and self.record_count < previous_count * MIN_CATALOG_SHARE:
+            logger.error(f"❌ Каталог не записан: {self.record_count} записей против {previous_count} "
+                         f"в {self.output_file} (сбой сети или карты сайта?). Записать все равно: --force")
+            if self.journal is not None and len(self.journal):
+                self.journal.close()
+                logger.info(f"Собранные записи остаются в {self.journal.path}")
+            elif self.journal is not None:
+                self.journal.remove()
+            if self.previous_journal is not None:
+                self.previous_journal.remove()
+                self.previous_journal = None
+            return False
+        logger.info(f"Сохранение {self.record_count} записей в {self.output_file}...")
+        self.save()
+        
+        if self.fulltext:
+            self.fulltext.optimize()
+            logger.info(f"Полный текст статей: {self.fulltext.path}")
+        logger.info(f"✓ Парсинг завершен! Результаты сохранены в {self.output_file}")
+        logger.info(f"Всего обработано: {self.record_count} рыб")
+        if skipped:
+            logger.info(f"Пропущено без изменений: {skipped}")
+        return True
+    
+    def previous_count(self) -> int:
+        """Число записей в каталоге на диске (0 — каталога нет или он не читается)"""
+        if not os.path.exists(self.output_file):
+            return 0
+        try:
+            return sum(1 for _ in iter_catalog(self.output_file))
+        except (OSError, ValueError):
+            return 0
+    
+    def discover_links(self):
+        """Шаги 1-2: ссылки на статьи (карта сайта или пагинация каталога)"""
+        # Записи прошлого обхода: стабильные id, неизменившиеся статьи, статьи
+        # сверх бюджета и промежуточные сохранения без потери каталога
+        self.load_previous_records()
+        if self.discovery == 'sitemap':
+            # Шаги 1-2: ссылки и даты изменения из карты сайта
+            self.fish_links.extend(self.collect_links_from_sitemap())
+            if not self.fish_links:
+                logger.warning("Карта сайта и ленты не дали статей — сбор ссылок по страницам каталога")
+        if not self.fish_links:
+            # Шаг 1: Определение последней страницы
+            last_page = self.find_last_page()
             
-            time.sleep(DELAY_BETWEEN_REQUESTS)
+            # Шаг 2: Сбор всех ссылок на статьи
+            logger.info(f"Сбор ссылок со страниц 1-{last_page}...")
+            for page_num in range(1, last_page + 1):
+                page_url = f"https://fanfishka.ru/akvariumnye-stati/akvariumnye_rybki/page/{page_num}/"
+                logger.info(f"Обработка страницы {page_num}/{last_page}")
+                
+                links = self.collect_fish_links_from_page(page_url)
+                self.fish_links.extend(links)
+                
+                polite_sleep(self.delay)
         
-        # Удаляем дубликаты
-        self.fish_links = list(set(self.fish_links))
+        # Удаляем дубликаты (в том числе ссылки на «#comment») и статьи не о рыбах;
+        # почти одинаковые статьи по разным адресам сливает dedup_catalog.py
+        unique_links = dict.fromkeys(urldefrag(link)[0] for link in self.fish_links)
+        self.fish_links = self.filter_non_fish_links(list(unique_links))
         logger.info(f"Всего собрано {len(self.fish_links)} уникальных ссылок на статьи")
-        
-        # Шаг 3: Парсинг каждой статьи
+        if self.priority:
+            self.prioritize_links()
+    
+    def prioritize_links(self):
+        """Упорядочить fish_links по ценности пробелов в данных (crawl_frontier.py)"""
+        from crawl_frontier import load_frontier
+        ordered = load_frontier(Path(self.output_file)).order_urls(self.fish_links)
+        self.fish_links = [item.url for item in ordered]
+        for item in ordered[:5]:
+            logger.info(f"Приоритет {item.score:.1f} ({', '.join(item.reasons)}): {item.url}")
+    
+    @property
+    def record_count(self) -> int:
+        return len(self.journal) if self.journal is not None else len(self.fish_data)
+    
+    def open_journal(self):
+        """
+        Журнал записей --low-memory. Журнал, оставшийся от прерванного обхода,
+        открывается для дозаписи: его статьи повторно не загружаются
+        """
+        if self.journal is not None:
+            return
+        path = Path(self.output_file).with_suffix('.jsonl')
+        resume = path.exists()
+        self.journal = RecordJournal(path, truncate=not resume)
+        if resume:
+            for record in self.journal:
+                if record.get('article_url'):
+                    self.journaled.add(record['article_url'])
+                self.fish_id_counter = max(self.fish_id_counter, record.get('id', 0) + 1)
+            logger.info(f"Продолжение прерванного обхода: в журнале {len(self.journal)} записей")
+    
+    def add_record(self, record: Dict):
+        if self.low_memory:
+            self.open_journal()
+            self.journal.append(record)
+            if record.get('article_url'):
+                self.journaled.add(record['article_url'])
+        else:
+            self.fish_data.append(record)
+    
+    def save(self, partial: bool = False):
+        """
+        Записать каталог (с --low-memory — потоково из журнала).
+        partial — обход не закончен (промежуточное сохранение, Ctrl+C, ошибка):
+        к собранным записям добавляются еще не обработанные записи прошлого
+        обхода, а журнал --low-memory остается для продолжения
+        """
+        if partial:
+            if self.low_memory:
+                self.open_journal()
+                self.journal.sync()
+            count = atomic_write_records(self.output_file, self.partial_catalog())
+            if self.low_memory:
+                logger.info(f"Журнал {self.journal.path.name} сохранен: следующий запуск продолжит обход "
+                            f"({count} записей в {self.output_file})")
+            return
+        if not self.low_memory:
+            atomic_write_json(self.output_file, self.fish_data)
+            return
+        self.open_journal()
+        self.journal.write_catalog(self.output_file)
+        self.journal.remove()
+        self.journal = None
+        self.journaled = set()
+        if self.previous_journal is not None:
+            self.previous_journal.remove()
+            self.previous_journal = None
+    
+    def partial_catalog(self) -> Iterator[Dict]:
+        """Собранные записи (журнал или fish_data), затем записи прошлого обхода для остальных статей"""
+        if self.low_memory:
+            yield from self.journal
+            done = self.journaled
+        else:
+            yield from self.fish_data
+            done = {record.get('article_url') for record in self.fish_data}
+        if self.previous_journal is not None:
+            for url, offset in self.previous_offsets.items():
+                if url not in done:
+                    yield self.previous_journal.read(offset)
+        else:
+            for url, record in self.previous_records.items():
+                if url not in done:
+                    yield record
+    
+    def crawl_articles(self) -> int:
+        """Шаг 3: парсинг статей из fish_links; возвращает число пропущенных без изменений"""
         logger.info("Начало парсинга статей...")
+        skipped = 0
+        fetched = deferred = 0
+        if self.low_memory:
+            self.open_journal()
         for i, link in enumerate(self.fish_links, 1):
             logger.info(f"Обработка статьи {i}/{len(self.fish_links)}")
             
+            # Продолжение прерванного обхода: статья уже в журнале
+            if link in self.journaled:
+                skipped += 1
+                continue
+            
+            # Инкрементальный режим: статья не менялась — берем прошлую запись
+            previous = self.previous_record(link)
+            if is_unchanged(previous, self.link_lastmod.get(link)):
+                self.add_record(previous)
+                skipped += 1
+                continue
+            
+            # Бюджет загрузок исчерпан: прошлая запись остается до следующего запуска
+            if self.budget is not None and fetched >= self.budget:
+                if previous:
+                    self.add_record(previous)
+                deferred += 1
+                continue
+            
+            fetched += 1
             fish_data = self.parse_fish_article(link)
             if fish_data:
-                self.fish_data.append(fish_data)
-                has_photo = "✅" if fish_data.get('image_url') else "❌"
-                logger.info(f"✓ Собраны данные: {fish_data['name_ru']} {has_photo} фото")
+                if previous:
+                    fish_data.id = previous['id']  # id стабилен между обходами
+                self.add_record(fish_data.to_dict())
+                has_photo = "✅" if fish_data.image_url else "❌"
+                logger.info(f"✓ Собраны данные: {fish_data.name_ru} {has_photo} фото")
             else:
                 logger.warning(f"✗ Не удалось собрать данные из {link}")
             
-            # Сохраняем промежуточные результаты каждые 10 статей
-            if i % 10 == 0:
-                with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(self.fish_data, f, ensure_ascii=False, indent=2)
-                logger.info(f"💾 Промежуточное сохранение: {len(self.fish_data)} записей")
+            # Сохраняем промежуточные результаты каждые 10 статей вместе с еще не
+            # обработанными записями прошлого обхода (с --low-memory журнал
+            # сбрасывается на диск: после сбоя обход продолжится с него)
+            if i % SAVE_EVERY == 0:
+                if self.low_memory:
+                    self.journal.sync()
+                else:
+                    self.save(partial=True)
+                    logger.info(f"💾 Промежуточное сохранение: {len(self.fish_data)} записей")
             
-            time.sleep(DELAY_BETWEEN_REQUESTS)
-        
-        # Шаг 4: Сохранение результатов
-        logger.info(f"Сохранение {len(self.fish_data)} записей в {OUTPUT_FILE}...")
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.fish_data, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"✓ Парсинг завершен! Результаты сохранены в {OUTPUT_FILE}")
-        logger.info(f"Всего обработано: {len(self.fish_data)} рыб")
+            polite_sleep(self.delay)
+        if deferred:
+            logger.info(f"Бюджет {self.budget} загрузок исчерпан, отложено статей: {deferred}")
+        return skipped
 
 
 if __name__ == "__main__":
-    parser = FanFishkaParser()
+    arg_parser = argparse.ArgumentParser(description="Парсер каталога рыб fanfishka.ru")
+    arg_parser.add_argument('--sitemap', action='store_true',
+                            help="искать статьи через sitemap.xml/ленты и пропускать неизменившиеся")
+    arg_parser.add_argument('--fulltext', nargs='?', const='fish_fulltext.db', metavar='DB',
+                            help="сохранять полный текст статей в индекс FTS5 (по умолчанию fish_fulltext.db)")
+    arg_parser.add_argument('--profile', nargs='?', const='', metavar='DIR',
+                            help="cProfile и tracemalloc обхода (profiling.py, по умолчанию в .pipeline/profile)")
+    arg_parser.add_argument('--low-memory', action='store_true',
+                            help="записи — в журнал fish_catalog.jsonl, память не растет с размером каталога")
+    arg_parser.add_argument('--priority', action='store_true',
+                            help="обходить статьи по ценности пробелов в данных (crawl_frontier.py)")
+    arg_parser.add_argument('--budget', type=int, metavar='N',
+                            help="загрузить не больше N статей, самые ценные первыми (включает --priority)")
+    arg_parser.add_argument('--force', action='store_true',
+                            help="записать каталог, даже если он намного меньше прошлого")
+    args = arg_parser.parse_args()
+    
+    parser = FanFishkaParser(discovery='sitemap' if args.sitemap else 'pagination',
+                             fulltext_db=args.fulltext, low_memory=args.low_memory,
+                             priority=args.priority, budget=args.budget, force=args.force)
+    saved = True
     try:
-        parser.run()
+        if args.profile is None:
+            saved = parser.run()
+        else:
+            from profiling import PROFILE_DIR, StageProfiler, format_table
+            with StageProfiler('crawl', args.profile or PROFILE_DIR) as profiler:
+                saved = parser.run()
+            print(format_table([profiler.result]))
     except KeyboardInterrupt:
         logger.info("\nПарсинг прерван пользователем")
-        if parser.fish_data:
-            logger.info(f"Сохранение частичных результатов ({len(parser.fish_data)} записей)...")
-            with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-                json.dump(parser.fish_data, f, ensure_ascii=False, indent=2)
+        if parser.record_count:
+            logger.info(f"Сохранение частичных результатов ({parser.record_count} записей)...")
+            parser.save(partial=True)
     except Exception as e:
         logger.error(f"Критическая ошибка: {e}", exc_info=True)
-
+        if parser.record_count:
+            logger.info(f"Сохранение частичных результатов ({parser.record_count} записей)...")
+            parser.save(partial=True)
+    if not saved:
+        arg_parser.exit(1)  # каталог не записан: код 1 для pipeline.py
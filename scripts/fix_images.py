@@ -9,13 +9,27 @@
 """
 
 import json
-import requests
 from pathlib import Path
 import time
 
 BASE_DIR = Path(__file__).parent.parent
 CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
 FISH_DB_PATH = BASE_DIR / 'src' / 'data' / 'fishDatabase.ts'
+ARROW_PATH = BASE_DIR / 'fish_catalog.arrow'
+
+def load_image_urls():
+    """
+    Колонка image_url каталога: из fish_catalog.arrow (memory map, только
+    одна колонка), если экспорт есть и свежий, иначе из JSON
+    """
+    try:
+        from export_columnar import is_fresh, read_columns
+        if is_fresh(ARROW_PATH, CATALOG_PATH):
+            return read_columns(['image_url'], ARROW_PATH).column('image_url').to_pylist()
+    except ImportError:
+        pass  # pyarrow не установлен
+    with open(CATALOG_PATH, 'r', encoding='utf-8') as f:
+        return [item.get('image_url', '') for item in json.load(f)]
 
 def normalize_fish_name(name):
     """Нормализует название рыбы для поиска"""
@@ -33,6 +47,8 @@ def search_image_unsplash(query, api_key=None):
     if not api_key:
         return None
     
+    import requests  # нужен только для запросов к API
+    
     try:
         url = "https://api.unsplash.com/search/photos"
         headers = {"Authorization": f"Client-ID {api_key}"}
@@ -52,6 +68,8 @@ def search_image_pixabay(query, api_key=None):
     if not api_key:
         return None
     
+    import requests  # нужен только для запросов к API
+    
     try:
         url = "https://pixabay.com/api/"
         params = {
@@ -176,18 +194,19 @@ def solution_5_hybrid_approach():
     Это даст максимальный охват и качество.
     """)
 
-if __name__ == "__main__":
+def main(image_urls=None):
+    """Анализ и варианты решения; image_urls — колонка уже загруженного каталога"""
     print("\n" + "=" * 60)
     print("АНАЛИЗ ПРОБЛЕМЫ С ИЗОБРАЖЕНИЯМИ")
     print("=" * 60 + "\n")
     
     # Анализ текущей ситуации
-    with open(CATALOG_PATH, 'r', encoding='utf-8') as f:
-        catalog_data = json.load(f)
+    if image_urls is None:
+        image_urls = load_image_urls()
     
-    total = len(catalog_data)
-    bad_images = sum(1 for item in catalog_data 
-                    if 'sovmestimost' in item.get('image_url', '').lower())
+    total = len(image_urls)
+    bad_images = sum(1 for url in image_urls 
+                    if 'sovmestimost' in (url or '').lower())
     good_images = total - bad_images
     
     print(f"Всего записей: {total}")
@@ -211,3 +230,5 @@ if __name__ == "__main__":
     print("РЕКОМЕНДАЦИЯ: Начать с улучшения парсера (Решение 2)")
     print("=" * 60)
 
+if __name__ == "__main__":
+    main()
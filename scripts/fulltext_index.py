@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Полнотекстовый индекс статей на SQLite FTS5 (ранжирование BM25)
+
+Парсер сохраняет очищенный текст каждой статьи (fanfishka_parser.py
+--fulltext), ключ — article_url без #comment и query (canonical_url),
+чтобы варианты ссылки из каталога не давали дублей. Вопросы к корпусу («какие рыбы
+упоминают солоноватую воду?») решаются запросом к индексу, без
+повторного обхода сайта:
+
+    python3 fulltext_index.py query "солоноватая вода"
+    python3 fulltext_index.py query '"живородящие" NOT гуппи' --raw
+    python3 fulltext_index.py import fish_catalog.json   # описания из каталога
+    python3 fulltext_index.py stats
+
+Слова запроса приводятся к основе (stem из search_index.py) и ищутся
+как префиксы: «солоноватая» → солоноват*. С --raw запрос передается
+в FTS5 как есть (фразы, NEAR, AND/OR/NOT).
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from catalog_index import canonical_url, normalize_name
+from catalog_store import load_catalog
+from search_index import stem
+
+DEFAULT_DB = 'fish_fulltext.db'
+
+# Веса колонок для bm25(): заголовок важнее латинского названия, оно — текста
+COLUMN_WEIGHTS = (0.0, 10.0, 5.0, 1.0)  # article_url (не индексируется), title, name_lat, body
+SNIPPET_TOKENS = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    article_url  TEXT PRIMARY KEY,
+    title        TEXT NOT NULL DEFAULT '',
+    name_lat     TEXT NOT NULL DEFAULT '',
+    body         TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    source       TEXT NOT NULL DEFAULT 'article',
+    indexed_at   TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    article_url UNINDEXED, title, name_lat, body,
+    content='articles', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, article_url, title, name_lat, body)
+    VALUES (new.rowid, new.article_url, new.title, new.name_lat, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, article_url, title, name_lat, body)
+    VALUES ('delete', old.rowid, old.article_url, old.title, old.name_lat, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, article_url, title, name_lat, body)
+    VALUES ('delete', old.rowid, old.article_url, old.title, old.name_lat, old.body);
+    INSERT INTO articles_fts(rowid, article_url, title, name_lat, body)
+    VALUES (new.rowid, new.article_url, new.title, new.name_lat, new.body);
+END;
+"""
+
+_BLANK_LINES = re.compile(r'\n\s*\n+')
+_SPACES = re.compile(r'[ \t\r\f\v\xa0]+')
+
+
+def clean_article_text(text: str) -> str:
+    """Текст статьи из get_text('\\n'): без лишних пробелов и пустых строк"""
+    lines = (_SPACES.sub(' ', line).strip() for line in (text or '').split('\n'))
+    return _BLANK_LINES.sub('\n', '\n'.join(line for line in lines if line))
+
+
+def build_match_query(query: str) -> str:
+    """Свободный запрос → выражение FTS5: все слова, каждое по основе как префикс"""
+    terms = []
+    for word in normalize_name(query).split():
+        base = stem(word)
+        # Кавычки: слово не будет принято за оператор (AND, OR, NOT, NEAR)
+        terms.append(f'"{base}"*')
+    return ' '.join(terms)
+
+
+class FullTextIndex:
+    """Таблица статей и FTS5-индекс над ней в одном файле SQLite"""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, article_url: str, title: str, body: str, name_lat: str = '',
+            source: str = 'article', commit: bool = True) -> bool:
+        """
+        Сохранить текст статьи; возвращает False, если такой текст уже в индексе.
+        Текст из статьи не заменяется описанием из каталога (source='catalog').
+        """
+        body = clean_article_text(body)
+        article_url = canonical_url(article_url)
+        if not article_url or not body:
+            return False
+        content_hash = hashlib.sha1(f'{title}\n{name_lat}\n{body}'.encode('utf-8')).hexdigest()
+        existing = self.conn.execute(
+            'SELECT content_hash, source FROM articles WHERE article_url = ?', (article_url,)
+        ).fetchone()
+        if existing is not None:
+            if existing['content_hash'] == content_hash:
+                return False
+            if existing['source'] == 'article' and source != 'article':
+                return False
+        indexed_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.conn.execute(
+            'INSERT INTO articles (article_url, title, name_lat, body, content_hash, source, indexed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(article_url) DO UPDATE SET title = excluded.title, '
+            'name_lat = excluded.name_lat, body = excluded.body, '
+            'content_hash = excluded.content_hash, source = excluded.source, '
+            'indexed_at = excluded.indexed_at',
+            (article_url, title or '', name_lat or '', body, content_hash, source, indexed_at))
+        if commit:
+            self.conn.commit()
+        return True
+
+    def import_records(self, records: Iterable[Dict]) -> int:
+        """Описания из каталога для статей, полного текста которых еще нет"""
+        added = 0
+        with self.conn:
+            for record in records:
+                if self.add(record.get('article_url', ''), record.get('name_ru', ''),
+                            record.get('description_short', ''), record.get('name_lat', ''),
+                            source='catalog', commit=False):
+                    added += 1
+        return added
+
+    def search(self, query: str, limit: Optional[int] = 20, raw: bool = False) -> List[Dict]:
+        """Статьи по запросу, лучшие (меньший bm25) первыми, с фрагментом текста"""
+        match = query if raw else build_match_query(query)
+        if not match:
+            return []
+        weights = ', '.join(str(w) for w in COLUMN_WEIGHTS)
+        rows = self.conn.execute(
+            f"SELECT article_url, title, name_lat, bm25(articles_fts, {weights}) AS score, "
+            f"snippet(articles_fts, 3, '[', ']', '…', {SNIPPET_TOKENS}) AS snippet "
+            f"FROM articles_fts WHERE articles_fts MATCH ? ORDER BY score LIMIT ?",
+            (match, -1 if limit is None else limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def text(self, article_url: str) -> Optional[str]:
+        row = self.conn.execute('SELECT body FROM articles WHERE article_url = ?',
+                                (canonical_url(article_url),)).fetchone()
+        return row['body'] if row else None
+
+    def stats(self) -> Dict:
+        by_source = dict(self.conn.execute(
+            'SELECT source, COUNT(*) FROM articles GROUP BY source').fetchall())
+        chars = self.conn.execute('SELECT COALESCE(SUM(LENGTH(body)), 0) FROM articles').fetchone()[0]
+        return {'articles': sum(by_source.values()), 'by_source': by_source, 'chars': chars,
+                'bytes': self.path.stat().st_size if self.path.exists() else 0}
+
+    def optimize(self):
+        """Слить сегменты FTS5 после большого обхода"""
+        self.conn.execute("INSERT INTO articles_fts(articles_fts) VALUES ('optimize')")
+        self.conn.commit()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Полнотекстовый поиск по статьям")
+    arg_parser.add_argument('--db', default=DEFAULT_DB, help=f"файл индекса (по умолчанию {DEFAULT_DB})")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    query_parser = commands.add_parser('query', help="поиск по тексту статей")
+    query_parser.add_argument('query')
+    query_parser.add_argument('--limit', type=int, default=20)
+    query_parser.add_argument('--raw', action='store_true', help="передать запрос в FTS5 без обработки")
+    query_parser.add_argument('--urls', action='store_true', help="выводить только article_url")
+
+    import_parser = commands.add_parser('import', help="добавить описания из каталога")
+    import_parser.add_argument('catalog', nargs='?', default='fish_catalog.json')
+
+    commands.add_parser('stats', help="размер индекса")
+    commands.add_parser('optimize', help="слить сегменты индекса")
+    args = arg_parser.parse_args()
+
+    with FullTextIndex(args.db) as index:
+        if args.command == 'query':
+            started = time.perf_counter()
+            try:
+                results = index.search(args.query, limit=args.limit, raw=args.raw)
+            except sqlite3.OperationalError as e:
+                arg_parser.error(f"неверный запрос FTS5: {e}")
+            query_ms = (time.perf_counter() - started) * 1000
+            if args.urls:
+                for row in results:
+                    print(row['article_url'])
+                return
+            print(f"Найдено: {len(results)} ({query_ms:.1f} мс)")
+            for row in results:
+                print(f"  {row['score']:7.2f}  {row['title']} {row['name_lat']}".rstrip())
+                print(f"           {row['article_url']}")
+                print(f"           {' '.join(row['snippet'].split())}")
+        elif args.command == 'import':
+            added = index.import_records(load_catalog(args.catalog))
+            print(f"✅ Добавлено описаний: {added}")
+        elif args.command == 'optimize':
+            index.optimize()
+            print("✅ Индекс оптимизирован")
+        else:
+            stats = index.stats()
+            sources = ', '.join(f"{k}: {v}" for k, v in stats['by_source'].items()) or '—'
+            print(f"Статей: {stats['articles']} ({sources})")
+            print(f"Текст: {stats['chars'] / 1000:.0f} тыс. символов, файл: {stats['bytes'] / 1024:.0f} КБ")
+
+
+if __name__ == "__main__":
+    main()
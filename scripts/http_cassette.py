@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Запись и воспроизведение HTTP-обмена (кассета) для обхода без сети
+
+Кассета — файл SQLite: пара «запрос → ответ» на каждый адрес (статус,
+заголовки, тело, сжатое zlib). Подключается на уровне общего
+HTTP-клиента (http_client.create_session монтирует CassetteAdapter),
+поэтому работает для всех скриптов обхода без изменений в них:
+fanfishka_parser.py, reparse_images.py, extract_images_from_catalog.py,
+sitemap_discovery.py, crawl_queue.py.
+
+    python3 http_cassette.py record site.cassette -- fanfishka_parser.py --sitemap
+    python3 http_cassette.py replay site.cassette -- fanfishka_parser.py --sitemap
+    python3 http_cassette.py stats site.cassette
+
+Режимы (переменные окружения AQUACAT_CASSETTE и AQUACAT_CASSETTE_MODE
+передаются и дочерним процессам, например этапам pipeline.py):
+- record — запросы идут в сеть, ответы сохраняются (с перезаписью);
+- replay — сети нет: ответ из кассеты или ошибка CassetteMiss без
+  повторов; паузы между запросами (polite_sleep) пропускаются,
+  обход идет на полной скорости;
+- auto — из кассеты, если есть, иначе из сети с записью.
+
+Тело хранится распакованным из Content-Encoding (gzip/br снимает
+requests), поэтому кассета не зависит от установленного brotli.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CASSETTE_ENV = 'AQUACAT_CASSETTE'
+MODE_ENV = 'AQUACAT_CASSETTE_MODE'
+MODES = ('record', 'replay', 'auto')
+COMPRESSION_LEVEL = 9
+
+# Заголовки, которые описывают передачу, а не содержимое: тело уже распаковано
+_TRANSPORT_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection',
+                      'keep-alive', 'set-cookie'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    method      TEXT NOT NULL,
+    url         TEXT NOT NULL,
+    status      INTEGER NOT NULL,
+    reason      TEXT NOT NULL DEFAULT '',
+    headers     TEXT NOT NULL,
+    body        BLOB NOT NULL,
+    body_size   INTEGER NOT NULL,
+    elapsed_ms  REAL NOT NULL,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (method, url)
+);
+"""
+
+
+class CassetteMiss(requests.ConnectionError):
+    """В режиме replay запроса нет в кассете"""
+
+
+class Cassette:
+    """Хранилище ответов; безопасно для потоков (одно соединение под замком)"""
+
+    def __init__(self, path, mode: str = 'replay'):
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим кассеты: {mode} (допустимо: {', '.join(MODES)})")
+        self.path = Path(path)
+        self.mode = mode
+        if mode == 'replay' and not self.path.exists():
+            raise FileNotFoundError(f"Кассета не найдена: {self.path}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.recorded = 0
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self, method: str, url: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT status, reason, headers, body FROM interactions WHERE method = ? AND url = ?',
+                (method, url)).fetchone()
+        if row is None:
+            return None
+        status, reason, headers, body = row
+        return {'status': status, 'reason': reason, 'headers': json.loads(headers),
+                'body': zlib.decompress(body)}
+
+    def save(self, method: str, url: str, response: requests.Response, elapsed: float):
+        headers = {name: value for name, value in response.headers.items()
+                   if name.lower() not in _TRANSPORT_HEADERS}
+        body = response.content
+        packed = zlib.compress(body, COMPRESSION_LEVEL)
+        recorded_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO interactions '
+                '(method, url, status, reason, headers, body, body_size, elapsed_ms, recorded_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (method, url, response.status_code, response.reason or '',
+                 json.dumps(headers, ensure_ascii=False), packed, len(body), elapsed * 1000, recorded_at))
+            self.conn.commit()
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self.lock:
+            count, raw, packed, elapsed = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(body_size), 0), COALESCE(SUM(LENGTH(body)), 0), '
+                'COALESCE(SUM(elapsed_ms), 0) FROM interactions').fetchone()
+        return {'interactions': count, 'body_bytes': raw, 'stored_bytes': packed,
+                'ratio': round(raw / packed, 1) if packed else 0.0, 'recorded_seconds': round(elapsed / 1000, 1)}
+
+
+def replay_response(request: requests.PreparedRequest, interaction: Dict) -> requests.Response:
+    """Ответ requests из записи кассеты (тело уже прочитано — iter_content тоже работает)"""
+    response = requests.Response()
+    response.status_code = interaction['status']
+    response.reason = interaction['reason']
+    response.headers = CaseInsensitiveDict(interaction['headers'])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = interaction['body']
+    response._content_consumed = True
+    response.url = request.url
+    response.request = request
+    response.elapsed = timedelta(0)
+    return response
+
+
+class CassetteAdapter(HTTPAdapter):
+    """HTTPAdapter, который отвечает из кассеты и/или записывает в нее"""
+
+    def __init__(self, cassette: Cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.cassette.mode != 'record':
+            interaction = self.cassette.load(request.method, request.url)
+            if interaction is not None:
+                self.cassette.hits += 1
+                return replay_response(request, interaction)
+            if self.cassette.replaying:
+                self.cassette.misses += 1
+                raise CassetteMiss(f"{request.method} {request.url}: нет в кассете {self.cassette.path}",
+                                   request=request)
+        started = time.perf_counter()
+        response = super().send(request, stream=stream, timeout=timeout, verify=verify,
+                                cert=cert, proxies=proxies)
+        self.cassette.save(request.method, request.url, response, time.perf_counter() - started)
+        return response
+
+
+_active: Optional[Cassette] = None
+_active_lock = threading.Lock()
+
+
+def _report():
+    if _active is not None:
+        print(f"📼 Кассета {_active.path.name} ({_active.mode}): из кассеты {_active.hits}, "
+              f"записано {_active.recorded}, нет в кассете {_active.misses}", file=sys.stderr)
+
+
+def active_cassette() -> Optional[Cassette]:
+    """Кассета процесса: use_cassette() или переменные окружения AQUACAT_CASSETTE[_MODE]"""
+    global _active
+    if _active is None and os.environ.get(CASSETTE_ENV):
+        with _active_lock:
+            if _active is None:
+                _active = Cassette(os.environ[CASSETTE_ENV], os.environ.get(MODE_ENV, 'replay'))
+                atexit.register(_report)
+    return _active
+
+
+def use_cassette(path, mode: str = 'replay') -> Cassette:
+    """Включить кассету в текущем процессе (сессии, созданные после вызова)"""
+    global _active
+    with _active_lock:
+        if _active is not None:
+            _active.close()
+        _active = Cassette(path, mode)
+    return _active
+
+
+def replaying() -> bool:
+    """Ответы идут из кассеты: паузы между запросами не нужны"""
+    cassette = active_cassette()
+    return cassette is not None and cassette.replaying
+
+
+def run_with_cassette(path: str, mode: str, command: list) -> int:
+    """Запустить скрипт с кассетой; код возврата скрипта"""
+    if command and command[0].endswith('.py'):
+        command = [sys.executable, *command]
+    env = dict(os.environ, **{CASSETTE_ENV: str(Path(path).resolve()), MODE_ENV: mode})
+    started = time.perf_counter()
+    code = subprocess.run(command, env=env).returncode
+    print(f"\n📼 {mode}: {time.perf_counter() - started:.1f} с, кассета {path}")
+    return code
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Запись и воспроизведение HTTP-обмена скриптов обхода")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    for mode in MODES:
+        run_parser = commands.add_parser(mode, help=f"запустить скрипт в режиме {mode}")
+        run_parser.add_argument('cassette', help="файл кассеты")
+        run_parser.add_argument('script', nargs=argparse.REMAINDER, help="-- скрипт и его аргументы")
+    stats_parser = commands.add_parser('stats', help="размер кассеты")
+    stats_parser.add_argument('cassette')
+    args = arg_parser.parse_args()
+
+    if args.command == 'stats':
+        with Cassette(args.cassette, 'replay') as cassette:
+            stats = cassette.stats()
+        print(f"📼 {args.cassette}: {stats['interactions']} ответов, "
+              f"{stats['body_bytes'] / 1024 / 1024:.1f} МБ → {stats['stored_bytes'] / 1024 / 1024:.1f} МБ "
+              f"(сжатие {stats['ratio']}×), по сети — {stats['recorded_seconds']} с")
+        return
+    command = args.script[1:] if args.script[:1] == ['--'] else args.script
+    if not command:
+        arg_parser.error("укажите скрипт: http_cassette.py record FILE -- script.py [аргументы]")
+    sys.exit(run_with_cassette(args.cassette, args.command, command))
+
+
+if __name__ == "__main__":
+    main()
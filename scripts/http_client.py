@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Общий HTTP-клиент для всех скриптов парсинга fanfishka.ru
+
+Одна сессия с пулом keep-alive соединений на процесс: TCP+TLS рукопожатие
+выполняется один раз на хост, а не на каждый запрос. Ответы запрашиваются
+сжатыми (gzip/deflate, brotli — если установлен пакет brotli) и передаются
+в BeautifulSoup байтами, без промежуточного декодирования в str.
+
+Если включена кассета (http_cassette.py), сессия отвечает из нее и/или
+записывает в нее ответы; при воспроизведении polite_sleep не ждет.
+"""
+
+import time
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+from http_cassette import CassetteAdapter, CassetteMiss, active_cassette, replaying
+
+logger = logging.getLogger(__name__)
+
+# User-Agent для имитации браузера
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Настройки пула соединений
+POOL_CONNECTIONS = 4   # количество хостов, для которых держим пул
+POOL_MAXSIZE = 16      # соединений на хост (хватает для параллельных потоков)
+REQUEST_TIMEOUT = 10   # секунды
+RETRY_DELAY = 2        # секунды между повторами
+
+# brotli декодируется urllib3 автоматически, если установлен один из пакетов
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.5',
+    'Connection': 'keep-alive',
+}
+
+_shared_session: Optional[requests.Session] = None
+_shared_lock = threading.Lock()
+
+
+def create_session(pool_connections: int = POOL_CONNECTIONS,
+                   pool_maxsize: int = POOL_MAXSIZE) -> requests.Session:
+    """Создать сессию с настроенным пулом keep-alive соединений"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+
+    # Повторы выполняет fetch_soup, адаптер их не делает
+    pool = dict(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=0,
+        pool_block=False,
+    )
+    cassette = active_cassette()
+    adapter = CassetteAdapter(cassette, **pool) if cassette else HTTPAdapter(**pool)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Общая сессия процесса (создается при первом обращении)"""
+    global _shared_session
+    if _shared_session is None:
+        with _shared_lock:
+            if _shared_session is None:
+                _shared_session = create_session()
+    return _shared_session
+
+
+def polite_sleep(seconds: float):
+    """Пауза между запросами к сайту (не нужна, когда ответы идут из кассеты)"""
+    if seconds > 0 and not replaying():
+        time.sleep(seconds)
+
+
+def fetch(url: str, session: Optional[requests.Session] = None,
+          retries: int = 3, timeout: float = REQUEST_TIMEOUT,
+          stream: bool = False) -> Optional[requests.Response]:
+    """Выполнить GET-запрос с повторами через пул соединений
+
+    При stream=True тело не читается заранее: вызывающий код обязан
+    прочитать его (iter_content) или закрыть ответ, чтобы вернуть
+    соединение в пул.
+    """
+    session = session or get_session()
+    for attempt in range(retries):
+        try:
+            response = session.get(url, timeout=timeout, stream=stream)
+            response.raise_for_status()
+            return response
+        except CassetteMiss as e:
+            logger.error(str(e))  # повтор ответа не даст
+            return None
+        except requests.RequestException as e:
+            logger.warning(f"Ошибка при запросе {url} (попытка {attempt + 1}/{retries}): {e}")
+            if attempt < retries - 1:
+                polite_sleep(RETRY_DELAY)
+            else:
+                logger.error(f"Не удалось загрузить {url}")
+    return None
+
+
+def fetch_soup(url: str, session: Optional[requests.Session] = None,
+               retries: int = 3, parser: str = 'html.parser') -> Optional[BeautifulSoup]:
+    """Получить страницу как BeautifulSoup (разбор напрямую из байтов ответа)"""
+    response = fetch(url, session=session, retries=retries)
+    if response is None:
+        return None
+    # Сайт отдает utf-8; передаем байты, чтобы не декодировать текст дважды
+    return BeautifulSoup(response.content, parser, from_encoding='utf-8')
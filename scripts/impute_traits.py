@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Заполнение пропущенных числовых характеристик по медианам рода и семейства
+
+Парсер часто не находит размер, объем и параметры воды, а bio_load_points
+всегда ставит равным 2. Скрипт группирует записи по роду (первое слово
+name_lat), семейству и типу воды и заполняет пропуски медианой ближайшей
+группы с достаточным числом значений:
+- size_cm — медиана размера рода или семейства (тип воды слишком широк:
+  неону достался бы размер средней пресноводной рыбы, поэтому без группы
+  поле остается пустым)
+- min_tank_liters — размер × медианное число литров на сантиметр
+- pH и температура — медианы границ; если известна одна граница,
+  вторая достраивается по медианной ширине диапазона
+- bio_load_points — из размера (для записей парсера)
+
+Медианы считаются без выбросов группы (робастная z-оценка, как в
+validate_catalog.py), чтобы крупные виды не сдвигали медиану семейства.
+Заполненные значения проверяются теми же проверками: заполнение, после
+которого у записи появляется замечание, отбрасывается.
+
+Заполненные поля перечисляются в imputed_fields записи. Значения, которые
+проверка каталога считает ошибками (validate_catalog.py), тоже заменяются.
+"""
+
+import argparse
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from catalog_index import canonical_url
+from catalog_arrays import CatalogColumns, WATER_FIELDS, group_median, robust_z
+from catalog_store import atomic_write_json, load_catalog
+from validate_catalog import CHECK_FIELDS, OUTLIER_Z, SEVERITY, run_checks
+
+BASE_DIR = Path(__file__).parent.parent
+CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
+
+MIN_GROUP_VALUES = {'genus': 2, 'family': 3, 'type': 5}
+BIO_LOAD_PER_CM = 0.6   # медианное отношение bio_load_points / size_cm в src/data/freshwater_species.json
+PARSER_BIO_LOAD = 2     # значение, которое парсер ставит по умолчанию
+TANK_STEP = 10          # объем округляется до 10 л
+# Размеры в группе расходятся больше чем в MAX_SIZE_SPREAD раз — медиана группы
+# ничего не говорит о конкретном виде (карликовые и крупные цихлиды, ошибки парсинга)
+MAX_SIZE_SPREAD = 3.0
+GUARD_ROUNDS = 3        # повторы проверки: отброшенные заполнения меняют медианы семейств
+# Эвристика парсера (pH ±0.5), а не противоречие в данных: заполнение ее не вызывает
+GUARD_SKIP = {'ph_single_value'}
+RANGE_PAIRS = [('ph_min', 'ph_max', 1), ('temp_min', 'temp_max', 0)]  # (нижняя, верхняя, знаков)
+
+FillResult = Tuple[np.ndarray, np.ndarray]
+
+
+def group_levels(cols: CatalogColumns, by_type: bool = True) -> List[Tuple[str, np.ndarray, int]]:
+    """Уровни группировки от узкого к широкому: род → семейство → тип воды"""
+    levels = [
+        ('genus', cols.genus_codes, len(cols.genus_names)),
+        ('family', cols.family_codes, len(cols.family_names)),
+    ]
+    if by_type:
+        type_names, type_codes = CatalogColumns._codes(list(cols.types))
+        levels.append(('type', type_codes, len(type_names)))
+    return levels
+
+
+def robust_group_median(values: np.ndarray, codes: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Медиана группы без выбросов (|z| > OUTLIER_Z по медиане и MAD группы)"""
+    z = robust_z(values, codes, n_groups, min_group=1)
+    with np.errstate(invalid='ignore'):
+        kept = np.where(np.abs(z) > OUTLIER_Z, np.nan, values)
+    return group_median(kept, codes, n_groups)
+
+
+def group_spread(values: np.ndarray, codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """Разброс (максимум − минимум) значений группы; NaN не учитываются"""
+    mask = ~np.isnan(values) & (codes >= 0)
+    low = np.full(n_groups, np.inf)
+    high = np.full(n_groups, -np.inf)
+    np.minimum.at(low, codes[mask], values[mask])
+    np.maximum.at(high, codes[mask], values[mask])
+    return np.where(np.isfinite(low), high - low, np.nan)
+
+
+def first_of_article(cols: CatalogColumns) -> np.ndarray:
+    """
+    Маска первых записей каждой статьи: дубликаты (тот же URL с #comment)
+    не должны считаться вторым значением группы
+    """
+    seen = set()
+    first = np.ones(cols.size, dtype=bool)
+    for row, record in enumerate(cols.records):
+        url = canonical_url(record.get('article_url', ''))
+        if url:
+            first[row] = url not in seen
+            seen.add(url)
+    return first
+
+
+def hierarchical_fill(values: np.ndarray, levels, sample: Optional[np.ndarray] = None,
+                      max_spread: Optional[float] = None) -> FillResult:
+    """
+    Заполнить NaN медианой первой подходящей группы; без группы значение
+    остается NaN. sample — записи, чьи значения образуют медианы; группы с
+    разбросом больше max_spread пропускаются.
+    Возвращает (значения, уровень-источник для каждой записи или '').
+    """
+    filled = values.copy()
+    source = np.full(values.shape, '', dtype=object)
+    sample_values = values if sample is None else np.where(sample, values, np.nan)
+    for name, codes, n_groups in levels:
+        medians, counts = robust_group_median(sample_values, codes, n_groups)
+        safe_codes = np.where(codes >= 0, codes, 0)
+        take = np.isnan(filled) & (codes >= 0) & (counts[safe_codes] >= MIN_GROUP_VALUES[name]) \
+            & ~np.isnan(medians[safe_codes])
+        if max_spread is not None:
+            with np.errstate(invalid='ignore'):
+                take &= group_spread(sample_values, codes, n_groups)[safe_codes] <= max_spread
+        filled[take] = medians[safe_codes][take]
+        source[take] = name
+    return filled, source
+
+
+def clear_invalid(cols: CatalogColumns) -> int:
+    """Сбросить в NaN значения с ошибками проверки; возвращает их число"""
+    checks = run_checks(cols)
+    cleared = 0
+    for code, mask in checks.items():
+        if SEVERITY[code] != 'error':
+            continue
+        for field in CHECK_FIELDS[code]:
+            column = cols[field]
+            bad = mask & ~np.isnan(column)
+            cleared += int(bad.sum())
+            column[bad] = np.nan
+    return cleared
+
+
+def clear_previous_imputation(cols: CatalogColumns):
+    """Значения, заполненные прошлым запуском, не должны влиять на медианы"""
+    for row, record in enumerate(cols.records):
+        for field in record.get('imputed_fields', ()):
+            if field in cols.columns:
+                cols[field][row] = np.nan
+
+
+def impute_size_and_tank(cols: CatalogColumns, levels) -> Dict[str, FillResult]:
+    """
+    Размер по медиане рода/семейства, объем — через литры на сантиметр.
+    Медианы — в логарифмической шкале, как выбросы в validate_catalog.py.
+    """
+    sample = first_of_article(cols)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_size, size_source = hierarchical_fill(np.log(cols['size_cm']), levels, sample,
+                                                  max_spread=np.log(MAX_SIZE_SPREAD))
+        size = np.exp(log_size)
+    size = np.where(np.isnan(size), size, np.maximum(1, np.round(size)))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_ratio, tank_source = hierarchical_fill(np.log(cols['min_tank_liters'] / cols['size_cm']), levels, sample)
+        ratio_filled = np.exp(log_ratio)
+    tank = cols['min_tank_liters'].copy()
+    missing = np.isnan(tank)
+    tank[missing] = np.maximum(TANK_STEP, np.round(size[missing] * ratio_filled[missing] / TANK_STEP) * TANK_STEP)
+    tank_source = np.where(missing & ~np.isnan(tank), tank_source, '')
+    return {'size_cm': (size, size_source), 'min_tank_liters': (tank, tank_source)}
+
+
+def impute_range(cols: CatalogColumns, levels, low_field: str, high_field: str,
+                 digits: int) -> Dict[str, FillResult]:
+    """Границы диапазона: медианы границ либо известная граница ± медианная ширина"""
+    low, high = cols[low_field], cols[high_field]
+    span, _ = hierarchical_fill(high - low, levels)
+    low_filled, low_source = hierarchical_fill(low, levels)
+    high_filled, high_source = hierarchical_fill(high, levels)
+
+    only_low = ~np.isnan(low) & np.isnan(high)
+    only_high = np.isnan(low) & ~np.isnan(high)
+    high_filled[only_low] = low[only_low] + span[only_low]
+    low_filled[only_high] = high[only_high] - span[only_high]
+
+    # Медианы границ по отдельности могут дать перевернутый диапазон
+    with np.errstate(invalid='ignore'):
+        inverted = np.isnan(low) & np.isnan(high) & (low_filled > high_filled)
+    high_filled[inverted] = low_filled[inverted] + span[inverted]
+
+    low_filled = np.round(low_filled, digits)
+    high_filled = np.round(high_filled, digits)
+    return {low_field: (low_filled, low_source), high_field: (high_filled, high_source)}
+
+
+def guard_fills(cols: CatalogColumns, results: Dict[str, FillResult]) -> int:
+    """
+    Отбросить заполнения, после которых запись получает замечание проверки
+    каталога, которого у нее не было. Возвращает число отброшенных значений.
+    """
+    original = {field: cols[field].copy() for field in results}
+    nothing = {field: np.zeros(cols.size, dtype=bool) for field in results}
+    before = run_checks(cols, nothing)
+    discarded = 0
+    for _ in range(GUARD_ROUNDS):
+        for field, (values, source) in results.items():
+            cols.columns[field] = np.where(source != '', values, original[field])
+        checks = run_checks(cols, {field: source != '' for field, (_, source) in results.items()})
+        changed = False
+        for code, mask in checks.items():
+            if code in GUARD_SKIP:
+                continue
+            new_issue = mask & ~before[code]
+            for field in CHECK_FIELDS[code]:
+                values, source = results[field]
+                bad = new_issue & (source != '')
+                if bad.any():
+                    source[bad] = ''
+                    values[bad] = original[field][bad]
+                    discarded += int(bad.sum())
+                    changed = True
+        if not changed:
+            break
+    for field in results:
+        cols.columns[field] = original[field]
+    return discarded
+
+
+def derive_bio_load(cols: CatalogColumns, size: np.ndarray) -> FillResult:
+    """Биологическая нагрузка из размера там, где ее не задали вручную"""
+    bio_load = cols['bio_load_points']
+    derive = (np.isnan(bio_load) | (cols.scraped & (bio_load == PARSER_BIO_LOAD))) & ~np.isnan(size)
+    result = bio_load.copy()
+    result[derive] = np.maximum(1, np.round(size[derive] * BIO_LOAD_PER_CM))
+    source = np.where(derive, 'size', '')
+    return result, source
+
+
+def impute(records: List[Dict]) -> Dict:
+    """Заполнить пропуски в записях (на месте); возвращает статистику"""
+    started = time.perf_counter()
+    cols = CatalogColumns(records)
+    clear_previous_imputation(cols)
+    invalid = clear_invalid(cols)
+    levels = group_levels(cols)
+
+    results: Dict[str, FillResult] = impute_size_and_tank(cols, group_levels(cols, by_type=False))
+    for low_field, high_field, digits in RANGE_PAIRS:
+        results.update(impute_range(cols, levels, low_field, high_field, digits))
+    discarded = guard_fills(cols, results)
+    results['bio_load_points'] = derive_bio_load(cols, results['size_cm'][0])
+
+    stats: Counter = Counter()
+    sources: Counter = Counter()
+    for row, record in enumerate(records):
+        imputed = []
+        for field, (values, source) in results.items():
+            if not source[row] or np.isnan(values[row]):
+                continue
+            value = values[row]
+            value = float(value) if field in WATER_FIELDS else int(value)
+            if field in WATER_FIELDS:
+                record.setdefault('water_params', {})[field] = value
+            else:
+                record[field] = value
+            imputed.append(field)
+            stats[field] += 1
+            sources[source[row]] += 1
+        if imputed:
+            record['imputed_fields'] = imputed
+        else:
+            record.pop('imputed_fields', None)
+
+    return {
+        'records': len(records),
+        'records_imputed': sum(1 for r in records if r.get('imputed_fields')),
+        'invalid_cleared': invalid,
+        'fills_discarded': discarded,
+        'fields': dict(stats),
+        'sources': dict(sources),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Заполнение пропущенных характеристик рыб")
+    arg_parser.add_argument('catalog', nargs='?', default=str(CATALOG_PATH), help="путь к каталогу")
+    arg_parser.add_argument('--output', help="куда сохранить (по умолчанию — тот же файл)")
+    arg_parser.add_argument('--dry-run', action='store_true', help="только статистика, без записи")
+    args = arg_parser.parse_args()
+
+    records = load_catalog(args.catalog)
+    stats = impute(records)
+
+    print("=" * 60)
+    print("ЗАПОЛНЕНИЕ ПРОПУСКОВ")
+    print("=" * 60)
+    print(f"Записей: {stats['records']}, дополнено: {stats['records_imputed']} "
+          f"({stats['elapsed_ms']} мс)")
+    print(f"Сброшено ошибочных значений: {stats['invalid_cleared']}")
+    print(f"Отброшено заполнений с замечаниями проверки: {stats['fills_discarded']}")
+    print("\nПоля:")
+    for field, count in stats['fields'].items():
+        print(f"  {field:18} {count:5}")
+    print("\nИсточник значения:")
+    for source, count in stats['sources'].items():
+        print(f"  {source:18} {count:5}")
+
+    if args.dry_run:
+        return
+    output = args.output or args.catalog
+    atomic_write_json(output, records)
+    print(f"\n💾 Сохранено: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Извлечение латинских названий (биномов) по словарю родов
+
+Шаблон r'([A-Z][a-z]+\\s+[a-z]+)' принимает любую пару слов с заглавной
+буквы («Amazon river», «Google maps»). Здесь роды берутся из проверенных
+данных (src/data/*_species.json, FISH_LIST.csv и список aquarium_genera.txt,
+проверенный вручную), по ним строится автомат Ахо — Корасик, и текст просматривается
+один раз: каждое вхождение рода проверяется на границы слова и наличие
+видового эпитета. Каждому биному выставляется уверенность 0..1:
+- род из словаря, эпитет строчными буквами — основа
+- род с заглавной буквы, бином целиком известен, бином в скобках или после
+  «лат.», «латинское название» — повышают уверенность
+- «sp.», «spec» вместо эпитета — опускают ниже порога: find_all такой
+  бином возвращает, а best/extract — нет
+Бином с неизвестным родом принимается только в скобках, с минимальной
+уверенностью: «Тетра (Hyphessobrycon amandae)». Роды, которые встречаются
+только в name_lat каталога, — тот же уровень: каталог заполнял старый
+шаблон с опечатками (Tanichtys), поэтому такой род без скобок или пометки
+«лат.» получает уверенность ниже порога.
+
+    python3 latin_names.py "Неон голубой (Paracheirodon innesi) — ..."
+    python3 latin_names.py --catalog fish_catalog.json   # сравнить с name_lat
+"""
+
+import argparse
+import csv
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from catalog_index import latin_key
+from catalog_store import load_catalog
+from community_solver import SPECIES_PATHS
+
+BASE_DIR = Path(__file__).parent.parent
+FISH_LIST_PATH = BASE_DIR / 'FISH_LIST.csv'
+GENERA_PATH = Path(__file__).parent / 'aquarium_genera.txt'
+
+MIN_CONFIDENCE = 0.5
+MIN_GENUS_LENGTH = 4
+
+_BINOMIAL = re.compile(r'^([A-Z][a-z]{%d,})[\s\xa0]+([a-z]{3,})(?:[\s\xa0]+[a-z]{3,})?$' % (MIN_GENUS_LENGTH - 1))
+# Эпитет после рода: вид, «sp.»/«spec.», необязательный подвид
+# (после точки \b не ставится: «sp.» стоит перед пробелом или концом текста)
+_EPITHET = re.compile(r'[ \xa0]+(sp\.|spec\.|spec\b|[a-z]{3,}\b)(?:[ \xa0]+([a-z]{3,})\b)?')
+_LATIN_MARKER = re.compile(r'(?:лат\.?|латинское название|научное название)[\s:«"]*$', re.IGNORECASE)
+_UNCERTAIN_EPITHETS = {'sp.', 'spec', 'spec.', 'spp', 'species'}
+# Слова после рода, которые не бывают эпитетом («Corydoras and ...»)
+_NOT_EPITHETS = {'and', 'the', 'with', 'for', 'from', 'var', 'aff', 'cf'}
+# Не роды: бренды кормов и оборудования, английские слова и авторы из name_lat каталога
+_NOT_GENERA = {'tetra', 'sera', 'hydor', 'river', 'very', 'dwarf', 'cuvier'}
+_PARENTHESIZED = re.compile(r'\(\s*([A-Z][a-z]{%d,})[ \xa0]+([a-z]{3,})\b' % (MIN_GENUS_LENGTH - 1))
+
+
+@dataclass
+class LatinMatch:
+    name: str           # «Paracheirodon innesi»
+    genus: str
+    epithet: str
+    start: int
+    end: int
+    confidence: float
+
+
+class AhoCorasick:
+    """Автомат для поиска всех словарных строк за один проход по тексту"""
+
+    def __init__(self, words: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[str]] = [[]]
+        for word in words:
+            self._add(word)
+        self._build()
+
+    def _add(self, word: str):
+        state = 0
+        for ch in word:
+            next_state = self.goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][ch] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append(word)
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def iter(self, text: str) -> Iterable[Tuple[int, str]]:
+        """(позиция конца, слово) для каждого вхождения"""
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for word in self.output[state]:
+                yield position + 1, word
+
+
+def load_genera(path: Path = GENERA_PATH) -> List[str]:
+    """Роды из списка, проверенного вручную (строки с # — комментарии)"""
+    if not Path(path).exists():
+        return []
+    lines = Path(path).read_text(encoding='utf-8').splitlines()
+    return [line.strip().lower() for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+
+def _binomials(names: Iterable[str]) -> List[str]:
+    return [name for name in names if _BINOMIAL.match((name or '').strip())
+            and latin_key(name).split()[0] not in _NOT_GENERA]
+
+
+class LatinNameExtractor:
+    """Поиск биномов в тексте по словарю известных родов"""
+
+    def __init__(self, binomials: Iterable[str], genera: Iterable[str] = (),
+                 catalog_genera: Iterable[str] = ()):
+        self.known: Set[str] = set()
+        self.genera: Set[str] = set(genera)
+        for name in binomials:
+            key = latin_key(name)
+            if key:
+                self.known.add(key)
+                self.genera.add(key.split()[0])
+        # Роды только из name_lat каталога — уровень «неизвестного рода»
+        self.catalog_genera: Set[str] = set(catalog_genera) - self.genera - _NOT_GENERA
+        self.automaton = AhoCorasick(self.genera | self.catalog_genera)
+
+    @classmethod
+    def from_sources(cls, catalog_records: Optional[List[Dict]] = None) -> 'LatinNameExtractor':
+        """
+        Словарь из видов src/data, FISH_LIST.csv и aquarium_genera.txt; роды
+        из name_lat каталога (необязательно) — с пониженной уверенностью
+        """
+        names: List[str] = []
+        for path in SPECIES_PATHS:
+            if path.exists():
+                names.extend(r.get('name_lat', '') for r in load_catalog(path))
+        if FISH_LIST_PATH.exists():
+            with open(FISH_LIST_PATH, 'r', encoding='utf-8') as f:
+                names.extend(row.get('Латинское название', '') for row in csv.DictReader(f, delimiter=';'))
+        catalog_names: List[str] = []
+        for record in catalog_records or []:
+            catalog_names.extend(part for part in (record.get('name_lat') or '').split(','))
+        return cls(_binomials(names), load_genera(),
+                   (latin_key(name).split()[0] for name in _binomials(catalog_names)))
+
+    @classmethod
+    def from_catalog(cls, path) -> 'LatinNameExtractor':
+        """Словарь с name_lat каталога (только проверенные источники, если каталога нет)"""
+        try:
+            records = load_catalog(path)
+        except (OSError, ValueError):
+            records = None
+        return cls.from_sources(records)
+
+    def _confidence(self, text: str, start: int, genus: str, epithet: str) -> float:
+        before = text[max(0, start - 40):start]
+        marked = before.rstrip(' \xa0').endswith('(') or bool(_LATIN_MARKER.search(before))
+        if genus in self.catalog_genera:
+            # Как неизвестный род: принимается только в скобках или после «лат.»
+            return MIN_CONFIDENCE if marked else round(MIN_CONFIDENCE - 0.1, 2)
+        confidence = 0.5
+        if text[start].isupper() and text[start + 1:start + len(genus)].islower():
+            confidence += 0.2
+        if f'{genus} {epithet}' in self.known:
+            confidence += 0.2
+        if marked:
+            confidence += 0.1
+        if epithet in _UNCERTAIN_EPITHETS:
+            # Вид не определен: род известен, но бином как название не годится
+            confidence = min(confidence, MIN_CONFIDENCE) - 0.1
+        return round(min(confidence, 1.0), 2)
+
+    def find_all(self, text: str) -> List[LatinMatch]:
+        """Все биномы в тексте в порядке появления"""
+        if not text:
+            return []
+        lowered = text.lower()
+        if len(lowered) != len(text):  # редкие символы меняют длину при lower()
+            lowered = ''.join(ch.lower()[:1] for ch in text)
+        matches = []
+        for end, genus in self.automaton.iter(lowered):
+            start = end - len(genus)
+            if start > 0 and lowered[start - 1].isalpha():
+                continue
+            epithet_match = _EPITHET.match(text, end)
+            if not epithet_match:
+                continue
+            epithet = epithet_match.group(1)
+            if epithet in _NOT_EPITHETS:
+                continue
+            name = f'{genus.capitalize()} {epithet}'
+            matches.append(LatinMatch(name, genus, epithet, start, epithet_match.end(1),
+                                      self._confidence(text, start, genus, epithet)))
+        for match in _PARENTHESIZED.finditer(text):
+            genus, epithet = match.group(1).lower(), match.group(2)
+            if genus not in self.genera and genus not in self.catalog_genera and genus not in _NOT_GENERA \
+                    and epithet not in _NOT_EPITHETS:
+                matches.append(LatinMatch(f'{match.group(1)} {epithet}', genus, epithet,
+                                          match.start(1), match.end(2), MIN_CONFIDENCE))
+        matches.sort(key=lambda m: m.start)
+        return matches
+
+    def best(self, text: str, min_confidence: float = MIN_CONFIDENCE) -> Optional[LatinMatch]:
+        """Самый уверенный бином (при равенстве — первый)"""
+        matches = [m for m in self.find_all(text) if m.confidence >= min_confidence]
+        return max(matches, key=lambda m: (m.confidence, -m.start)) if matches else None
+
+    def extract(self, text: str, min_confidence: float = MIN_CONFIDENCE) -> str:
+        match = self.best(text, min_confidence)
+        return match.name if match else ''
+
+
+def compare_with_catalog(extractor: LatinNameExtractor, records: List[Dict]) -> Dict[str, int]:
+    """Сравнить извлеченные биномы с name_lat каталога"""
+    stats = {'records': len(records), 'found': 0, 'same': 0, 'different': 0, 'new': 0, 'missing': 0}
+    for record in records:
+        text = f"{record.get('name_ru', '')}\n{record.get('description_short', '')}"
+        found = latin_key(extractor.extract(text))
+        current = latin_key(record.get('name_lat', ''))
+        if found:
+            stats['found'] += 1
+            if not current:
+                stats['new'] += 1
+            elif found == current:
+                stats['same'] += 1
+            else:
+                stats['different'] += 1
+        elif current:
+            stats['missing'] += 1
+    return stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Извлечение латинских названий рыб")
+    arg_parser.add_argument('text', nargs='?', help="текст для поиска")
+    arg_parser.add_argument('--catalog', help="сравнить с name_lat записей каталога")
+    args = arg_parser.parse_args()
+
+    catalog = load_catalog(args.catalog) if args.catalog else None
+    started = time.perf_counter()
+    # Сравнение с name_lat — по словарю без каталога, иначе каталог проверяет сам себя
+    extractor = LatinNameExtractor.from_sources()
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"Родов в словаре: {len(extractor.genera)}, биномов: {len(extractor.known)} ({build_ms:.0f} мс)")
+    if catalog:
+        unreviewed = LatinNameExtractor.from_sources(catalog).catalog_genera
+        if unreviewed:
+            print(f"Роды только из каталога (не в {GENERA_PATH.name}): {', '.join(sorted(unreviewed))}")
+
+    if args.text:
+        for match in extractor.find_all(args.text):
+            print(f"  {match.confidence:.2f}  {match.name}")
+
+    if catalog:
+        started = time.perf_counter()
+        stats = compare_with_catalog(extractor, catalog)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"Записей: {stats['records']} ({elapsed_ms:.0f} мс)")
+        print(f"  найдено: {stats['found']} (совпадает: {stats['same']}, другое: {stats['different']}, "
+              f"новых: {stats['new']}), не найдено при заполненном name_lat: {stats['missing']}")
+
+
+if __name__ == "__main__":
+    main()
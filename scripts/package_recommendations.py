@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Предрасчет подходящих видов и готовых наборов рыб для комплектов AQUARIUM_PACKAGES
+
+Для каждого комплекта из src/data/aquariumPackages.ts (объем, typeHint)
+и каждого уровня опыта:
+- подходящие виды: векторные фильтры по min_tank_liters, типу воды,
+  сложности (и тегу planted_tank_incompatible для травников)
+- максимальные наборы совместимых видов, которые помещаются в бюджет
+  биологической нагрузки (объем × BIO_LOAD_PER_LITER) с учетом
+  min_group_size (community_solver.py), ранжированные по числу видов,
+  разнообразию семейств и заполнению
+
+Совместимость пары — как в браузере: теги по INCOMPATIBILITY_MATRIX
+(src/utils/compatibilityMatrix.ts) и пересечение диапазонов pH и
+температуры (src/utils/waterParamsChecker.ts).
+
+Результат — src/data/packageRecommendations.json.
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from catalog_arrays import CatalogColumns
+from catalog_store import atomic_write_json
+from community_solver import (BIO_LOAD_PER_LITER, CommunitySolver, group_loads,
+                              load_species, parse_incompatibility_matrix)
+
+BASE_DIR = Path(__file__).parent.parent
+DATA_DIR = BASE_DIR / 'src' / 'data'
+PACKAGES_PATH = DATA_DIR / 'aquariumPackages.ts'
+OUTPUT_PATH = DATA_DIR / 'packageRecommendations.json'
+
+SETS_PER_LEVEL = 5
+CANDIDATE_SETS_FACTOR = 4  # сколько наборов брать у решателя для переранжирования
+
+# Уровень опыта → максимальная сложность вида (как convertDifficulty во фронтенде)
+EXPERIENCE_LEVELS = {'beginner': 1, 'intermediate': 2, 'advanced': 3}
+MARINE_TYPES = {'saltwater', 'marine'}
+PLANTED_INCOMPATIBLE_TAG = 'planted_tank_incompatible'
+
+
+def parse_packages(path: Path = PACKAGES_PATH) -> List[Dict]:
+    """id, title, volume и typeHint комплектов из aquariumPackages.ts"""
+    text = path.read_text(encoding='utf-8')
+    packages = []
+    for block in re.split(r'\n\s*\{\s*\n', text)[1:]:
+        package_id = re.search(r"\bid:\s*'([^']+)'", block)
+        volume = re.search(r'\bvolume:\s*(\d+)', block)
+        if not package_id or not volume:
+            continue
+        title = re.search(r"\btitle:\s*'([^']+)'", block)
+        type_hint = re.search(r"\btypeHint:\s*'([^']+)'", block)
+        packages.append({
+            'id': package_id.group(1),
+            'title': title.group(1) if title else '',
+            'volume': int(volume.group(1)),
+            'type_hint': type_hint.group(1) if type_hint else 'freshwater',
+        })
+    return packages
+
+
+def eligible_mask(records: List[Dict], cols: CatalogColumns, package: Dict,
+                  max_difficulty: int) -> np.ndarray:
+    """Виды, подходящие комплекту по объему, типу воды и сложности"""
+    marine = np.array([r.get('type') in MARINE_TYPES for r in records], dtype=bool)
+    wants_marine = package['type_hint'] == 'marine'
+    with np.errstate(invalid='ignore'):
+        mask = (np.nan_to_num(cols['min_tank_liters']) <= package['volume']) \
+            & (np.nan_to_num(cols['difficulty'], nan=1) <= max_difficulty) \
+            & (marine == wants_marine)
+    if package['type_hint'] == 'planted':
+        mask &= np.array([PLANTED_INCOMPATIBLE_TAG not in r.get('incompatible_tags', ())
+                          for r in records], dtype=bool)
+    return mask
+
+
+def rank_sets(solver: CommunitySolver, candidates: np.ndarray, families: np.ndarray,
+              capacity: float) -> List[Tuple[float, Tuple[int, ...]]]:
+    """
+    Наборы с наибольшим числом видов (CommunitySolver), переранжированные
+    с учетом разнообразия семейств и заполнения бюджета
+    """
+    result = solver.solve(capacity, candidates=candidates, top=SETS_PER_LEVEL * CANDIDATE_SETS_FACTOR)
+    ranked = []
+    for species_count, load, members in result.sets:
+        score = species_count + 0.5 * len({families[i] for i in members}) + load / capacity
+        ranked.append((round(score, 3), members))
+    ranked.sort(key=lambda item: -item[0])
+    return ranked
+
+
+def build_recommendations(species: List[Dict], packages: List[Dict],
+                          matrix: Dict[str, List[str]]) -> Dict:
+    """Подходящие виды и наборы для всех комплектов и уровней опыта"""
+    cols = CatalogColumns(species)
+    solver = CommunitySolver(species, matrix)
+    counts, loads = group_loads(cols)
+    fish_ids = [f"fish-{r['id']}" for r in species]  # id как во fishDataConverter
+
+    result = {}
+    for package in packages:
+        capacity = package['volume'] * BIO_LOAD_PER_LITER
+        levels = {}
+        for level, max_difficulty in EXPERIENCE_LEVELS.items():
+            candidates = np.flatnonzero(eligible_mask(species, cols, package, max_difficulty))
+            sets = rank_sets(solver, candidates, cols.family_codes, capacity)
+            levels[level] = {
+                'eligible': [fish_ids[i] for i in candidates],
+                'sets': [{
+                    'fish': [[fish_ids[i], int(counts[i])] for i in members],
+                    'bio_load': float(loads[list(members)].sum()),
+                    'score': score,
+                } for score, members in sets[:SETS_PER_LEVEL]],
+            }
+        result[package['id']] = {
+            'title': package['title'],
+            'volume': package['volume'],
+            'type_hint': package['type_hint'],
+            'bio_load_capacity': capacity,
+            'levels': levels,
+        }
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Рекомендации рыб для комплектов Bio-cube")
+    arg_parser.add_argument('--output', default=str(OUTPUT_PATH), help="куда сохранить JSON")
+    args = arg_parser.parse_args()
+
+    started = time.perf_counter()
+    species = load_species()
+    packages = parse_packages()
+    matrix = parse_incompatibility_matrix()
+    recommendations = build_recommendations(species, packages, matrix)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"Видов: {len(species)}, комплектов: {len(packages)} ({elapsed:.0f} мс)")
+    for package_id, package in recommendations.items():
+        beginner = package['levels']['beginner']
+        advanced = package['levels']['advanced']
+        print(f"  {package_id:26} {package['volume']:4} л  "
+              f"видов: {len(beginner['eligible'])}/{len(advanced['eligible'])}  "
+              f"наборов: {len(advanced['sets'])}")
+
+    atomic_write_json(args.output, recommendations, indent=None)
+    print(f"\n💾 Сохранено: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Конвейер обработки каталога: этапы с входами и выходами и кэш по содержимому
+
+Каждый этап — запуск скрипта из scripts/ с объявленными входными
+и выходными файлами. Зависимости вычисляются по файлам: этап ждет того,
+кто последним (в порядке объявления) записал его вход, а этап, который
+переписывает файл, — еще и тех, кто читал этот файл раньше. Этап выполняется
+заново, только если изменился ключ — хэш содержимого входов, аргументов
+и исходного кода скрипта вместе с импортируемыми им модулями scripts/.
+Если перезапущенный этап записал тот же результат, следующие этапы
+остаются в кэше. Независимые этапы (проверка каталога, экспорт,
+слияние дубликатов) выполняются параллельно.
+
+Этап без входов (обход сайта) зависит только от внешнего мира и
+запускается, когда его результата нет или по --force. Ключ остальных
+этапов вычисляется до запуска — по тем входам, которые этап прочитал.
+Этап, который правит файл на месте (images, match), запоминает ключ
+по содержимому после своей работы.
+
+Состояние (ключи этапов, хэши файлов с размером и временем изменения,
+чтобы не перечитывать неизменившиеся файлы) — .pipeline/state.json,
+журналы этапов — .pipeline/logs/, отчет о последнем запуске —
+.pipeline/report.json. С --profile выполняемые этапы запускаются под
+profiling.py, и в отчет добавляется таблица времени и памяти.
+
+    python3 pipeline.py                  # все этапы, устаревшие — заново
+    python3 pipeline.py --plan           # что будет выполнено
+    python3 pipeline.py export search    # выбранные этапы и их зависимости
+    python3 pipeline.py --skip crawl images --force validate
+    python3 pipeline.py --force dedup impute --profile   # профили в .pipeline/profile/
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from catalog_store import atomic_write_json
+
+BASE_DIR = Path(__file__).parent.parent
+SCRIPTS_DIR = BASE_DIR / 'scripts'
+WORK_DIR = BASE_DIR / '.pipeline'
+STATE_PATH = WORK_DIR / 'state.json'
+REPORT_PATH = WORK_DIR / 'report.json'
+LOG_DIR = WORK_DIR / 'logs'
+PROFILE_DIR = WORK_DIR / 'profile'
+
+STATE_VERSION = 1
+JOBS = 4
+LOG_TAIL_LINES = 15
+
+SPECIES = ['src/data/freshwater_species.json', 'src/data/marine_species.json']
+
+
+@dataclass
+class Stage:
+    name: str
+    command: List[str]                                  # скрипт из scripts/ и аргументы
+    inputs: List[str] = field(default_factory=list)     # пути от корня репозитория
+    outputs: List[str] = field(default_factory=list)
+    description: str = ''
+
+    @property
+    def script(self) -> Path:
+        return SCRIPTS_DIR / self.command[0]
+
+    @property
+    def in_place(self) -> Set[str]:
+        """Файлы, которые этап читает и переписывает"""
+        return set(self.inputs) & set(self.outputs)
+
+
+STAGES = [
+    Stage('crawl', ['fanfishka_parser.py', '--sitemap', '--low-memory'],
+          outputs=['fish_catalog.json'],
+          description="обход fanfishka.ru"),
+    Stage('images', ['extract_images_from_catalog.py', '--harvest'],
+          inputs=['fish_catalog.json'], outputs=['fish_catalog.json', 'catalog_listing.json'],
+          description="изображения и латинские названия со страниц каталога"),
+    Stage('validate', ['validate_catalog.py', 'fish_catalog.json',
+                       '--report', 'scripts/validation_report.json'],
+          inputs=['fish_catalog.json'], outputs=['scripts/validation_report.json'],
+          description="проверка числовых полей"),
+    Stage('match', ['update_fish_data.py'],
+          inputs=['fish_catalog.json', 'src/data/fishDatabase.ts'],
+          outputs=['src/data/fishDatabase.ts', 'scripts/update_report.json'],
+          description="описания и изображения в fishDatabase.ts"),
+    Stage('export', ['export_columnar.py', 'fish_catalog.json'],
+          inputs=['fish_catalog.json'], outputs=['fish_catalog.arrow', 'fish_catalog.parquet'],
+          description="Arrow/Parquet"),
+    Stage('dedup', ['dedup_catalog.py', 'fish_catalog.json', '--output', '.pipeline/catalog.dedup.json'],
+          inputs=['fish_catalog.json'], outputs=['.pipeline/catalog.dedup.json'],
+          description="слияние дубликатов"),
+    Stage('impute', ['impute_traits.py', '.pipeline/catalog.dedup.json',
+                     '--output', '.pipeline/catalog.imputed.json'],
+          inputs=['.pipeline/catalog.dedup.json'], outputs=['.pipeline/catalog.imputed.json'],
+          description="заполнение пропусков"),
+    Stage('compact', ['compact_descriptions.py', '.pipeline/catalog.imputed.json',
+                      '--output', 'fish_catalog.clean.json'],
+          inputs=['.pipeline/catalog.imputed.json'], outputs=['fish_catalog.clean.json'],
+          description="сжатие описаний → fish_catalog.clean.json"),
+    Stage('search', ['search_index.py', '--export'],
+          inputs=SPECIES, outputs=['src/data/searchIndex.json'],
+          description="поисковый индекс видов"),
+    Stage('water', ['water_index.py', '--export'],
+          inputs=SPECIES, outputs=['src/data/waterIndex.json'],
+          description="индекс параметров воды"),
+    Stage('packages', ['package_recommendations.py'],
+          inputs=SPECIES + ['src/data/aquariumPackages.ts', 'src/utils/compatibilityMatrix.ts'],
+          outputs=['src/data/packageRecommendations.json'],
+          description="рекомендации для комплектов"),
+]
+
+
+def local_imports(path: Path) -> Set[str]:
+    """Модули scripts/, импортируемые файлом (import x / from x import y)"""
+    try:
+        tree = ast.parse(path.read_text(encoding='utf-8'))
+    except (OSError, SyntaxError):
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    return {name for name in names if (SCRIPTS_DIR / f'{name}.py').exists()}
+
+
+def module_closure(script: Path) -> List[Path]:
+    """Скрипт и все модули scripts/, от которых он зависит (транзитивно)"""
+    seen = {script.stem}
+    queue = [script]
+    while queue:
+        for name in local_imports(queue.pop()):
+            if name not in seen:
+                seen.add(name)
+                queue.append(SCRIPTS_DIR / f'{name}.py')
+    return sorted(SCRIPTS_DIR / f'{name}.py' for name in seen)
+
+
+class FileHasher:
+    """sha256 файлов; при тех же размере и времени изменения хэш берется из кэша"""
+
+    def __init__(self, cache: Optional[Dict[str, Dict]] = None):
+        self.cache = cache if cache is not None else {}
+
+    def hash(self, relative: str) -> Optional[str]:
+        path = BASE_DIR / relative
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        cached = self.cache.get(relative)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        self.cache[relative] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage] = STAGES, state_path: Path = STATE_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = [stage.name for stage in stages]
+        self.deps = self._build_graph(stages)
+        self.state_path = state_path
+        state = self._load_state()
+        self.records: Dict[str, Dict] = state.get('stages', {})
+        self.hasher = FileHasher(state.get('files', {}))
+        self._code: Dict[str, str] = {}
+
+    @staticmethod
+    def _build_graph(stages: List[Stage]) -> Dict[str, Set[str]]:
+        """
+        Этап зависит от последнего предыдущего автора каждого своего входа
+        и выхода, а этап, переписывающий файл, — и от предыдущих читателей
+        этого файла (иначе он изменит файл, пока его читают)
+        """
+        last_writer: Dict[str, str] = {}
+        readers: Dict[str, Set[str]] = {}   # читатели файла после его последней записи
+        deps: Dict[str, Set[str]] = {}
+        for stage in stages:
+            deps[stage.name] = {last_writer[path] for path in stage.inputs + stage.outputs
+                                if path in last_writer}
+            for path in stage.outputs:
+                deps[stage.name] |= readers.get(path, set())
+            deps[stage.name].discard(stage.name)
+            for path in stage.inputs:
+                readers.setdefault(path, set()).add(stage.name)
+            for path in stage.outputs:
+                last_writer[path] = stage.name
+                readers[path] = set()
+        return deps
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state if state.get('version') == STATE_VERSION else {}
+
+    def save_state(self):
+        atomic_write_json(self.state_path, {
+            'version': STATE_VERSION,
+            'stages': self.records,
+            'files': self.hasher.cache,
+        })
+
+    def code_version(self, stage: Stage) -> str:
+        """Хэш исходников скрипта этапа и его локальных модулей"""
+        if stage.name not in self._code:
+            digest = hashlib.sha256()
+            for path in module_closure(stage.script):
+                relative = str(path.relative_to(BASE_DIR))
+                digest.update(f'{relative}:{self.hasher.hash(relative)}\n'.encode('utf-8'))
+            self._code[stage.name] = digest.hexdigest()
+        return self._code[stage.name]
+
+    def key(self, stage: Stage) -> str:
+        """Ключ кэша: аргументы, версия кода и содержимое входов"""
+        payload = {
+            'command': stage.command,
+            'code': self.code_version(stage),
+            'inputs': {path: self.hasher.hash(path) for path in stage.inputs},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def is_fresh(self, stage: Stage, key: str) -> bool:
+        if not all((BASE_DIR / path).exists() for path in stage.outputs):
+            return False
+        if not stage.inputs:
+            return True  # результат зависит от сайта, а не от файлов: только по --force
+        record = self.records.get(stage.name)
+        return bool(record) and record.get('key') == key
+
+    def missing_inputs(self, stage: Stage) -> List[str]:
+        return [path for path in stage.inputs if not (BASE_DIR / path).exists()]
+
+    def select(self, targets: Optional[List[str]] = None) -> List[str]:
+        """Выбранные этапы и все их зависимости в порядке объявления"""
+        if not targets:
+            return list(self.order)
+        unknown = [name for name in targets if name not in self.stages]
+        if unknown:
+            raise ValueError(f"неизвестные этапы: {', '.join(unknown)}")
+        selected: Set[str] = set()
+        queue = list(targets)
+        while queue:
+            name = queue.pop()
+            if name not in selected:
+                selected.add(name)
+                queue.extend(self.deps[name])
+        return [name for name in self.order if name in selected]
+
+    def execute(self, stage: Stage, profile: bool = False) -> int:
+        """Запустить скрипт этапа; вывод — в журнал этапа"""
+        command = [sys.executable, str(stage.script), *stage.command[1:]]
+        if profile:
+            command[1:1] = [str(SCRIPTS_DIR / 'profiling.py'), '--output', str(PROFILE_DIR),
+                            '--stage', stage.name]
+        for path in stage.outputs:
+            (BASE_DIR / path).parent.mkdir(parents=True, exist_ok=True)
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        env = dict(os.environ, PYTHONUNBUFFERED='1', PYTHONIOENCODING='utf-8')
+        with open(LOG_DIR / f'{stage.name}.log', 'w', encoding='utf-8') as log:
+            process = subprocess.run(command, cwd=BASE_DIR, stdout=log, stderr=subprocess.STDOUT, env=env)
+        return process.returncode
+
+    def run(self, targets: Optional[List[str]] = None, force: Optional[List[str]] = None,
+            skip: Optional[List[str]] = None, jobs: int = JOBS, plan: bool = False,
+            profile: bool = False) -> Dict[str, str]:
+        """
+        Выполнить устаревшие этапы. force — этапы, выполняемые без проверки
+        кэша (пустой список — все), skip — не выполнять: последующие этапы
+        берут файлы как есть, profile — запускать этапы под профилировщиком.
+        Возвращает статус каждого этапа.
+        """
+        skip = set(skip or [])
+        pending = [name for name in self.select(targets) if name not in skip]
+        forced = set(self.order) if force == [] else set(force or [])
+        status: Dict[str, str] = {}
+        running = {}
+        keys: Dict[str, str] = {}
+        started_at: Dict[str, float] = {}
+        seconds: Dict[str, float] = {}
+        started = time.perf_counter()
+
+        jobs = max(1, jobs)
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            while pending or running:
+                busy = set(running.values())
+                for name in list(pending):
+                    if len(running) >= jobs:
+                        break
+                    if (self.deps[name] & busy) or any(dep in pending for dep in self.deps[name]):
+                        continue
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    failed = [dep for dep in self.deps[name] if status.get(dep) in ('failed', 'blocked')]
+                    if failed:
+                        status[name] = 'blocked'
+                        print(f"⛔ {name}: не выполнен {', '.join(sorted(failed))}")
+                        continue
+                    if any(status.get(dep) == 'planned' for dep in self.deps[name]):
+                        status[name] = 'planned'
+                        print(f"🔜 {name}: после обновления входов")
+                        continue
+                    missing = self.missing_inputs(stage)
+                    if missing:
+                        status[name] = 'blocked'
+                        print(f"⛔ {name}: нет входов {', '.join(missing)}")
+                        continue
+                    key = self.key(stage)
+                    if name not in forced and self.is_fresh(stage, key):
+                        status[name] = 'cached'
+                        print(f"⏭  {name}: без изменений")
+                        continue
+                    if plan:
+                        status[name] = 'planned'
+                        print(f"🔜 {name}: {stage.description}")
+                        continue
+                    print(f"▶ {name}: {stage.description}")
+                    keys[name] = key
+                    started_at[name] = time.perf_counter()
+                    running[pool.submit(self.execute, stage, profile)] = name
+                    busy.add(name)
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    seconds[name] = round(time.perf_counter() - started_at[name], 2)
+                    status[name] = self._finish(self.stages[name], keys[name], future.result(),
+                                                seconds[name])
+
+        if not plan:
+            self.save_state()
+            self.save_report(status, seconds, profile)
+        counts = {s: sum(1 for v in status.values() if v == s)
+                  for s in ('done', 'cached', 'failed', 'blocked', 'planned')}
+        print(f"\n{'План' if plan else 'Готово'}: выполнено {counts['done']}, из кэша {counts['cached']}, "
+              f"запланировано {counts['planned']}, ошибок {counts['failed']}, "
+              f"пропущено {counts['blocked']} ({time.perf_counter() - started:.1f} с)")
+        return status
+
+    def save_report(self, status: Dict[str, str], seconds: Dict[str, float], profile: bool):
+        report = {
+            'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'stages': {name: {'status': status[name], 'seconds': seconds.get(name)}
+                       for name in self.order if name in status},
+        }
+        if profile:
+            from profiling import format_table, load_profiles
+            profiles = load_profiles(PROFILE_DIR, [name for name in seconds])
+            report['profile'] = [asdict(p) for p in profiles]
+            if profiles:
+                print(f"\n{format_table(profiles)}\nПрофили: {PROFILE_DIR.relative_to(BASE_DIR)}/")
+        atomic_write_json(REPORT_PATH, report)
+
+    def _finish(self, stage: Stage, key: str, returncode: int, seconds: float) -> str:
+        log_path = LOG_DIR / f'{stage.name}.log'
+        if returncode != 0:
+            print(f"❌ {stage.name}: код {returncode}, журнал {log_path.relative_to(BASE_DIR)}")
+            lines = log_path.read_text(encoding='utf-8', errors='replace').splitlines()
+            for line in lines[-LOG_TAIL_LINES:]:
+                print(f"   {line}")
+            return 'failed'
+        # Ключ — по входам, которые этап прочитал; у этапа, правящего файлы
+        # на месте, — после работы, когда они уже в новом состоянии
+        self.records[stage.name] = {
+            'key': self.key(stage) if stage.in_place else key,
+            'seconds': round(seconds, 2),
+            'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self.save_state()  # прерванный запуск не теряет выполненные этапы
+        print(f"✅ {stage.name}: {seconds:.1f} с")
+        return 'done'
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Конвейер каталога: устаревшие этапы заново, остальные из кэша",
+        epilog="Этапы: " + ', '.join(f"{s.name} ({s.description})" for s in STAGES))
+    arg_parser.add_argument('stages', nargs='*', metavar='этап', help="этапы (с зависимостями); по умолчанию все")
+    arg_parser.add_argument('--plan', action='store_true', help="только показать, что будет выполнено")
+    arg_parser.add_argument('--force', nargs='*', metavar='этап',
+                            help="выполнить без проверки кэша (без имен — все этапы)")
+    arg_parser.add_argument('--skip', nargs='+', default=[], metavar='этап',
+                            help="не выполнять (например, crawl images без сети)")
+    arg_parser.add_argument('--jobs', type=int, default=JOBS, help="параллельных этапов")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="cProfile и tracemalloc для выполняемых этапов (с --force — для всех)")
+    args = arg_parser.parse_args()
+
+    pipeline = Pipeline()
+    try:
+        status = pipeline.run(args.stages, force=args.force, skip=args.skip, jobs=args.jobs, plan=args.plan,
+                              profile=args.profile)
+    except ValueError as e:
+        arg_parser.error(str(e))
+    if any(s in ('failed', 'blocked') for s in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Профилирование этапов: время (cProfile) и память (tracemalloc)
+
+Для каждого этапа сохраняются в папку профиля:
+- <этап>.pstats — статистика cProfile (python3 -m pstats, snakeviz)
+- <этап>.collapsed — свернутые стеки для flamegraph.pl / speedscope:
+  «корень;вызывающая;функция число_выборок». cProfile хранит только пары
+  «вызывающая → вызываемая», поэтому полные стеки собирает отдельный
+  поток, снимающий стек этапа раз в SAMPLE_INTERVAL
+- <этап>.memory.txt — пик памяти, строки с наибольшими выделениями в
+  момент пика (снимок tracemalloc делает тот же поток выборки, когда
+  занятая память превышает прошлый снимок на PEAK_SNAPSHOT_STEP) и то,
+  что удерживается в конце этапа
+- <этап>.json — строка сводной таблицы
+
+    python3 profiling.py [--output DIR] [--stage NAME] script.py [аргументы...]
+    python3 profiling.py --show ../.pipeline/profile/crawl.pstats
+
+aquacat.py, pipeline.py и fanfishka_parser.py принимают --profile.
+tracemalloc замедляет выполнение в несколько раз; --no-memory оставляет
+только cProfile.
+"""
+
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from catalog_store import atomic_write_json, atomic_write_text
+
+BASE_DIR = Path(__file__).parent.parent
+PROFILE_DIR = BASE_DIR / '.pipeline' / 'profile'
+
+TOP_ALLOCATIONS = 15
+TRACEMALLOC_FRAMES = 1
+SAMPLE_INTERVAL = 0.005        # с; чаще не имеет смысла: поток ждет GIL (sys.getswitchinterval)
+PEAK_SNAPSHOT_STEP = 0.25      # новый снимок, когда память выросла на 25% от прошлого снимка...
+PEAK_SNAPSHOT_MIN_BYTES = 1 << 20   # ...и не меньше чем на 1 МБ (снимок дорогой)
+
+Function = Tuple[str, int, str]   # (файл, строка, имя) — ключ pstats
+
+
+@dataclass
+class StageProfile:
+    stage: str
+    wall_s: float
+    cpu_s: float
+    calls: int
+    peak_mb: Optional[float]
+    top_function: str
+    top_allocation: str
+
+
+def function_label(func: Function) -> str:
+    filename, line, name = func
+    if filename == '~':  # встроенные функции: ('~', 0, "<method 'get' of 'dict' objects>")
+        return name
+    return f'{name} ({Path(filename).name}:{line})'
+
+
+class StackSampler(threading.Thread):
+    """
+    Выборка стека профилируемого потока раз в interval секунд; с memory —
+    еще и снимок tracemalloc около пика занятой памяти (peak_snapshot)
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL, memory: bool = False):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.memory = memory
+        self.samples: Counter = Counter()
+        self.peak_snapshot: Optional[tracemalloc.Snapshot] = None
+        self.peak_snapshot_size = 0
+        self._labels: Dict[object, str] = {}
+        self._stopped = threading.Event()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            label = self._labels[code] = label.replace(';', ',')
+        return label
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+            if self.memory:
+                self.snapshot_if_peak()
+
+    def snapshot_if_peak(self):
+        """Снимок, если занятая память заметно больше, чем в прошлом снимке"""
+        current = tracemalloc.get_traced_memory()[0]
+        threshold = max(self.peak_snapshot_size * (1 + PEAK_SNAPSHOT_STEP),
+                        self.peak_snapshot_size + PEAK_SNAPSHOT_MIN_BYTES)
+        if current >= threshold:
+            self.peak_snapshot = None  # прошлый снимок не должен попасть в новый
+            self.peak_snapshot = tracemalloc.take_snapshot()
+            self.peak_snapshot_size = current
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, limit: int = TOP_ALLOCATIONS) -> List[tracemalloc.Statistic]:
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),  # выборки стеков самого профилировщика
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ))
+    return snapshot.statistics('lineno')[:limit]
+
+
+def _allocation_lines(top: List[tracemalloc.Statistic]) -> List[str]:
+    lines = []
+    for stat in top:
+        frame = stat.traceback[0]
+        lines.append(f'{stat.size / 1024:10.1f} КБ {stat.count:8} блоков  '
+                     f'{Path(frame.filename).name}:{frame.lineno}')
+    return lines
+
+
+def memory_report(peak_snapshot: Optional[tracemalloc.Snapshot], peak_snapshot_size: int,
+                  retained: tracemalloc.Snapshot, peak: int, limit: int = TOP_ALLOCATIONS) -> Tuple[str, str]:
+    """
+    (текст отчета, самая крупная строка выделений в пике). Без снимка в пике
+    (этап не вырос на PEAK_SNAPSHOT_MIN_BYTES) — по удерживаемому в конце.
+    """
+    lines = [f'Пик: {peak / 1024 / 1024:.1f} МБ']
+    at_peak = top_allocations(peak_snapshot, limit) if peak_snapshot is not None else []
+    if at_peak:
+        lines.append(f'В пике (снимок при {peak_snapshot_size / 1024 / 1024:.1f} МБ, топ {limit}):')
+        lines.extend(_allocation_lines(at_peak))
+        lines.append('')
+    top_retained = top_allocations(retained, limit)
+    lines.append(f'Удерживается в конце этапа (топ {limit}):')
+    lines.extend(_allocation_lines(top_retained))
+    top = at_peak or top_retained
+    biggest = ''
+    if top:
+        frame = top[0].traceback[0]
+        biggest = f'{Path(frame.filename).name}:{frame.lineno} ({top[0].size / 1024:.0f} КБ)'
+        if not at_peak:
+            biggest += ', удерживается'
+    return '\n'.join(lines) + '\n', biggest
+
+
+class StageProfiler:
+    """
+    Контекстный менеджер: профилирует блок и сохраняет файлы этапа.
+    После выхода результат — в .result (StageProfile).
+    """
+
+    def __init__(self, stage: str, output_dir: Path = PROFILE_DIR, memory: bool = True):
+        self.stage = stage
+        self.output_dir = Path(output_dir)
+        self.memory = memory
+        self.result: Optional[StageProfile] = None
+        self._profiler = cProfile.Profile()
+
+    def __enter__(self) -> 'StageProfiler':
+        if self.memory:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._sampler = StackSampler(threading.get_ident(), memory=self.memory)
+        self._sampler.start()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.disable()
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        self._sampler.stop()
+        peak_mb, top_allocation = None, ''
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self.memory:
+            retained = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            text, top_allocation = memory_report(self._sampler.peak_snapshot, self._sampler.peak_snapshot_size,
+                                                 retained, peak)
+            self._sampler.peak_snapshot = None
+            atomic_write_text(self.output_dir / f'{self.stage}.memory.txt', text)
+            peak_mb = round(peak / 1024 / 1024, 1)
+
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        stats.dump_stats(str(self.output_dir / f'{self.stage}.pstats'))
+        atomic_write_text(self.output_dir / f'{self.stage}.collapsed',
+                          ''.join(f'{stack} {count}\n' for stack, count in sorted(self._sampler.samples.items())))
+
+        own_time = {func: entry[2] for func, entry in stats.stats.items()}
+        top_function = max(own_time, key=own_time.get) if own_time else None
+        self.result = StageProfile(
+            stage=self.stage,
+            wall_s=round(wall, 3),
+            cpu_s=round(cpu, 3),
+            calls=stats.total_calls,
+            peak_mb=peak_mb,
+            top_function=function_label(top_function) if top_function else '',
+            top_allocation=top_allocation,
+        )
+        atomic_write_json(self.output_dir / f'{self.stage}.json', asdict(self.result))
+        return False  # исключение этапа не подавляется
+
+
+def load_profiles(output_dir: Path, stages: List[str]) -> List[StageProfile]:
+    """Строки сводки этапов, профилированных в других процессах"""
+    profiles = []
+    for stage in stages:
+        try:
+            with open(Path(output_dir) / f'{stage}.json', 'r', encoding='utf-8') as f:
+                profiles.append(StageProfile(**json.load(f)))
+        except (OSError, ValueError, TypeError):
+            continue
+    return profiles
+
+
+def format_table(profiles: List[StageProfile]) -> str:
+    """Сводная таблица для отчета о запуске"""
+    if not profiles:
+        return ''
+    rows = [f"{'этап':12} {'время, с':>9} {'CPU, с':>8} {'вызовов':>10} {'пик, МБ':>8}  "
+            f"самая затратная функция / крупнейшее выделение"]
+    for p in profiles:
+        peak = f'{p.peak_mb:8.1f}' if p.peak_mb is not None else f"{'—':>8}"
+        rows.append(f'{p.stage:12} {p.wall_s:9.2f} {p.cpu_s:8.2f} {p.calls:10} {peak}  {p.top_function}')
+        if p.top_allocation:
+            rows.append(f"{'':51}  {p.top_allocation}")
+    return '\n'.join(rows)
+
+
+def run_script(script: str, args: List[str], stage: str, output_dir: Path, memory: bool = True) -> int:
+    """Выполнить скрипт как __main__ под профилировщиком; код возврата скрипта"""
+    sys.argv = [script, *args]
+    sys.path.insert(0, str(Path(script).resolve().parent))
+    code = 0
+    with StageProfiler(stage, output_dir, memory) as profiler:
+        try:
+            runpy.run_path(script, run_name='__main__')
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    print(f"\n⏱ Профиль: {output_dir / stage}.pstats, .collapsed"
+          f"{', .memory.txt' if memory else ''} ({profiler.result.wall_s:.1f} с)")
+    return code
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Профилирование скрипта: cProfile и tracemalloc")
+    arg_parser.add_argument('script', nargs='?', help="скрипт для запуска")
+    arg_parser.add_argument('args', nargs=argparse.REMAINDER, help="аргументы скрипта")
+    arg_parser.add_argument('--output', default=str(PROFILE_DIR), help="папка профиля")
+    arg_parser.add_argument('--stage', help="имя этапа (по умолчанию — имя скрипта)")
+    arg_parser.add_argument('--no-memory', action='store_true', help="без tracemalloc")
+    arg_parser.add_argument('--show', metavar='PSTATS', help="вывести сохраненную статистику")
+    arg_parser.add_argument('--sort', default='cumulative', help="сортировка для --show")
+    arg_parser.add_argument('--limit', type=int, default=25, help="строк для --show")
+    args = arg_parser.parse_args()
+
+    if args.show:
+        pstats.Stats(args.show).strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+        return
+    if not args.script:
+        arg_parser.error("укажите скрипт или --show")
+    stage = args.stage or Path(args.script).stem
+    sys.exit(run_script(args.script, args.args, stage, Path(args.output), memory=not args.no_memory))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,15 @@
 Скрипт для перепарсинга только изображений из уже собранных статей о рыбах
 """
 
-import requests
 from bs4 import BeautifulSoup
-import time
-import json
 import re
 from urllib.parse import urljoin
 from pathlib import Path
 from typing import Optional
 
+from http_client import fetch_soup, polite_sleep
+from catalog_store import CatalogPatcher, load_catalog
+
 BASE_DIR = Path(__file__).parent.parent
 CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
 OUTPUT_PATH = BASE_DIR / 'fish_catalog_updated.json'
@@ -20,26 +20,9 @@ OUTPUT_PATH = BASE_DIR / 'fish_catalog_updated.json'
 BASE_URL = "https://fanfishka.ru"
 DELAY_BETWEEN_REQUESTS = 1
 
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-}
-
 def get_page(url: str, retries: int = 3) -> Optional[BeautifulSoup]:
-    """Получить страницу с обработкой ошибок"""
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=10)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            return BeautifulSoup(response.text, 'html.parser')
-        except requests.RequestException as e:
-            print(f"⚠ Ошибка при запросе {url} (попытка {attempt + 1}/{retries}): {e}")
-            if attempt < retries - 1:
-                time.sleep(2)
-            else:
-                print(f"❌ Не удалось загрузить {url}")
-                return None
-    return None
+    """Получить страницу через общий пул keep-alive соединений"""
+    return fetch_soup(url, retries=retries)
 
 def extract_image_from_page(soup: BeautifulSoup, article_url: str) -> Optional[str]:
     """Извлечь изображение рыбы со страницы (улучшенная версия)"""
@@ -175,11 +158,16 @@ def main():
     
     # Читаем существующий каталог
     print("📖 Чтение каталога...")
-    with open(CATALOG_PATH, 'r', encoding='utf-8') as f:
-        catalog_data = json.load(f)
+    catalog_data = load_catalog(CATALOG_PATH)
     
     print(f"✅ Загружено {len(catalog_data)} записей")
     
+    # Правки копятся в журнале; каталог переписывается один раз в конце
+    patcher = CatalogPatcher(OUTPUT_PATH)
+    recovered = patcher.apply_pending(catalog_data)
+    if recovered:
+        print(f"♻ Восстановлено {recovered} правок из журнала прерванного запуска")
+    
     # Фильтруем только статьи о рыбах
     fish_articles = [item for item in catalog_data if is_fish_article(item)]
     print(f"✅ Найдено {len(fish_articles)} статей о рыбах")
@@ -227,28 +215,26 @@ def main():
             if soup:
                 new_image = extract_image_from_page(soup, url)
                 if new_image and 'sovmestimost' not in new_image.lower():
-                    catalog_dict[article_id]['image_url'] = new_image
+                    patcher.patch(article_id, image_url=new_image)
                     updated_count += 1
                     print(f"   ✅ Найдено изображение: {new_image[:60]}...")
                     image_found = True
                     break
             
-            time.sleep(DELAY_BETWEEN_REQUESTS)
+            polite_sleep(DELAY_BETWEEN_REQUESTS)
         
         if not image_found:
             not_found_count += 1
             print(f"   ❌ Изображение не найдено")
         
-        # Промежуточное сохранение каждые 50 статей
+        # Журнал сбрасывается на диск каждые 50 статей
         if i % 50 == 0:
-            with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-                json.dump(list(catalog_dict.values()), f, ensure_ascii=False, indent=2)
-            print(f"\n💾 Промежуточное сохранение ({i} статей обработано)\n")
+            patcher.sync()
+            print(f"\n💾 Журнал правок сохранен ({i} статей обработано)\n")
     
     # Сохраняем обновленный каталог
     print(f"\n💾 Сохранение результатов...")
-    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-        json.dump(list(catalog_dict.values()), f, ensure_ascii=False, indent=2)
+    patcher.commit(list(catalog_dict.values()))
     
     print()
     print("=" * 60)
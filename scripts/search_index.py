@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поисковый индекс по названиям и описаниям видов (префиксы + триграммы)
+
+Индекс строится при экспорте и сохраняется в src/data/searchIndex.json:
+- термы — нормализованные слова (ё→е, нижний регистр) после легкого
+  стемминга русских окончаний («голубой», «голубая» → «голуб»)
+- источники: name_ru, синонимы из названия («… или …», скобки),
+  name_lat, ключевые слова description_short и семейство
+- отсортированный список термов: поиск по префиксу — двоичный поиск
+- триграммы термов: запрос с опечаткой находит близкие термы
+
+Окончания для стемминга записываются в индекс, поэтому клиент
+(src/utils/searchIndex.ts) обрабатывает запрос так же.
+
+    python3 search_index.py --export
+    python3 search_index.py "неон гол"
+"""
+
+import argparse
+import re
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from catalog_index import normalize_name
+from catalog_store import atomic_write_json
+from community_solver import SPECIES_PATHS, load_species
+
+BASE_DIR = Path(__file__).parent.parent
+OUTPUT_PATH = BASE_DIR / 'src' / 'data' / 'searchIndex.json'
+
+# Окончания по убыванию длины; отрезается первое подходящее
+SUFFIXES = sorted([
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ый', 'ий', 'ой', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ых', 'их', 'ую', 'юю',
+    'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ей',
+    'а', 'я', 'ы', 'и', 'у', 'ю', 'е', 'о', 'ь', 'й',
+], key=len, reverse=True)
+MIN_STEM = 4
+MIN_KEYWORD_LENGTH = 4
+KEYWORDS_PER_DOC = 12
+FUZZY_THRESHOLD = 0.5  # коэффициент Дайса по триграммам
+
+# Поле терма: вес при ранжировании
+FIELDS = {'name': 0, 'synonym': 1, 'latin': 2, 'description': 3}
+FIELD_WEIGHTS = [3.0, 2.5, 2.0, 1.0]
+
+STOPWORDS = {
+    'этот', 'этой', 'того', 'очень', 'может', 'могут', 'также', 'более', 'менее', 'который',
+    'которая', 'которые', 'только', 'даже', 'если', 'когда', 'чтобы', 'хорошо',
+    'рыба', 'рыбы', 'рыбка', 'рыбки', 'аквариум', 'аквариума', 'аквариуме', 'вида', 'видов',
+}
+
+_CYRILLIC = re.compile(r'^[а-я]+$')
+
+
+def stem(word: str) -> str:
+    """Легкий стемминг: отрезать одно окончание у русского слова"""
+    if not _CYRILLIC.match(word):
+        return word
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def terms_of(text: str) -> List[str]:
+    return [stem(word) for word in normalize_name(text).split()]
+
+
+def synonyms_of(name_ru: str) -> List[str]:
+    """Другие названия из name_ru: «Неон голубой или обыкновенный», «Тернеция (Глофиш)»"""
+    synonyms = re.findall(r'\(([^)]+)\)', name_ru or '')
+    base = re.sub(r'\([^)]*\)', ' ', name_ru or '')
+    parts = re.split(r'\s+или\s+', base)
+    if len(parts) > 1:
+        synonyms.extend(parts[1:])
+    return synonyms
+
+
+def trigrams(term: str) -> List[str]:
+    padded = f'${term}$'
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _dice(a: Sequence[str], b: Sequence[str]) -> float:
+    common = sum((Counter(a) & Counter(b)).values())
+    return 2 * common / (len(a) + len(b)) if a and b else 0.0
+
+
+class SearchIndex:
+    """Префиксный и триграммный индекс; строится из записей или из экспорта"""
+
+    def __init__(self, docs: List[list], terms: List[str], postings: List[List[int]],
+                 trigram_map: Dict[str, List[int]]):
+        self.docs = docs          # [[id, name_ru, name_lat], ...]
+        self.terms = terms        # отсортированы
+        self.postings = postings  # для терма: doc * 4 + поле
+        self.trigram_map = trigram_map
+
+    @classmethod
+    def build(cls, records: List[Dict], id_prefix: str = 'fish-') -> 'SearchIndex':
+        fields_of_term: Dict[str, Dict[int, int]] = defaultdict(dict)
+
+        def add(doc: int, text: str, field: str):
+            for term in terms_of(text):
+                if term:
+                    current = fields_of_term[term].get(doc)
+                    # Для пары (терм, документ) храним самое весомое поле
+                    if current is None or FIELDS[field] < current:
+                        fields_of_term[term][doc] = FIELDS[field]
+
+        docs = []
+        for doc, record in enumerate(records):
+            name_ru = record.get('name_ru', '')
+            docs.append([f"{id_prefix}{record.get('id')}", name_ru, record.get('name_lat', '')])
+            add(doc, re.sub(r'\([^)]*\)', ' ', name_ru).split(' или ')[0], 'name')
+            for synonym in synonyms_of(name_ru):
+                add(doc, synonym, 'synonym')
+            add(doc, record.get('name_lat', ''), 'latin')
+            words = [w for w in normalize_name(record.get('description_short', '')).split()
+                     if len(w) >= MIN_KEYWORD_LENGTH and w not in STOPWORDS]
+            keywords = [w for w, _ in Counter(stem(w) for w in words).most_common(KEYWORDS_PER_DOC)]
+            add(doc, ' '.join(keywords), 'description')
+            add(doc, record.get('family_group', '').replace('_', ' '), 'description')
+
+        terms = sorted(fields_of_term)
+        postings = [[doc * 4 + field for doc, field in sorted(fields_of_term[term].items())]
+                    for term in terms]
+        trigram_map: Dict[str, List[int]] = defaultdict(list)
+        for position, term in enumerate(terms):
+            for gram in set(trigrams(term)):
+                trigram_map[gram].append(position)
+        return cls(docs, terms, postings, dict(trigram_map))
+
+    @classmethod
+    def from_export(cls, data: Dict) -> 'SearchIndex':
+        return cls(data['docs'], data['terms'], data['postings'], data['trigrams'])
+
+    def export(self) -> Dict:
+        return {
+            'suffixes': SUFFIXES,
+            'min_stem': MIN_STEM,
+            'field_weights': FIELD_WEIGHTS,
+            'docs': self.docs,
+            'terms': self.terms,
+            'postings': self.postings,
+            'trigrams': self.trigram_map,
+        }
+
+    def _prefix_range(self, prefix: str) -> range:
+        start = bisect_left(self.terms, prefix)
+        end = bisect_left(self.terms, prefix + '\uffff', lo=start)
+        return range(start, end)
+
+    def _fuzzy_terms(self, term: str) -> List[int]:
+        grams = trigrams(term)
+        counts: Counter = Counter()
+        for gram in set(grams):
+            counts.update(self.trigram_map.get(gram, ()))
+        return [position for position, _ in counts.most_common(50)
+                if _dice(grams, trigrams(self.terms[position])) >= FUZZY_THRESHOLD]
+
+    def _scores_for(self, token: str, prefix: bool) -> Dict[int, float]:
+        """Документ → лучший вес поля для одного слова запроса"""
+        term = stem(token)
+        if prefix:
+            positions = list(self._prefix_range(term))
+        else:
+            exact = bisect_left(self.terms, term)
+            positions = [exact] if exact < len(self.terms) and self.terms[exact] == term else []
+        penalty = 1.0
+        if not positions:
+            positions = self._fuzzy_terms(term)
+            penalty = 0.5
+        scores: Dict[int, float] = {}
+        for position in positions:
+            for entry in self.postings[position]:
+                doc, field = divmod(entry, 4)
+                weight = FIELD_WEIGHTS[field] * penalty
+                if weight > scores.get(doc, 0):
+                    scores[doc] = weight
+        return scores
+
+    def rank(self, query: str, limit: Optional[int] = 10) -> List[Tuple[int, float]]:
+        """
+        Номера документов, подходящих под все слова запроса (последнее —
+        как префикс), с оценкой, по убыванию оценки
+        """
+        tokens = normalize_name(query).split()
+        if not tokens:
+            return []
+        total: Optional[Dict[int, float]] = None
+        for i, token in enumerate(tokens):
+            scores = self._scores_for(token, prefix=(i == len(tokens) - 1))
+            if total is None:
+                total = scores
+            else:
+                total = {doc: total[doc] + score for doc, score in scores.items() if doc in total}
+            if not total:
+                return []
+        ranked = sorted(total.items(), key=lambda item: (-item[1], len(self.docs[item[0]][1])))
+        return ranked[:limit]
+
+    def search(self, query: str, limit: Optional[int] = 10) -> List[Tuple[float, list]]:
+        """[(оценка, [id, name_ru, name_lat])] по убыванию оценки"""
+        return [(score, self.docs[doc]) for doc, score in self.rank(query, limit)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Поисковый индекс по видам")
+    arg_parser.add_argument('query', nargs='?', help="поисковый запрос")
+    arg_parser.add_argument('--species', nargs='*', help="JSON с видами (по умолчанию src/data)")
+    arg_parser.add_argument('--export', action='store_true', help=f"сохранить {OUTPUT_PATH.name}")
+    args = arg_parser.parse_args()
+
+    records = load_species(args.species or SPECIES_PATHS)
+    started = time.perf_counter()
+    index = SearchIndex.build(records)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"Видов: {len(records)}, термов: {len(index.terms)}, "
+          f"триграмм: {len(index.trigram_map)} ({build_ms:.0f} мс)")
+
+    if args.export:
+        atomic_write_json(OUTPUT_PATH, index.export(), indent=None)
+        print(f"💾 Сохранено: {OUTPUT_PATH} ({OUTPUT_PATH.stat().st_size / 1024:.0f} КБ)")
+
+    if args.query:
+        started = time.perf_counter()
+        results = index.search(args.query)
+        query_ms = (time.perf_counter() - started) * 1000
+        print(f"Найдено: {len(results)} ({query_ms:.2f} мс)")
+        for score, (fish_id, name_ru, name_lat) in results:
+            print(f"  {score:4.1f}  {name_ru} {name_lat}")
+
+
+if __name__ == "__main__":
+    main()
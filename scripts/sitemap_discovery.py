@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск статей о рыбах через sitemap.xml и RSS/Atom ленты
+
+Быстрая альтернатива обходу страниц пагинации: несколько запросов вместо
+сотни. XML разбирается потоково (XMLPullParser), поэтому большие карты
+сайта не загружаются в память целиком. Для каждой статьи возвращается
+дата последнего изменения (lastmod), по которой инкрементальный обход
+пропускает неизменившиеся статьи.
+"""
+
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from http_client import fetch
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://fanfishka.ru"
+ARTICLE_PREFIX = "/akvariumnye-stati/akvariumnye_rybki/"
+
+# Карты сайта в порядке проверки (DLE, WordPress core, Yoast)
+SITEMAP_CANDIDATES = [
+    "/sitemap.xml",
+    "/wp-sitemap.xml",
+    "/sitemap_index.xml",
+]
+
+# Ленты: раздел каталога, общая лента WordPress, RSS DLE
+FEED_CANDIDATES = [
+    ARTICLE_PREFIX + "feed/",
+    "/feed/",
+    "/rss.xml",
+]
+
+CHUNK_SIZE = 64 * 1024
+MAX_SITEMAP_DEPTH = 3
+
+
+def _local(tag: str) -> str:
+    """Имя тега без пространства имен"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[str]:
+    """Привести lastmod/pubDate/updated к ISO 8601 в UTC"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            dt = parsedate_to_datetime(value)  # формат RSS pubDate
+        except (TypeError, ValueError):
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def is_article_url(url: str) -> bool:
+    """Ссылка ведет на статью каталога рыб (не на пагинацию и не на раздел)"""
+    if ARTICLE_PREFIX not in url or '/page/' in url:
+        return False
+    return not url.rstrip('/').endswith(ARTICLE_PREFIX.rstrip('/'))
+
+
+def iter_xml_entries(url: str, session=None, retries: int = 3) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """
+    Потоково разобрать XML-документ по URL.
+    Возвращает пары (тип_записи, поля): тип — 'sitemap', 'url', 'item' или 'entry'
+    """
+    response = fetch(url, session=session, retries=retries, stream=True)
+    if response is None:
+        return
+
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    fields: Dict[str, str] = {}
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                name = _local(elem.tag)
+                if event == 'start':
+                    # Поля канала/индекса не должны попасть в первую запись
+                    if name in ('sitemap', 'url', 'item', 'entry'):
+                        fields = {}
+                    continue
+                if name in ('sitemap', 'url', 'item', 'entry'):
+                    yield name, fields
+                    fields = {}
+                    elem.clear()
+                elif name == 'link' and elem.get('href'):
+                    # Atom: <link href="..."/>
+                    fields.setdefault('link', elem.get('href'))
+                elif elem.text and elem.text.strip():
+                    fields.setdefault(name, elem.text.strip())
+                    elem.clear()
+        parser.close()
+    except ET.ParseError as e:
+        logger.warning(f"Некорректный XML {url}: {e}")
+    finally:
+        response.close()
+
+
+def iter_sitemap(url: str, session=None, depth: int = 0,
+                 retries: int = 3) -> Iterator[Tuple[str, Optional[str]]]:
+    """Обойти sitemap (включая индексы карт) и вернуть пары (url, lastmod)"""
+    for kind, fields in iter_xml_entries(url, session=session, retries=retries):
+        loc = fields.get('loc')
+        if not loc:
+            continue
+        if kind == 'sitemap':
+            if depth < MAX_SITEMAP_DEPTH:
+                yield from iter_sitemap(urljoin(BASE_URL, loc), session=session, depth=depth + 1)
+        elif kind == 'url':
+            yield urljoin(BASE_URL, loc), parse_lastmod(fields.get('lastmod'))
+
+
+def iter_feed(url: str, session=None, retries: int = 3) -> Iterator[Tuple[str, Optional[str]]]:
+    """Разобрать RSS/Atom ленту и вернуть пары (url, дата)"""
+    for kind, fields in iter_xml_entries(url, session=session, retries=retries):
+        if kind not in ('item', 'entry'):
+            continue
+        link = fields.get('link') or fields.get('guid')
+        if not link:
+            continue
+        lastmod = fields.get('updated') or fields.get('pubDate') or fields.get('published')
+        yield urljoin(BASE_URL, link), parse_lastmod(lastmod)
+
+
+def discover_articles(session=None, use_feeds: bool = True) -> List[Tuple[str, Optional[str]]]:
+    """
+    Найти статьи о рыбах через карту сайта и ленты.
+    Возвращает список (url, lastmod) без дубликатов; при нескольких датах
+    для одного URL берется самая поздняя.
+    """
+    found: Dict[str, Optional[str]] = {}
+
+    def add(url: str, lastmod: Optional[str]):
+        if not is_article_url(url):
+            return
+        previous = found.get(url)
+        if url not in found or (lastmod and (not previous or lastmod > previous)):
+            found[url] = lastmod
+
+    # Кандидаты проверяются одной попыткой: 404 здесь — ожидаемый ответ
+    for path in SITEMAP_CANDIDATES:
+        before = len(found)
+        for url, lastmod in iter_sitemap(urljoin(BASE_URL, path), session=session, retries=1):
+            add(url, lastmod)
+        if len(found) > before:
+            logger.info(f"Карта сайта {path}: {len(found) - before} статей")
+            break
+
+    if use_feeds:
+        # Лента содержит только свежие статьи, но с точной датой изменения
+        for path in FEED_CANDIDATES:
+            before = len(found)
+            for url, lastmod in iter_feed(urljoin(BASE_URL, path), session=session, retries=1):
+                add(url, lastmod)
+            if len(found) > before:
+                logger.info(f"Лента {path}: {len(found) - before} новых статей")
+
+    return list(found.items())
+
+
+def is_unchanged(previous: Optional[Dict], lastmod: Optional[str]) -> bool:
+    """Статья не менялась с прошлого обхода (по сохраненному source_lastmod)"""
+    if not previous or not lastmod:
+        return False
+    stored = previous.get('source_lastmod')
+    return bool(stored) and stored >= lastmod
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    articles = discover_articles()
+    for url, lastmod in articles[:20]:
+        print(f"{lastmod or '—':32} {url}")
+    print(f"\nВсего найдено статей: {len(articles)}")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Проверка числовых полей каталога и поиск выбросов (векторно, NumPy)
+
+Эвристики парсера часто ошибаются: одно значение pH превращается в
+диапазон ±0.5, температура берется из постороннего «N–M °C», размер
+усекается int(). Скрипт проверяет весь каталог за миллисекунды:
+- допустимые диапазоны (pH 0–14, температура, размер, объем)
+- согласованность (pH_min ≤ pH_max, temp_min ≤ temp_max, объем vs размер)
+- выбросы внутри семейства по робастной z-оценке (медиана/MAD)
+и сохраняет отчет с помеченными записями.
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from catalog_arrays import CatalogColumns, WATER_FIELDS, robust_z
+from catalog_store import atomic_write_json, load_catalog
+
+BASE_DIR = Path(__file__).parent.parent
+CATALOG_PATH = BASE_DIR / 'fish_catalog.json'
+REPORT_PATH = BASE_DIR / 'scripts' / 'validation_report.json'
+
+# Допустимые значения
+PH_RANGE = (0.0, 14.0)
+PH_PLAUSIBLE = (4.0, 9.5)        # за пределами — почти наверняка ошибка парсинга
+TEMP_RANGE = (4.0, 36.0)         # °C
+TEMP_MAX_SPAN = 15.0             # шире — диапазон взят из постороннего текста
+SIZE_RANGE = (0.5, 150.0)        # см
+TANK_RANGE = (5.0, 10000.0)      # л
+LITERS_PER_CM_MIN = 2.0          # меньше — объем не соответствует размеру
+PH_HEURISTIC_SPAN = 1.0          # ±0.5 от единственного значения
+OUTLIER_Z = 3.5
+MIN_FAMILY_SIZE = 5
+
+# Уровни: error — значение точно неверно, warning — подозрительно
+SEVERITY = {
+    'ph_out_of_range': 'error',
+    'ph_inverted': 'error',
+    'temp_out_of_range': 'error',
+    'temp_inverted': 'error',
+    'size_out_of_range': 'error',
+    'tank_out_of_range': 'error',
+    'ph_implausible': 'warning',
+    'ph_single_value': 'warning',
+    'temp_span_too_wide': 'warning',
+    'tank_too_small_for_size': 'warning',
+    'family_outlier_size': 'warning',
+    'family_outlier_tank': 'warning',
+    'family_outlier_temp': 'warning',
+    'family_outlier_ph': 'warning',
+}
+
+
+def _outside(values: np.ndarray, bounds) -> np.ndarray:
+    """Значение есть и вне диапазона (NaN не помечается)"""
+    low, high = bounds
+    with np.errstate(invalid='ignore'):
+        return ~np.isnan(values) & ((values < low) | (values > high))
+
+
+def run_checks(cols: CatalogColumns, imputed: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """
+    Все проверки; возвращает {код_проблемы: булева маска по записям}.
+    imputed — маски заполненных полей (по умолчанию — imputed_fields записей):
+    заполненные медианой значения не участвуют в медиане и MAD семейства,
+    иначе они сжимают разброс и настоящие значения становятся «выбросами».
+    """
+    if imputed is None:
+        imputed = {field: cols.imputed(field) for field in ('size_cm', 'min_tank_liters', *WATER_FIELDS)}
+    ph_min, ph_max = cols['ph_min'], cols['ph_max']
+    temp_min, temp_max = cols['temp_min'], cols['temp_max']
+    size, tank = cols['size_cm'], cols['min_tank_liters']
+
+    with np.errstate(invalid='ignore'):
+        checks = {
+            'ph_out_of_range': _outside(ph_min, PH_RANGE) | _outside(ph_max, PH_RANGE),
+            'ph_inverted': ph_min > ph_max,
+            'ph_implausible': (_outside(ph_min, PH_PLAUSIBLE) | _outside(ph_max, PH_PLAUSIBLE))
+                              & ~(_outside(ph_min, PH_RANGE) | _outside(ph_max, PH_RANGE)),
+            # Диапазон ±0.5 строит только парсер; у выверенных записей он настоящий
+            'ph_single_value': cols.scraped & ~imputed['ph_max']
+                               & np.isclose(ph_max - ph_min, PH_HEURISTIC_SPAN),
+            'temp_out_of_range': _outside(temp_min, TEMP_RANGE) | _outside(temp_max, TEMP_RANGE),
+            'temp_inverted': temp_min > temp_max,
+            'temp_span_too_wide': (temp_max - temp_min) > TEMP_MAX_SPAN,
+            'size_out_of_range': _outside(size, SIZE_RANGE),
+            'tank_out_of_range': _outside(tank, TANK_RANGE),
+            'tank_too_small_for_size': (tank / size) < LITERS_PER_CM_MIN,
+        }
+
+    # Выбросы внутри семейства (размер и объем — в логарифмической шкале)
+    n_families = len(cols.family_names)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        family_values = {
+            'family_outlier_size': np.log(size),
+            'family_outlier_tank': np.log(tank),
+            'family_outlier_temp': (temp_min + temp_max) / 2,
+            'family_outlier_ph': (ph_min + ph_max) / 2,
+        }
+    for code, values in family_values.items():
+        observed = ~np.logical_or.reduce([imputed[field] for field in CHECK_FIELDS[code]])
+        z = robust_z(values, cols.family_codes, n_families, min_group=MIN_FAMILY_SIZE, reference=observed)
+        with np.errstate(invalid='ignore'):
+            checks[code] = np.abs(z) > OUTLIER_Z
+    return checks
+
+
+# Поле, которое показываем в отчете для каждой проверки
+CHECK_FIELDS = {
+    'ph_out_of_range': ('ph_min', 'ph_max'),
+    'ph_inverted': ('ph_min', 'ph_max'),
+    'ph_implausible': ('ph_min', 'ph_max'),
+    'ph_single_value': ('ph_min', 'ph_max'),
+    'temp_out_of_range': ('temp_min', 'temp_max'),
+    'temp_inverted': ('temp_min', 'temp_max'),
+    'temp_span_too_wide': ('temp_min', 'temp_max'),
+    'size_out_of_range': ('size_cm',),
+    'tank_out_of_range': ('min_tank_liters',),
+    'tank_too_small_for_size': ('min_tank_liters', 'size_cm'),
+    'family_outlier_size': ('size_cm',),
+    'family_outlier_tank': ('min_tank_liters',),
+    'family_outlier_temp': ('temp_min', 'temp_max'),
+    'family_outlier_ph': ('ph_min', 'ph_max'),
+}
+
+
+def build_report(cols: CatalogColumns, checks: Dict[str, np.ndarray], elapsed_ms: float) -> Dict:
+    """Отчет: сводка по проверкам и список записей с замечаниями"""
+    flagged_rows = np.flatnonzero(np.logical_or.reduce(list(checks.values())))
+    flagged: List[Dict] = []
+    for row in flagged_rows:
+        record = cols.records[row]
+        issues = []
+        for code, mask in checks.items():
+            if mask[row]:
+                values = {field: (None if np.isnan(cols[field][row]) else float(cols[field][row]))
+                          for field in CHECK_FIELDS[code]}
+                issues.append({'code': code, 'severity': SEVERITY[code], 'values': values})
+        flagged.append({
+            'id': int(cols.ids[row]),
+            'name_ru': record.get('name_ru', ''),
+            'family_group': record.get('family_group', ''),
+            'issues': issues,
+        })
+
+    return {
+        'total_records': cols.size,
+        'flagged_records': len(flagged),
+        'errors': sum(1 for f in flagged if any(i['severity'] == 'error' for i in f['issues'])),
+        'checks': {code: int(mask.sum()) for code, mask in checks.items()},
+        'elapsed_ms': round(elapsed_ms, 2),
+        'flagged': flagged,
+    }
+
+
+def validate(records: List[Dict]) -> Dict:
+    """Проверить записи каталога и вернуть отчет"""
+    started = time.perf_counter()
+    cols = CatalogColumns(records)
+    checks = run_checks(cols)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return build_report(cols, checks, elapsed_ms)
+
+
+def print_summary(report: Dict):
+    """Таблица с количеством записей по каждой проверке"""
+    print("=" * 60)
+    print("ПРОВЕРКА КАТАЛОГА")
+    print("=" * 60)
+    print(f"Записей: {report['total_records']}, с замечаниями: {report['flagged_records']}, "
+          f"с ошибками: {report['errors']} ({report['elapsed_ms']} мс)")
+    print()
+    for code, count in report['checks'].items():
+        if count:
+            marker = "❌" if SEVERITY[code] == 'error' else "⚠"
+            print(f"  {marker} {code:26} {count:5}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Проверка числовых полей каталога")
+    arg_parser.add_argument('catalog', nargs='?', default=str(CATALOG_PATH), help="путь к каталогу")
+    arg_parser.add_argument('--report', default=str(REPORT_PATH), help="куда сохранить отчет")
+    args = arg_parser.parse_args()
+
+    report = validate(load_catalog(args.catalog))
+    print_summary(report)
+    atomic_write_json(args.report, report)
+    print(f"\n📄 Отчет сохранен: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Индекс диапазонов параметров воды (pH, температура) для быстрых запросов
+
+Диапазоны [min, max] каждого вида сортируются по min и хранятся как
+неявное сбалансированное дерево интервалов: узел — середина отрезка
+массива, для него запоминается максимум max в поддереве. Запросы
+«вид выдерживает значение X», «диапазон вида пересекается с X–Y»
+и «вид выдерживает весь диапазон X–Y» выполняются за O(log n + k)
+вместо перебора всех рыб.
+
+Индекс экспортируется в src/data/waterIndex.json (четыре массива на
+параметр), клиент выполняет тот же обход (src/utils/waterIndex.ts).
+
+    python3 water_index.py --ph 6.5 7.5 --temp 25
+    python3 water_index.py --export
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from catalog_store import atomic_write_json
+from community_solver import SPECIES_PATHS, load_species
+
+BASE_DIR = Path(__file__).parent.parent
+OUTPUT_PATH = BASE_DIR / 'src' / 'data' / 'waterIndex.json'
+
+PARAMS = {'ph': ('ph_min', 'ph_max'), 'temp': ('temp_min', 'temp_max')}
+
+
+class IntervalIndex:
+    """Статическое дерево интервалов на отсортированном массиве"""
+
+    def __init__(self, intervals: Sequence[Tuple[str, float, float]]):
+        intervals = sorted(intervals, key=lambda item: (item[1], item[2]))
+        self.ids = [item[0] for item in intervals]
+        self.low = [item[1] for item in intervals]
+        self.high = [item[2] for item in intervals]
+        self.max_high = list(self.high)
+        self._build(0, len(intervals))
+
+    def _build(self, start: int, end: int) -> float:
+        """max_high[mid] — максимум high на отрезке [start, end)"""
+        if start >= end:
+            return float('-inf')
+        mid = (start + end) // 2
+        self.max_high[mid] = max(self.high[mid], self._build(start, mid), self._build(mid + 1, end))
+        return self.max_high[mid]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _collect(self, low_limit: float, high_limit: float) -> List[str]:
+        """Интервалы с low <= low_limit и high >= high_limit"""
+        found: List[str] = []
+        stack = [(0, len(self.ids))]
+        while stack:
+            start, end = stack.pop()
+            if start >= end:
+                continue
+            mid = (start + end) // 2
+            if self.max_high[mid] < high_limit:
+                continue  # во всем поддереве high меньше нужного
+            stack.append((start, mid))
+            if self.low[mid] <= low_limit:
+                if self.high[mid] >= high_limit:
+                    found.append(self.ids[mid])
+                stack.append((mid + 1, end))  # правее low только больше
+        return found
+
+    def stab(self, value: float) -> List[str]:
+        """Виды, диапазон которых содержит value"""
+        return self._collect(value, value)
+
+    def overlap(self, low: float, high: float) -> List[str]:
+        """Виды, диапазон которых пересекается с [low, high]"""
+        return self._collect(high, low)
+
+    def covering(self, low: float, high: float) -> List[str]:
+        """Виды, диапазон которых целиком содержит [low, high]"""
+        return self._collect(low, high)
+
+    def export(self) -> Dict[str, list]:
+        return {'ids': self.ids, 'low': self.low, 'high': self.high, 'max_high': self.max_high}
+
+
+class WaterIndex:
+    """Индексы pH и температуры по списку видов"""
+
+    def __init__(self, records: List[Dict], id_prefix: str = 'fish-'):
+        self.indexes: Dict[str, IntervalIndex] = {}
+        for param, (low_field, high_field) in PARAMS.items():
+            intervals = []
+            for record in records:
+                water = record.get('water_params') or {}
+                low, high = water.get(low_field), water.get(high_field)
+                if low is not None and high is not None:  # без данных вид не проходит фильтр
+                    intervals.append((f"{id_prefix}{record['id']}", float(low), float(high)))
+            self.indexes[param] = IntervalIndex(intervals)
+
+    def query(self, mode: str = 'overlap', **ranges) -> Set[str]:
+        """
+        Виды, подходящие по всем заданным параметрам.
+        ranges: ph=(6.5, 7.5) или temp=25; mode — overlap или cover
+        """
+        result: Optional[Set[str]] = None
+        for param, value in ranges.items():
+            if value is None:
+                continue
+            low, high = (value, value) if isinstance(value, (int, float)) else value
+            index = self.indexes[param]
+            ids = set(index.overlap(low, high) if mode == 'overlap' else index.covering(low, high))
+            result = ids if result is None else result & ids
+        return result if result is not None else set()
+
+    def export(self) -> Dict[str, Dict[str, list]]:
+        return {param: index.export() for param, index in self.indexes.items()}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Индекс диапазонов pH и температуры")
+    arg_parser.add_argument('species', nargs='*', help="JSON с видами (по умолчанию src/data)")
+    arg_parser.add_argument('--ph', type=float, nargs='+', metavar='PH', help="значение или диапазон")
+    arg_parser.add_argument('--temp', type=float, nargs='+', metavar='T', help="значение или диапазон")
+    arg_parser.add_argument('--cover', action='store_true',
+                            help="вид должен выдерживать весь диапазон (по умолчанию — пересечение)")
+    arg_parser.add_argument('--export', action='store_true', help=f"сохранить {OUTPUT_PATH.name}")
+    args = arg_parser.parse_args()
+
+    records = load_species(args.species or SPECIES_PATHS)
+    started = time.perf_counter()
+    index = WaterIndex(records)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"Видов: {len(records)}, с pH: {len(index.indexes['ph'])}, "
+          f"с температурой: {len(index.indexes['temp'])} ({build_ms:.1f} мс)")
+
+    if args.export:
+        atomic_write_json(OUTPUT_PATH, index.export(), indent=None)
+        print(f"💾 Сохранено: {OUTPUT_PATH}")
+
+    ranges = {}
+    for param in PARAMS:
+        values = getattr(args, param)
+        if values:
+            ranges[param] = (values[0], values[-1])
+    if ranges:
+        started = time.perf_counter()
+        found = index.query('cover' if args.cover else 'overlap', **ranges)
+        query_ms = (time.perf_counter() - started) * 1000
+        names = {f"fish-{r['id']}": r.get('name_ru', '') for r in records}
+        print(f"Найдено: {len(found)} ({query_ms:.2f} мс)")
+        for fish_id in sorted(found, key=lambda i: names[i]):
+            print(f"  {names[fish_id]}")
+
+
+if __name__ == "__main__":
+    main()
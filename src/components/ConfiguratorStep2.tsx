@@ -1,8 +1,10 @@
-import { useState } from 'react';
+import { useMemo, useState } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { AquariumConfig, SelectedFish, Fish } from '@/types/aquarium';
 import { getFishByType } from '@/data/fishDatabase';
 import { getTagDescription } from '@/utils/compatibilityMatrix';
+import { searchSpecies } from '@/utils/searchIndex';
+import { findOverlapping, WaterParam } from '@/utils/waterIndex';
 import { Button } from '@/components/ui/button';
 import { FishCard } from './FishCard';
 import { FishModal } from './FishModal';
@@ -28,13 +30,36 @@ export const ConfiguratorStep2 = ({ config, onAddFish, onBack, onNext }: Configu
   const [tempMaxFilter, setTempMaxFilter] = useState<number | undefined>(undefined);
 
   const availableFish = getFishByType(catalogType);
+
+  // Названия и синонимы с учетом словоформ и опечаток (индекс scripts/search_index.py)
+  const nameMatches = useMemo(
+    () => new Set(searchQuery.trim() ? searchSpecies(searchQuery, Infinity).map(hit => hit.id) : []),
+    [searchQuery]
+  );
+
+  // Рыбы, диапазон которых пересекается с фильтром воды (индекс scripts/water_index.py);
+  // рыба без данных о параметре фильтр не проходит. null — фильтр не задан
+  const waterMatches = useMemo(() => {
+    const ranges: [WaterParam, number, number][] = [];
+    if (phMinFilter !== undefined || phMaxFilter !== undefined) {
+      ranges.push(['ph', phMinFilter ?? 4, phMaxFilter ?? 9]);
+    }
+    if (tempMinFilter !== undefined || tempMaxFilter !== undefined) {
+      ranges.push(['temp', tempMinFilter ?? 10, tempMaxFilter ?? 35]);
+    }
+    if (ranges.length === 0) return null;
+    return ranges
+      .map(([param, min, max]) => new Set(findOverlapping(param, min, max)))
+      .reduce((allowed, ids) => new Set([...allowed].filter(id => ids.has(id))));
+  }, [phMinFilter, phMaxFilter, tempMinFilter, tempMaxFilter]);
   
   const filteredFish = availableFish.filter(fish => {
     // Расширенный поиск
     let matchesSearch = true;
     if (searchQuery.trim()) {
       const query = searchQuery.toLowerCase().trim();
-      const searchInName = fish.name.toLowerCase().includes(query) ||
+      const searchInName = nameMatches.has(fish.id) ||
+                         fish.name.toLowerCase().includes(query) ||
                          fish.nameEn.toLowerCase().includes(query);
       const searchInDescription = fish.description?.toLowerCase().includes(query) || false;
       const searchInFamily = fish.familyGroup?.toLowerCase().includes(query) || false;
@@ -88,49 +113,7 @@ export const ConfiguratorStep2 = ({ config, onAddFish, onBack, onNext }: Configu
     const matchesLevel = true;
     
     // Фильтрация по параметрам воды
-    let matchesWaterParams = true;
-    if (fish.waterParams) {
-      // Проверка pH
-      if (phMinFilter !== undefined || phMaxFilter !== undefined) {
-        const fishPhMin = fish.waterParams.phMin;
-        const fishPhMax = fish.waterParams.phMax;
-        
-        if (fishPhMin !== undefined && fishPhMax !== undefined) {
-          // Рыба подходит, если её диапазон pH пересекается с фильтром
-          const filterMin = phMinFilter ?? 4;
-          const filterMax = phMaxFilter ?? 9;
-          const overlaps = !(fishPhMax < filterMin || fishPhMin > filterMax);
-          matchesWaterParams = matchesWaterParams && overlaps;
-        } else {
-          // Если у рыбы нет данных о pH, она не проходит фильтр
-          matchesWaterParams = false;
-        }
-      }
-      
-      // Проверка температуры
-      if (tempMinFilter !== undefined || tempMaxFilter !== undefined) {
-        const fishTempMin = fish.waterParams.tempMin;
-        const fishTempMax = fish.waterParams.tempMax;
-        
-        if (fishTempMin !== undefined && fishTempMax !== undefined) {
-          // Рыба подходит, если её диапазон температуры пересекается с фильтром
-          const filterMin = tempMinFilter ?? 10;
-          const filterMax = tempMaxFilter ?? 35;
-          const overlaps = !(fishTempMax < filterMin || fishTempMin > filterMax);
-          matchesWaterParams = matchesWaterParams && overlaps;
-        } else {
-          // Если у рыбы нет данных о температуре, она не проходит фильтр
-          matchesWaterParams = false;
-        }
-      }
-    } else {
-      // Если у рыбы нет параметров воды, но фильтр активен - не показываем
-      if (phMinFilter !== undefined || phMaxFilter !== undefined || 
-          tempMinFilter !== undefined || tempMaxFilter !== undefined) {
-        matchesWaterParams = false;
-      }
-      // Если фильтры не установлены, показываем рыбу даже без параметров воды
-    }
+    const matchesWaterParams = waterMatches === null || waterMatches.has(fish.id);
     
     return matchesSearch && matchesZone && matchesLevel && matchesWaterParams;
   });
@@ -21,7 +21,9 @@ export interface ExternalFishData {
   };
   incompatible_tags: string[];
   description_short?: string;
+  description_compacted?: boolean; // description_short сжат шаблоном (scripts/compact_descriptions.py)
   features_list?: string[];
   image_url?: string; // URL или путь к изображению рыбы (например, "/fish/neon-tetra.jpg" или "https://...")
+  imputed_fields?: string[]; // поля, заполненные по медианам рода/семейства (scripts/impute_traits.py)
 }
 
@@ -0,0 +1,150 @@
+// Предрасчитано scripts/search_index.py
+import searchIndex from '@/data/searchIndex.json';
+
+interface SearchIndexData {
+  suffixes: string[];
+  min_stem: number;
+  field_weights: number[];
+  docs: [string, string, string][]; // [id, name_ru, name_lat]
+  terms: string[]; // отсортированы
+  postings: number[][]; // doc * 4 + поле
+  trigrams: Record<string, number[]>;
+}
+
+export interface SearchHit {
+  id: string;
+  name: string;
+  nameEn: string;
+  score: number;
+}
+
+const INDEX = searchIndex as unknown as SearchIndexData;
+const FUZZY_THRESHOLD = 0.5;
+
+/**
+ * Нормализация как normalize_name в scripts/catalog_index.py
+ */
+const normalize = (text: string): string[] =>
+  text
+    .toLowerCase()
+    .replace(/ё/g, 'е')
+    .replace(/[^\p{L}\p{N}_\s]/gu, ' ')
+    .split(/\s+/)
+    .filter(Boolean);
+
+/**
+ * Легкий стемминг: окончания берутся из индекса
+ */
+const stem = (word: string): string => {
+  if (!/^[а-я]+$/.test(word)) return word;
+  for (const suffix of INDEX.suffixes) {
+    if (word.endsWith(suffix) && word.length - suffix.length >= INDEX.min_stem) {
+      return word.slice(0, -suffix.length);
+    }
+  }
+  return word;
+};
+
+const lowerBound = (value: string, start = 0): number => {
+  let lo = start;
+  let hi = INDEX.terms.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (INDEX.terms[mid] < value) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+};
+
+const trigrams = (term: string): string[] => {
+  const padded = `$${term}$`;
+  const grams: string[] = [];
+  for (let i = 0; i < padded.length - 2; i++) grams.push(padded.slice(i, i + 3));
+  return grams;
+};
+
+const dice = (a: string[], b: string[]): number => {
+  const counts = new Map<string, number>();
+  a.forEach(g => counts.set(g, (counts.get(g) || 0) + 1));
+  let common = 0;
+  b.forEach(g => {
+    const left = counts.get(g) || 0;
+    if (left > 0) {
+      common++;
+      counts.set(g, left - 1);
+    }
+  });
+  return a.length && b.length ? (2 * common) / (a.length + b.length) : 0;
+};
+
+/**
+ * Термы с похожими триграммами (для запроса с опечаткой)
+ */
+const fuzzyTerms = (term: string): number[] => {
+  const grams = trigrams(term);
+  const counts = new Map<number, number>();
+  new Set(grams).forEach(gram => {
+    (INDEX.trigrams[gram] || []).forEach(pos => counts.set(pos, (counts.get(pos) || 0) + 1));
+  });
+  return [...counts.entries()]
+    .sort((a, b) => b[1] - a[1])
+    .slice(0, 50)
+    .map(([pos]) => pos)
+    .filter(pos => dice(grams, trigrams(INDEX.terms[pos])) >= FUZZY_THRESHOLD);
+};
+
+const scoresFor = (token: string, prefix: boolean): Map<number, number> => {
+  const term = stem(token);
+  let positions: number[] = [];
+  if (prefix) {
+    const start = lowerBound(term);
+    const end = lowerBound(term + '\uffff', start);
+    for (let i = start; i < end; i++) positions.push(i);
+  } else {
+    const exact = lowerBound(term);
+    if (INDEX.terms[exact] === term) positions.push(exact);
+  }
+  let penalty = 1;
+  if (positions.length === 0) {
+    positions = fuzzyTerms(term);
+    penalty = 0.5;
+  }
+
+  const scores = new Map<number, number>();
+  positions.forEach(pos => {
+    INDEX.postings[pos].forEach(entry => {
+      const doc = Math.floor(entry / 4);
+      const weight = INDEX.field_weights[entry % 4] * penalty;
+      if (weight > (scores.get(doc) || 0)) scores.set(doc, weight);
+    });
+  });
+  return scores;
+};
+
+/**
+ * Поиск для подсказок при вводе: все слова запроса, последнее — как префикс
+ */
+export function searchSpecies(query: string, limit = 10): SearchHit[] {
+  const tokens = normalize(query);
+  if (tokens.length === 0) return [];
+
+  let total = scoresFor(tokens[0], tokens.length === 1);
+  for (let i = 1; i < tokens.length && total.size > 0; i++) {
+    const scores = scoresFor(tokens[i], i === tokens.length - 1);
+    const merged = new Map<number, number>();
+    scores.forEach((score, doc) => {
+      if (total.has(doc)) merged.set(doc, total.get(doc)! + score);
+    });
+    total = merged;
+  }
+
+  return [...total.entries()]
+    .sort((a, b) => b[1] - a[1] || INDEX.docs[a[0]][1].length - INDEX.docs[b[0]][1].length)
+    .slice(0, limit)
+    .map(([doc, score]) => ({
+      id: INDEX.docs[doc][0],
+      name: INDEX.docs[doc][1],
+      nameEn: INDEX.docs[doc][2],
+      score,
+    }));
+}
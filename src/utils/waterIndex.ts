@@ -0,0 +1,55 @@
+// Предрасчитано scripts/water_index.py
+import waterIndex from '@/data/waterIndex.json';
+
+/**
+ * Индекс диапазонов одного параметра: интервалы отсортированы по low,
+ * maxHigh[mid] — максимум high в поддереве с корнем mid (неявное дерево)
+ */
+interface IntervalIndex {
+  ids: string[];
+  low: number[];
+  high: number[];
+  max_high: number[];
+}
+
+export type WaterParam = 'ph' | 'temp';
+
+const WATER_INDEX = waterIndex as Record<WaterParam, IntervalIndex>;
+
+/**
+ * Интервалы с low <= lowLimit и high >= highLimit за O(log n + k)
+ */
+function collect(index: IntervalIndex, lowLimit: number, highLimit: number): string[] {
+  const found: string[] = [];
+  const stack: Array<[number, number]> = [[0, index.ids.length]];
+
+  while (stack.length > 0) {
+    const [start, end] = stack.pop()!;
+    if (start >= end) continue;
+    const mid = (start + end) >> 1;
+    if (index.max_high[mid] < highLimit) continue;
+    stack.push([start, mid]);
+    if (index.low[mid] <= lowLimit) {
+      if (index.high[mid] >= highLimit) {
+        found.push(index.ids[mid]);
+      }
+      stack.push([mid + 1, end]);
+    }
+  }
+
+  return found;
+}
+
+/**
+ * Рыбы, диапазон параметра которых пересекается с [min, max]
+ */
+export function findOverlapping(param: WaterParam, min: number, max: number): string[] {
+  return collect(WATER_INDEX[param], max, min);
+}
+
+/**
+ * Рыбы, которые выдерживают весь диапазон [min, max] (или одно значение)
+ */
+export function findTolerating(param: WaterParam, min: number, max: number = min): string[] {
+  return collect(WATER_INDEX[param], min, max);
+}